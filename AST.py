@@ -1,17 +1,30 @@
 # AST.py
-import re, sys
+import cache
+import gc, marshal, os, re, sys
+
+# 缓存的AST树的格式版本
+TREE_VERSION = 2
+# 决定AST树结构的源文件，修改其中任何一个后旧的缓存都会失效
+GRAMMAR_FILES = ('lexer.py', 'parser.py', 'AST.py')
 class ASTNode:
-    def __init__(self,type:str, value=None, operation=None, children=None):
+    # 大的脚本有几十万个节点，不给每个节点分配__dict__
+    __slots__ = ('type', 'value', 'operation', 'children', 'lineno', 'col')
+
+    def __init__(self,type:str, value=None, operation=None, children=None, lineno=None, col=None):
         '''
             para type:      该节点的类型，比如if_state、while_state、assign等
             para value:     该节点运行结束后的值，布尔值、数、数组和字符串
             para operation: 该节点可能执行的操作，如+、-、and、or、not等
             para children:  该节点的子节点，即该节点运行时需要运行的子代码
+            para lineno:    该节点在源代码中开始的行号，从1开始，不知道时为None
+            para col:       该节点在这一行中开始的列号，从1开始
         '''
         self.type = type
         self.value = value  
         self.operation = operation 
         self.children = children if children is not None else [] 
+        self.lineno = lineno
+        self.col = col
 
     def add_child(self, child):
         """向节点添加一个子节点"""
@@ -39,6 +52,40 @@ class ASTNode:
                 raise RuntimeError(child)
             child.print(depth = depth + 1)
 
+# 字面量节点的类型
+LITERAL_TYPES = ('NUMBER', 'STR', 'TRUE', 'FALSE')
+
+class LiteralNode(ASTNode):
+    '''
+    字面量叶节点
+
+    没有子节点，创建后不再修改，所以值相同的字面量可以共用一个节点（见literal）；
+    共用的节点出现在源代码的多个地方，所以没有行号和列号
+    '''
+    __slots__ = ()
+
+    def __init__(self, type : str, value):
+        super().__init__(type, value, None, ())
+
+    def add_child(self, child):
+        raise RuntimeError(f"字面量节点 {self} 不能有子节点")
+
+    def set_value(self, value):
+        raise RuntimeError(f"字面量节点 {self} 不能修改")
+
+def literal(type : str, value, literals : dict):
+    '''
+    返回值为value的字面量节点，literals中已经有相同的节点时直接复用
+
+    :param literals: (类型, 值的Python类型, 值) -> 节点，由调用者在一次语法分析或读取中共用；
+                     2 == 2.0，只按值区分时整数和小数会共用一个节点
+    '''
+    key = (type, value.__class__, value)
+    node = literals.get(key)
+    if node is None:
+        node = literals[key] = LiteralNode(type, value)
+    return node
+
 def parse_node_line(line: str):
     """
     解析单行节点字符串，返回(type, value, operation)的元组
@@ -115,6 +162,79 @@ def reconstruct_ast_from_file(code: str) -> ASTNode:
     
     return root
 
+def dumps(node : ASTNode) -> bytes:
+    '''
+    把AST树序列化成二进制数据
+
+    按先序把每个节点保存成(type, value, operation, 子节点数, 行号, 列号)，再用marshal编码。
+    和print的文本格式不同，节点的值原样保存，读回时不需要猜测类型
+    '''
+    items = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        items.append((node.type, node.value, node.operation, len(node.children), node.lineno, node.col))
+        stack.extend(reversed(node.children))
+    return marshal.dumps(items)
+
+def loads(data : bytes) -> ASTNode:
+    '''从dumps的结果重建AST树'''
+    items = marshal.loads(data)
+    # AST树中没有循环引用，建树时一次性创建大量对象会反复触发垃圾回收，关掉后快好几倍
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        root = None
+        stack = [] # [还没有填完的子节点列表, 还差几个子节点]
+        literals = {}
+        for type_str, value, operation, count, lineno, col in items:
+            if count == 0 and operation is None and type_str in LITERAL_TYPES:
+                node = literal(type_str, value, literals)
+            else:
+                node = ASTNode(type_str, value, operation, [], lineno, col)
+            if stack:
+                top = stack[-1]
+                top[0].append(node)
+                top[1] -= 1
+                if top[1] == 0:
+                    stack.pop()
+            else:
+                root = node
+            if count:
+                stack.append([node.children, count])
+        if stack or root is None:
+            raise ValueError("AST数据不完整")
+        return root
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+def _tree_key(source : str):
+    '''AST缓存的键，包含源代码（或其哈希值）和GRAMMAR_FILES的内容'''
+    grammar = []
+    for name in GRAMMAR_FILES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'r', encoding='utf-8') as file:
+            grammar.append(file.read())
+    return cache.source_key(source, 'ast', TREE_VERSION, *grammar)
+
+def load_tree(source_path : str, source : str):
+    '''
+    读取缓存的AST树，没有缓存时返回None。source是源代码，或者cache.file_digest得到的文件哈希值
+
+    这个函数不依赖PLY，命中缓存时不需要导入和构造词法、语法分析器
+    '''
+    data = cache.load(cache.cache_path(source_path, _tree_key(source), '.ast'))
+    if data is None:
+        return None
+    try:
+        return loads(data)
+    except (ValueError, EOFError, TypeError):
+        return None
+
+def store_tree(source_path : str, source : str, node : ASTNode):
+    '''把AST树写入缓存'''
+    cache.store(cache.cache_path(source_path, _tree_key(source), '.ast'), dumps(node))
+
 # 示例用法
 if __name__ == "__main__":
     sys.argv += ['test_out\\test_parser1.out']
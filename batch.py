@@ -0,0 +1,129 @@
+# batch.py
+# 批量运行：main.py给出多个文件、目录或清单时，在一个工作进程池中运行所有脚本。
+# 每个脚本有自己的Interpreter，输出分别捕获，写到单独的文件中，或者加上脚本名前缀后输出。
+# 运行之前先在进程池中对每个不同的文件做一次词法分析、语法分析（python模式还要编译），结果写入磁盘缓存，
+# 运行时直接读取缓存，同一个文件出现多次也只分析一次；每个工作进程只构造一次语法分析器。
+import interpreter, main
+import contextlib, io, multiprocessing, os, sys, time, traceback
+
+# 工作进程中的命令行参数和运行外部脚本的对象，见_init_worker
+_args = None
+_runner = None
+
+def collect_scripts(files : list, manifest : str = None):
+    '''
+    展开要运行的脚本，按给出的顺序排列
+
+    目录换成其中所有的.dsl文件（按路径排列，跳过__dslcache__和隐藏目录）；
+    清单中每行一个文件或目录，相对于清单所在目录，空行和#开头的行跳过。找不到文件时抛出OSError
+    '''
+    entries = list(files)
+    if manifest is not None:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    entries.append(os.path.join(base, line))
+    paths = []
+    for entry in entries:
+        if os.path.isdir(entry):
+            for directory, dirnames, filenames in os.walk(entry):
+                dirnames[:] = sorted(name for name in dirnames if not name.startswith(('.', '__')))
+                paths.extend(os.path.join(directory, name) for name in sorted(filenames) if name.endswith('.dsl'))
+        elif os.path.isfile(entry):
+            paths.append(entry)
+        else:
+            raise FileNotFoundError(f"找不到脚本 {entry}")
+    return paths
+
+def display_name(path : str):
+    '''输出和汇总中的脚本名：当前目录下的脚本用相对路径，否则用绝对路径'''
+    relative = os.path.relpath(os.path.abspath(path))
+    return os.path.abspath(path) if relative.startswith('..') else relative
+
+def output_names(names : list):
+    '''--output-dir中每次运行的文件名（不含.out/.err），同一个脚本第n次出现时加上-n'''
+    seen = {}
+    result = []
+    for name in names:
+        base = os.path.splitext(name)[0]
+        # 绝对路径去掉盘符和开头的分隔符，放到输出目录下
+        base = os.path.splitdrive(base)[1].lstrip('\\/')
+        seen[base] = seen.get(base, 0) + 1
+        result.append(base if seen[base] == 1 else f"{base}-{seen[base]}")
+    return result
+
+def _init_worker(args):
+    global _args, _runner
+    _args = args
+    _runner = main.create_runner(args)
+
+def _prepare(path : str):
+    '''分析一个文件并写入缓存，出错时什么也不做，运行时再报告'''
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        try:
+            main.load_script(_args, path)
+        except Exception:
+            pass
+
+def _run(task : tuple):
+    '''
+    运行一个脚本，返回(退出状态, 耗时, 标准输出, 标准错误)
+
+    和单独运行时一样，没有捕获的异常输出到标准错误，退出状态为1。
+    output不为None时输出写到output.out和output.err，返回的输出为None
+    '''
+    path, output = task
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            node, program = main.load_script(_args, path)
+            interpreter.Interpreter(node, mode=_args.mode, program=program, python_runner=_runner,
+                                    output=stdout, memo_size=_args.memo_size).run()
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    seconds = time.perf_counter() - start
+    if output is None:
+        return status, seconds, stdout.getvalue(), stderr.getvalue()
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    for suffix, text in (('.out', stdout.getvalue()), ('.err', stderr.getvalue())):
+        with open(output + suffix, 'w', encoding='utf-8') as file:
+            file.write(text)
+    return status, seconds, None, None
+
+def _write_prefixed(stream, name : str, text : str):
+    for line in text.splitlines():
+        stream.write(f"[{name}] {line}\n")
+
+def run_batch(args, paths : list):
+    '''按main.py的命令行参数运行paths中的所有脚本，返回退出状态：都成功时为0，否则为1'''
+    names = [display_name(path) for path in paths]
+    if args.output_dir is not None:
+        outputs = [os.path.join(args.output_dir, name) for name in output_names(names)]
+    else:
+        outputs = [None] * len(paths)
+    jobs = args.jobs or os.cpu_count() or 1
+    results = []
+    start = time.perf_counter()
+    with multiprocessing.Pool(max(1, min(jobs, len(paths))), _init_worker, (args,)) as pool:
+        pool.map(_prepare, list(dict.fromkeys(os.path.abspath(path) for path in paths)))
+        # 按给出的顺序取结果，一个脚本的输出整段写出，不会和其他脚本的交错
+        for name, (status, seconds, stdout, stderr) in zip(names, pool.imap(_run, zip(paths, outputs))):
+            if stdout is not None:
+                _write_prefixed(sys.stdout, name, stdout)
+                _write_prefixed(sys.stderr, name, stderr)
+                sys.stdout.flush()
+            results.append((name, status, seconds))
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for _, status, _ in results if status != 0)
+    print(f"{'状态':>4} {'耗时(ms)':>10}  脚本", file=sys.stderr)
+    for name, status, seconds in results:
+        print(f"{status:>6} {seconds * 1000:>12.1f}  {name}", file=sys.stderr)
+    print(f"批量运行 {len(results)} 个脚本，成功 {len(results) - failed} 个，失败 {failed} 个，用时 {elapsed:.2f} s",
+          file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,120 @@
+# benchmark/bot_load.py
+# 机器人服务的压力测试：在临时目录中用server.py运行scripts/check_remain_bot.dsl，
+# 同时连接许多客户端，每个客户端查询若干次余额后退出。
+# 统计每秒完成的查询数，以及每次查询（发出一行到收到下一个提示）的延迟。
+# Linux上还会输出服务进程的内存峰值。
+import argparse, asyncio, os, shutil, signal, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server import raise_open_file_limit
+
+PROMPT = '：'.encode('utf-8') # 机器人的提示以全角冒号结尾
+NAMES = ['张三', '李四', '王五', '赵六']
+CONNECTING = 1000 # 最多同时发起多少个连接
+
+async def client(connect, queries : int, latencies : list, connecting : asyncio.Semaphore):
+    '''一个客户端：查询queries次后输入“退出”'''
+    # Unix域套接字的连接队列满时，asyncio会把没有连上的套接字当作已经连上，所以限制同时发起的连接数
+    async with connecting:
+        reader, writer = await connect()
+        await reader.readuntil(PROMPT)
+    for i in range(queries):
+        start = time.perf_counter()
+        writer.write(NAMES[i % len(NAMES)].encode('utf-8') + b'\n')
+        await reader.readuntil(PROMPT)
+        latencies.append(time.perf_counter() - start)
+    writer.write('退出\n'.encode('utf-8'))
+    await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+async def run_clients(connect, clients : int, queries : int):
+    '''返回(耗时, 每次查询的延迟, 出错的客户端数)'''
+    latencies = []
+    connecting = asyncio.Semaphore(CONNECTING)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(connect, queries, latencies, connecting) for _ in range(clients)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies, sum(isinstance(result, Exception) for result in results)
+
+def percentile(values : list, p : float):
+    return statistics.quantiles(values, n=100, method='inclusive')[int(p) - 1] if len(values) > 1 else values[0]
+
+def prepare(directory : str):
+    '''把机器人脚本和它调用的查询脚本复制到directory，返回脚本路径'''
+    bot = os.path.join(directory, 'bot.dsl')
+    shutil.copy(os.path.join(ROOT, 'scripts', 'check_remain_bot.dsl'), bot)
+    # 脚本中的路径是 ./pyscripts\check_remain.py，在Windows以外的系统上是一个文件名
+    if os.sep == '\\':
+        os.makedirs(os.path.join(directory, 'pyscripts'))
+    shutil.copy(os.path.join(ROOT, 'pyscripts', 'check_remain.py'), os.path.join(directory, 'pyscripts\\check_remain.py'))
+    return bot
+
+def server_peak_memory(pid : int):
+    '''进程的内存峰值（KB），只支持Linux'''
+    try:
+        with open(f'/proc/{pid}/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+async def wait_ready(connect, timeout : float = 10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await connect()
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+            continue
+        writer.close() # 服务端读到EOF后结束这个会话
+        return
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='机器人服务的压力测试')
+    arg_parser.add_argument('--clients', type=int, nargs='+', default=[1000, 10000], help='同时连接的客户端数，可以给多个')
+    arg_parser.add_argument('--queries', type=int, default=5, help='每个客户端查询几次')
+    arg_parser.add_argument('--pycall', default='inprocess', help='服务端运行查询脚本的方式，见main.py --pycall')
+    arg_parser.add_argument('--tcp', action='store_true', help='使用TCP连接，默认使用Unix域套接字（系统支持时）')
+    arg_parser.add_argument('--port', type=int, default=8766)
+    arg_parser.add_argument('--suspend', action='store_true', help='服务端把等待输入的会话保存到磁盘（--suspend-dir）')
+    args = arg_parser.parse_args()
+
+    raise_open_file_limit()
+    use_unix = not args.tcp and hasattr(asyncio, 'start_unix_server')
+    with tempfile.TemporaryDirectory() as directory:
+        bot = prepare(directory)
+        command = [sys.executable, os.path.join(ROOT, 'server.py'), bot, '--pycall', args.pycall]
+        if use_unix:
+            path = os.path.join(directory, 'bot.sock')
+            command += ['--unix', path]
+            connect = lambda: asyncio.open_unix_connection(path)
+        else:
+            command += ['--port', str(args.port)]
+            connect = lambda: asyncio.open_connection('127.0.0.1', args.port)
+        if args.suspend:
+            command += ['--suspend-dir', os.path.join(directory, 'sessions')]
+        server = subprocess.Popen(command, cwd=directory, stderr=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_ready(connect))
+            print(f"{'Unix域套接字' if use_unix else 'TCP'}，每个客户端查询 {args.queries} 次，python_call: {args.pycall}")
+            for clients in args.clients:
+                elapsed, latencies, errors = asyncio.run(run_clients(connect, clients, args.queries))
+                print(f"{clients:6} 个客户端：{elapsed:6.2f} s，{len(latencies) / elapsed:8.0f} 次查询/秒，"
+                      f"延迟 p50 {percentile(latencies, 50) * 1000:7.1f} ms，p99 {percentile(latencies, 99) * 1000:7.1f} ms，"
+                      f"出错 {errors} 个")
+            peak = server_peak_memory(server.pid)
+            if peak is not None:
+                print(f"服务进程内存峰值 {peak / 1024:.1f} MB")
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait()
+
+if __name__ == '__main__':
+    main()
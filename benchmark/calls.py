@@ -0,0 +1,75 @@
+# benchmark/calls.py
+# 测量DSL函数调用的开销：递归的fib，以及在循环中反复调用很小的辅助函数。
+# 每个程序在单独的进程中运行，只计运行时间，不计语法分析。
+# 用 --root 指定另一份代码（比如旧版本的检出目录）可以对比修改前后的结果。
+import argparse, io, os, statistics, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMS = {
+    # 递归调用，每次调用两个参数以内
+    'fib': '''
+function fib(n) begin
+    if n < 2 begin
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+print(fib(20), '\\n')
+''',
+    # 循环中调用几个小函数，调用的开销占大部分
+    'helpers': '''
+function add(a, b) begin
+    return a + b
+end
+function twice(x) begin
+    return add(x, x)
+end
+function ready() begin
+    return true
+end
+i = 0
+total = 0
+while i < 20000 begin
+    if ready() begin
+        total = add(total, twice(i))
+    end
+    i = add(i, 1)
+end
+print(total, '\\n')
+''',
+}
+
+def measure(root : str, name : str, mode : str):
+    '''在当前进程中运行程序，输出 耗时'''
+    sys.path.insert(0, root)
+    import lexer, parser, interpreter
+    node = parser.Parser(lexer.Lexer()).parse(PROGRAMS[name])
+    runner = interpreter.Interpreter(node, mode=mode, output=io.StringIO())
+    start = time.perf_counter()
+    runner.run()
+    print(time.perf_counter() - start)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量DSL函数调用的开销')
+    arg_parser.add_argument('--root', default=ROOT, help='被测代码所在目录，默认为当前代码')
+    arg_parser.add_argument('--mode', default='tree', help='运行模式，见main.py --mode')
+    arg_parser.add_argument('--runs', type=int, default=5, help='每个程序运行几次')
+    arg_parser.add_argument('--program', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.program:
+        measure(args.root, args.program, args.mode)
+        return
+
+    print(f'{args.root}: {args.mode} 模式，每个程序运行 {args.runs} 次')
+    for name in PROGRAMS:
+        times = []
+        for _ in range(args.runs):
+            command = [sys.executable, __file__, '--root', args.root, '--mode', args.mode, '--program', name]
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            times.append(float(result.stdout))
+        print(f'{name:8} 最短 {min(times) * 1000:7.1f} ms，中位数 {statistics.median(times) * 1000:7.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# benchmark/memory.py
+# 测量词法分析和语法分析的内存峰值：生成一个很大的脚本，
+# 分别用整个读入再分析、边读边分析两种方式处理，用tracemalloc统计Python分配的内存峰值。
+# 每种方式在单独的进程中运行，互不影响。
+import argparse, os, subprocess, sys, tempfile, time, tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import lexer, parser
+
+STATEMENT = '''a{0} = {0} * (b + {0}) - c[{1}]
+if a{0} > 3 begin
+    print('a{0} = ', a{0}, '\\n')
+end
+'''
+
+def generate(path : str, size : int):
+    '''生成大约size字节的脚本'''
+    with open(path, 'w', encoding='utf-8') as file:
+        i = 0
+        while file.tell() < size:
+            file.write(STATEMENT.format(i, i % 7))
+            i += 1
+
+def run_tokenize(path : str):
+    '''整个读入，标记放进列表'''
+    with open(path, 'r', encoding='utf-8') as file:
+        code = file.read()
+    return len(lexer.Lexer().tokenize(code))
+
+def run_iter_tokens(path : str):
+    '''按块读入，逐个产生标记'''
+    return sum(1 for _ in lexer.Lexer().iter_tokens(lexer.read_chunks(path)))
+
+def run_parse(path : str):
+    '''整个读入后语法分析'''
+    with open(path, 'r', encoding='utf-8') as file:
+        code = file.read()
+    return len(parser.Parser(lexer.Lexer()).parse(code).children)
+
+def run_parse_file(path : str):
+    '''边读边语法分析'''
+    return len(parser.Parser(lexer.Lexer()).parse_file(path).children)
+
+VARIANTS = {
+    'tokenize':    run_tokenize,
+    'iter_tokens': run_iter_tokens,
+    'parse':       run_parse,
+    'parse_file':  run_parse_file,
+}
+
+def measure(variant : str, path : str):
+    '''在当前进程中运行一种方式，输出 内存峰值 耗时'''
+    tracemalloc.start()
+    start = time.perf_counter()
+    VARIANTS[variant](path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    print(peak, elapsed)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量词法分析和语法分析的内存峰值')
+    arg_parser.add_argument('--size', type=float, default=2, help='生成的脚本大小（MB）')
+    arg_parser.add_argument('--variant', choices=VARIANTS, help=argparse.SUPPRESS)
+    arg_parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.variant:
+        measure(args.variant, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'large.dsl')
+        generate(path, int(args.size * (1 << 20)))
+        print(f'脚本大小 {os.path.getsize(path) / (1 << 20):.1f} MB')
+        for variant in VARIANTS:
+            result = subprocess.run([sys.executable, __file__, '--variant', variant, '--file', path],
+                                    capture_output=True, text=True, check=True)
+            peak, elapsed = result.stdout.split()
+            print(f'{variant:12} 内存峰值 {int(peak) / (1 << 20):8.1f} MB  耗时 {float(elapsed):6.2f} s')
+
+if __name__ == '__main__':
+    main()
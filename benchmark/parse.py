@@ -0,0 +1,67 @@
+# benchmark/parse.py
+# 测量大脚本的语法分析时间和进程内存峰值：生成一个有很多条语句的脚本，在单独的进程中分析它。
+# 用 --root 指定另一份代码（比如旧版本的检出目录）可以对比修改前后的结果。
+import argparse, os, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 每组4条顶层语句，变量名和字面量都会重复出现
+STATEMENTS = '''a{0} = {1} * (b + {1}) - c[{1}]
+s = 'name' + (itoa)a{0}
+if a{0} > 3 and true begin
+    print('a = ', a{0}, '\\n')
+end
+b = a{0} / 2
+'''
+
+def generate(path : str, statements : int):
+    '''生成有statements条语句的脚本'''
+    with open(path, 'w', encoding='utf-8') as file:
+        for i in range(statements // 4):
+            file.write(STATEMENTS.format(i % 1000, i % 10))
+
+def measure(root : str, path : str, fast_lexer : bool):
+    '''在当前进程中分析脚本，输出 耗时 内存峰值(KB)'''
+    sys.path.insert(0, root)
+    import lexer, parser
+    Lexer = lexer.Lexer(fast_lexer) if fast_lexer else lexer.Lexer()
+    Parser = parser.Parser(Lexer)
+    with open(path, 'r', encoding='utf-8') as file:
+        code = file.read()
+    start = time.perf_counter()
+    node = Parser.parse(code)
+    elapsed = time.perf_counter() - start
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin': # macOS上的单位是字节
+            peak //= 1024
+    except ImportError:
+        peak = -1
+    print(elapsed, peak, len(node.children))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量大脚本的语法分析时间和内存峰值')
+    arg_parser.add_argument('--root', default=ROOT, help='被测代码所在目录，默认为当前代码')
+    arg_parser.add_argument('--statements', type=int, default=100000, help='生成的语句数')
+    arg_parser.add_argument('--fast-lexer', action='store_true', help='使用手写的词法扫描器')
+    arg_parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.file:
+        measure(args.root, args.file, args.fast_lexer)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'large.dsl')
+        generate(path, args.statements)
+        command = [sys.executable, __file__, '--root', args.root, '--file', path]
+        if args.fast_lexer:
+            command.append('--fast-lexer')
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        elapsed, peak, statements = result.stdout.split()
+        print(f'{args.root}: {statements} 条语句')
+        print(f'语法分析 {float(elapsed):.2f} s，内存峰值 {int(peak) / 1024:.1f} MB')
+
+if __name__ == '__main__':
+    main()
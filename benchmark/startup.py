@@ -0,0 +1,34 @@
+# benchmark/startup.py
+# 测量启动时间：多次运行 python main.py scripts/hello.dsl，统计每次从启动进程到退出的时间。
+# 用 --root 指定另一份代码（比如旧版本的检出目录）可以对比修改前后的启动时间。
+import argparse, os, statistics, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(root : str, script : str, runs : int, stdin : str):
+    '''运行runs次，返回每次的耗时（秒）'''
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(root, 'main.py'), script], cwd=root, input=stdin,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, text=True, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量robot_dsl的启动时间')
+    arg_parser.add_argument('--root', default=ROOT, help='被测代码所在目录，默认为当前代码')
+    arg_parser.add_argument('--script', default=os.path.join('scripts', 'hello.dsl'), help='运行的脚本，相对于root')
+    arg_parser.add_argument('--runs', type=int, default=20, help='运行次数')
+    arg_parser.add_argument('--input', default='张三\n', help='脚本的标准输入')
+    args = arg_parser.parse_args()
+
+    # 先运行一次，让生成分析表、写入__pycache__之类的一次性开销不计入结果
+    measure(args.root, args.script, 1, args.input)
+    times = measure(args.root, args.script, args.runs, args.input)
+    print(f'{args.root}: {args.script} 运行 {args.runs} 次')
+    print(f'最短 {min(times) * 1000:.1f} ms，中位数 {statistics.median(times) * 1000:.1f} ms，'
+          f'平均 {statistics.mean(times) * 1000:.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+# benchmark/suite.py
+# 基准测试集：对benchmark/workloads中的每个DSL程序分别测量词法分析、语法分析和运行的时间。
+# 结果可以保存成JSON作为基线，之后和基线比较，某一阶段变慢超过阈值时以非0状态退出。
+# 每个程序在单独的进程中测量，工作目录是一个临时目录，其中放着程序调用的pyscripts中的脚本，
+# 不需要联网，也不依赖Windows的路径写法。
+# 用 --root 指定另一份代码（比如旧版本的检出目录）可以对比修改前后的结果。
+import argparse, io, json, os, platform, shutil, statistics, subprocess, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKLOADS = os.path.join(ROOT, 'benchmark', 'workloads')
+PHASES = ('lex', 'parse', 'exec')
+# 程序都很短，只分析一遍时词法和语法分析不到1毫秒，测不准；这两个阶段分析把程序重复这么多遍的源代码
+FRONTEND_COPIES = 50
+# 保存的基线的格式版本
+BASELINE_VERSION = 1
+
+def workloads():
+    '''workloads目录中的程序名（不含.dsl），按名字排列'''
+    return sorted(name[:-len('.dsl')] for name in os.listdir(WORKLOADS) if name.endswith('.dsl'))
+
+def prepare(directory : str):
+    '''把pyscripts中的脚本复制到directory，程序中的路径是 ./pyscripts\\x.py，在Windows以外的系统上是一个文件名'''
+    if os.sep == '\\':
+        os.makedirs(os.path.join(directory, 'pyscripts'))
+    scripts = os.path.join(ROOT, 'pyscripts')
+    for name in os.listdir(scripts):
+        if name.endswith('.py'):
+            shutil.copy(os.path.join(scripts, name), os.path.join(directory, 'pyscripts\\' + name))
+
+def measure(root : str, name : str, mode : str, runs : int):
+    '''
+    在当前进程中测量一个程序，输出JSON：阶段 -> 每次的耗时（秒）
+
+    词法分析只产生标记；语法分析使用已经得到的标记，不含词法分析。两者都分析重复FRONTEND_COPIES遍的源代码。
+    运行时输出写到内存中
+    '''
+    sys.path.insert(0, root)
+    import lexer, parser, interpreter
+    with open(os.path.join(WORKLOADS, name + '.dsl'), 'r', encoding='utf-8') as file:
+        source = file.read()
+    frontend_source = (source.rstrip('\n') + '\n') * FRONTEND_COPIES
+    Lexer = lexer.Lexer()
+    Parser = parser.Parser(Lexer)
+    times = {phase: [] for phase in PHASES}
+    for _ in range(runs):
+        start = time.perf_counter()
+        tokens = Lexer.tokenize(frontend_source)
+        times['lex'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        Parser.parse_tokens(tokens)
+        times['parse'].append(time.perf_counter() - start)
+
+        node = Parser.parse(source)
+
+        # 每次用新的解释器，函数结果缓存之类的状态不会留到下一次
+        runner = interpreter.Interpreter(node, mode=mode, output=io.StringIO())
+        start = time.perf_counter()
+        try:
+            runner.run()
+        finally:
+            runner.python_runner.close()
+        times['exec'].append(time.perf_counter() - start)
+    print(json.dumps(times))
+
+def run_suite(root : str, names : list, mode : str, runs : int):
+    '''测量names中的每个程序，返回 程序名 -> 阶段 -> {'min': 最短耗时, 'median': 中位数}'''
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        prepare(directory)
+        for name in names:
+            command = [sys.executable, os.path.abspath(__file__), '--root', root, '--mode', mode,
+                       '--runs', str(runs), '--workload', name]
+            result = subprocess.run(command, cwd=directory, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise Exception(f"测量 {name} 时出错：\n{result.stderr.strip()}")
+            times = json.loads(result.stdout)
+            results[name] = {phase: {'min': min(times[phase]), 'median': statistics.median(times[phase])}
+                             for phase in PHASES}
+    return results
+
+def load_baseline(path : str, mode : str):
+    with open(path, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    if baseline.get('version') != BASELINE_VERSION:
+        raise Exception(f"不支持的基线格式版本 {baseline.get('version')}")
+    if baseline['mode'] != mode:
+        raise Exception(f"基线是在 {baseline['mode']} 模式下测量的，不能和 {mode} 模式的结果比较")
+    return baseline['results']
+
+def save_baseline(path : str, mode : str, runs : int, results : dict):
+    baseline = {
+        'version': BASELINE_VERSION,
+        'mode': mode,
+        'runs': runs,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, ensure_ascii=False, indent=2)
+        file.write('\n')
+
+def compare(results : dict, baseline : dict, threshold : float, min_delta : float):
+    '''
+    返回变慢的阶段 [(程序名, 阶段, 基线耗时, 耗时)]
+
+    按最短耗时比较：比基线慢threshold以上，并且至少慢min_delta秒才算变慢，很短的阶段不会因为抖动报错
+    '''
+    regressions = []
+    for name, phases in results.items():
+        for phase, value in phases.items():
+            old = baseline.get(name, {}).get(phase)
+            if old is None:
+                continue
+            new = value['min']
+            if new > old['min'] * (1 + threshold) and new - old['min'] >= min_delta:
+                regressions.append((name, phase, old['min'], new))
+    return regressions
+
+def print_results(results : dict, baseline : dict = None):
+    print(f"{'程序':<10} " + ' '.join(f"{phase + '(ms)':>10} {'变化':>6}" if baseline else f"{phase + '(ms)':>10}"
+                                     for phase in PHASES))
+    for name, phases in results.items():
+        cells = []
+        for phase in PHASES:
+            new = phases[phase]['min']
+            cells.append(f"{new * 1000:>10.2f}")
+            if baseline:
+                old = baseline.get(name, {}).get(phase)
+                cells.append(f"{(new / old['min'] - 1) * 100:>+7.1f}%" if old and old['min'] > 0 else f"{'-':>8}")
+        print(f"{name:<12} " + ' '.join(cells))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='测量benchmark/workloads中的程序各阶段的耗时，和基线比较')
+    arg_parser.add_argument('--root', default=ROOT, help='被测代码所在目录，默认为当前代码')
+    arg_parser.add_argument('--mode', default='tree', help='运行模式，见main.py --mode')
+    arg_parser.add_argument('--runs', type=int, default=5, help='每个程序测量几次，按最短耗时比较')
+    arg_parser.add_argument('--only', nargs='+', default=None, help='只测量这些程序，默认测量全部')
+    arg_parser.add_argument('--save', default=None, help='把结果保存成JSON基线')
+    arg_parser.add_argument('--baseline', default=None, help='和这个JSON基线比较，有阶段变慢时以状态1退出')
+    arg_parser.add_argument('--threshold', type=float, default=0.2, help='比基线慢多少算变慢，0.2表示20%%')
+    arg_parser.add_argument('--min-delta', type=float, default=1.0, help='至少慢多少毫秒才算变慢')
+    arg_parser.add_argument('--workload', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.workload:
+        measure(args.root, args.workload, args.mode, args.runs)
+        return
+
+    names = args.only or workloads()
+    unknown = sorted(set(names) - set(workloads()))
+    if unknown:
+        arg_parser.error(f"没有这些程序：{', '.join(unknown)}")
+    # 先读入基线，格式不对时不必等测量结束才报错
+    baseline = load_baseline(args.baseline, args.mode) if args.baseline else None
+
+    print(f'{args.root}: {args.mode} 模式，每个程序测量 {args.runs} 次，词法和语法分析的是重复 {FRONTEND_COPIES} 遍的源代码')
+    results = run_suite(args.root, names, args.mode, args.runs)
+    print_results(results, baseline)
+    if args.save:
+        save_baseline(args.save, args.mode, args.runs, results)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta / 1000)
+        for name, phase, old, new in regressions:
+            print(f"变慢：{name} 的 {phase} 从 {old * 1000:.2f} ms 到 {new * 1000:.2f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
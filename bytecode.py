@@ -0,0 +1,817 @@
+# bytecode.py
+# 这个模块把AST树编译成扁平的字节码，并用一个基于栈的虚拟机运行。
+# 每条指令占两个整数：操作码和操作数，常量和变量名分别放在常量池和名字池中。
+# DSL函数调用不占用Python的调用栈，调用栈帧由虚拟机自己维护；尾调用直接复用当前函数的栈帧。
+import AST, operations, resolver
+import marshal, sys
+from array import array
+
+# ---------------------------- 操作码 ----------------------------
+LOAD_CONST       = 0   # 压入常量池第arg项
+LOAD_NAME        = 1   # 从栈顶开始查找变量names[arg]并压入
+STORE_NAME       = 2   # 弹出值赋给变量names[arg]，找不到时设为全局变量
+LOAD_ITEM        = 3   # 弹出索引，压入数组names[arg]的对应项
+CHECK_ARRAY      = 4   # 数组元素赋值前检查names[arg]，找不到变量时跳转到arg2
+STORE_ITEM       = 5   # 依次弹出值和索引，给数组names[arg]的对应项赋值
+STORE_GLOBAL     = 6   # 弹出值直接赋给全局变量names[arg]
+BINARY_ADD       = 7
+BINARY_SUB       = 8
+BINARY_MUL       = 9
+BINARY_DIV       = 10
+COMPARE          = 11  # arg是COMPARE_OPS中的下标
+UNARY_NEG        = 12
+UNARY_NOT        = 13
+ATOI             = 14
+ITOA             = 15
+BUILD_LIST       = 16  # 弹出arg个值组成数组
+JUMP             = 17  # 跳转到arg
+POP_JUMP_IF_FALSE = 18
+POP_JUMP_IF_TRUE = 19
+POP_TOP          = 20
+CHECK_FUNCTION   = 21  # 检查函数names[arg]是否已定义
+CALL_FUNCTION    = 22  # 弹出参数数组，调用函数names[arg]
+CALL_BUILTIN     = 23  # 弹出参数数组，调用BUILTINS[arg]
+CALL_PYTHON      = 24  # 弹出参数数组，调用外部脚本consts[arg]
+MAKE_FUNCTION    = 25  # 用consts[arg]中的函数字节码定义函数
+RETURN_VALUE     = 26  # 弹出返回值，结束当前函数或整个程序
+RAISE            = 27  # 以consts[arg]为信息抛出异常
+STORE_TEMP       = 28  # 把栈顶的值存进临时槽位arg，不弹出
+LOAD_TEMP        = 29  # 压入临时槽位arg中的值
+TAIL_CALL        = 30  # 弹出参数数组，用函数names[arg]的栈帧替换当前函数的栈帧
+FIND_FRAME       = 31  # 压入栈顶往下第一个有变量names[arg]的栈帧的下标，找不到时跳转到arg2
+NEXT_FRAME       = 32  # 弹出栈帧下标，再往下找有变量names[arg]的栈帧，找到时压入它的下标并跳转到arg2
+STORE_FRAME      = 33  # 弹出值赋给栈帧（下标在栈顶）中的变量names[arg]
+CHECK_FRAME_ARRAY = 34 # 检查栈帧（下标在栈顶）中的names[arg]是数组并压入
+CHECK_FRAME_INDEX = 35 # 检查栈顶的索引在次栈顶的数组names[arg]中
+STORE_FRAME_ITEM = 36  # 依次弹出值、索引和数组，给栈帧（下标在栈顶）中数组names[arg]的对应项赋值
+CHECK_INDEX      = 37  # 检查栈顶的索引在数组names[arg]中，不弹出
+
+OPNAMES = [
+    'LOAD_CONST', 'LOAD_NAME', 'STORE_NAME', 'LOAD_ITEM', 'CHECK_ARRAY', 'STORE_ITEM',
+    'STORE_GLOBAL', 'BINARY_ADD', 'BINARY_SUB', 'BINARY_MUL', 'BINARY_DIV', 'COMPARE',
+    'UNARY_NEG', 'UNARY_NOT', 'ATOI', 'ITOA', 'BUILD_LIST', 'JUMP', 'POP_JUMP_IF_FALSE',
+    'POP_JUMP_IF_TRUE', 'POP_TOP', 'CHECK_FUNCTION', 'CALL_FUNCTION', 'CALL_BUILTIN',
+    'CALL_PYTHON', 'MAKE_FUNCTION', 'RETURN_VALUE', 'RAISE', 'STORE_TEMP', 'LOAD_TEMP',
+    'TAIL_CALL', 'FIND_FRAME', 'NEXT_FRAME', 'STORE_FRAME', 'CHECK_FRAME_ARRAY', 'CHECK_FRAME_INDEX',
+    'STORE_FRAME_ITEM', 'CHECK_INDEX',
+]
+
+COMPARE_OPS = operations.COMPARE_OPS
+BUILTINS = ('print', 'input', 'len')
+
+# 操作数是跳转目标的指令
+JUMP_OPS = (JUMP, POP_JUMP_IF_FALSE, POP_JUMP_IF_TRUE)
+# 操作数是名字池下标的指令
+NAME_OPS = (LOAD_NAME, STORE_NAME, LOAD_ITEM, CHECK_ARRAY, STORE_ITEM, STORE_GLOBAL,
+            CHECK_FUNCTION, CALL_FUNCTION, TAIL_CALL, FIND_FRAME, NEXT_FRAME, STORE_FRAME,
+            CHECK_FRAME_ARRAY, CHECK_FRAME_INDEX, STORE_FRAME_ITEM, CHECK_INDEX)
+# 操作数是常量池下标的指令
+CONST_OPS = (LOAD_CONST, CALL_PYTHON, MAKE_FUNCTION, RAISE)
+# 占两条指令的位置的指令，后一条的操作数是跳转目标
+WIDE_OPS = (CHECK_ARRAY, FIND_FRAME, NEXT_FRAME)
+
+class CodeObject:
+    '''一段编译好的字节码：整个程序或一个函数体'''
+    def __init__(self, name : str, arguments : list = None):
+        self.name = name                    # 程序名或函数名
+        self.arguments = arguments or []    # 函数的参数名
+        self.code = array('i')              # 操作码和操作数交替存放
+        self.lines = array('i')             # 每条指令对应的源代码行号，不知道时为0
+        self.lineno = 0                     # 编译时正在写入的指令的行号
+        self.consts = []                    # 常量池
+        self.names = []                     # 名字池
+        self._const_index = {}
+        self._name_index = {}
+        self.digest = None                  # 整个程序的哈希值，见program_digest
+
+    def add_const(self, value):
+        '''加入常量池，返回下标。True和1、1和1.0要分开存放'''
+        key = (type(value), value) if not isinstance(value, (list, CodeObject)) else None
+        if key is not None and key in self._const_index:
+            return self._const_index[key]
+        self.consts.append(value)
+        if key is not None:
+            self._const_index[key] = len(self.consts) - 1
+        return len(self.consts) - 1
+
+    def add_name(self, name : str):
+        '''加入名字池，返回下标'''
+        if name not in self._name_index:
+            self.names.append(name)
+            self._name_index[name] = len(self.names) - 1
+        return self._name_index[name]
+
+    def emit(self, op : int, arg : int = 0):
+        '''写入一条指令，返回指令的位置'''
+        self.code.append(op)
+        self.code.append(arg)
+        self.lines.append(self.lineno)
+        return len(self.code) - 2
+
+    def patch(self, position : int, arg : int):
+        '''回填跳转指令的目标'''
+        self.code[position + 1] = arg
+
+    def here(self):
+        '''下一条指令的位置'''
+        return len(self.code)
+
+class BytecodeCompiler:
+    '''把AST树编译成CodeObject'''
+    def __init__(self):
+        self._program = None    # 正在编译的整个程序的CodeObject
+        self._scope = None      # resolver.Resolver的分析结果，用来判断尾调用能否复用栈帧、赋值是否只涉及一个栈帧
+        self._statements = {
+            'assign':        self._compile_assign_statement,
+            'function_def':  self._compile_function_define,
+            'program':       self._compile_program,
+            'return':        self._compile_return,
+            'python_call':   self._compile_call_statement,
+            'function_call': self._compile_call_statement,
+            'if':            self._compile_if_statement,
+            'while':         self._compile_while_statement,
+        }
+        self._expressions = {
+            'STR':            self._compile_literal,
+            'NUMBER':         self._compile_literal,
+            'TRUE':           self._compile_literal,
+            'FALSE':          self._compile_literal,
+            'ID':             self._compile_ID,
+            'array_item':     self._compile_array_item,
+            'array':          self._compile_array,
+            'argument_list':  self._compile_array,
+            'factor':         self._compile_factor,
+            'term':           self._compile_binary,
+            'expression':     self._compile_binary,
+            'boolfactor':     self._compile_boolfactor,
+            'boolterm':       self._compile_boolterm,
+            'boolexpression': self._compile_boolexpression,
+            'condition':      self._compile_condition,
+            'python_call':    self._compile_python_call,
+            'function_call':  self._compile_function_call,
+            'cse_store':      self._compile_cse_store,
+            'cse_load':       self._compile_cse_load,
+        }
+
+    def compile(self, node : AST.ASTNode, name : str = '<program>'):
+        '''编译整个程序，返回CodeObject'''
+        code = CodeObject(name)
+        self._program = code
+        self._scope = resolver.Resolver().resolve(node)
+        self._compile_statement(code, node)
+        code.emit(LOAD_CONST, code.add_const(None))
+        code.emit(RETURN_VALUE)
+        return code
+
+    def _compile_statement(self, code : CodeObject, node : AST.ASTNode):
+        compile_node = self._statements.get(node.type)
+        if compile_node is not None:
+            lineno = code.lineno
+            if node.lineno is not None:
+                code.lineno = node.lineno
+            compile_node(code, node)
+            code.lineno = lineno
+
+    def _compile_expr(self, code : CodeObject, node : AST.ASTNode):
+        compile_node = self._expressions.get(node.type)
+        if compile_node is None:
+            code.emit(LOAD_CONST, code.add_const(None))
+        else:
+            lineno = code.lineno
+            if node.lineno is not None:
+                code.lineno = node.lineno
+            compile_node(code, node)
+            code.lineno = lineno
+
+    # ---------------------------- 表达式 ----------------------------
+
+    def _compile_literal(self, code : CodeObject, node : AST.ASTNode):
+        code.emit(LOAD_CONST, code.add_const(node.value))
+
+    def _compile_ID(self, code : CodeObject, node : AST.ASTNode):
+        code.emit(LOAD_NAME, code.add_name(node.value))
+
+    def _compile_array_item(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node.children[0])
+        code.emit(LOAD_ITEM, code.add_name(node.value))
+
+    def _compile_array(self, code : CodeObject, node : AST.ASTNode):
+        for child in node.children:
+            self._compile_expr(code, child)
+        code.emit(BUILD_LIST, len(node.children))
+
+    def _compile_factor(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node.children[0])
+        op = {'-': UNARY_NEG, 'atoi': ATOI, 'itoa': ITOA}.get(node.operation)
+        if op is None:
+            code.emit(POP_TOP)
+            code.emit(LOAD_CONST, code.add_const(None))
+        else:
+            code.emit(op)
+
+    def _compile_binary(self, code : CodeObject, node : AST.ASTNode):
+        '''加减乘除'''
+        self._compile_expr(code, node.children[0])
+        self._compile_expr(code, node.children[1])
+        op = {'+': BINARY_ADD, '-': BINARY_SUB, '*': BINARY_MUL, '/': BINARY_DIV}.get(node.operation)
+        if op is None:
+            code.emit(POP_TOP)
+            code.emit(POP_TOP)
+            code.emit(LOAD_CONST, code.add_const(None))
+        else:
+            code.emit(op)
+
+    def _compile_boolfactor(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node.children[0])
+        if node.operation == 'not':
+            code.emit(UNARY_NOT)
+        else:
+            code.emit(POP_TOP)
+            code.emit(LOAD_CONST, code.add_const(None))
+
+    def _compile_boolterm(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node.children[0])
+        self._compile_expr(code, node.children[1])
+        if node.operation in COMPARE_OPS:
+            code.emit(COMPARE, COMPARE_OPS.index(node.operation))
+        else:
+            code.emit(POP_TOP)
+            code.emit(POP_TOP)
+            code.emit(LOAD_CONST, code.add_const(None))
+
+    def _compile_short_circuit(self, code : CodeObject, node : AST.ASTNode, jump_op : int, result):
+        '''and/or：遇到能确定结果的值就跳转，结果总是True或False'''
+        jumps = []
+        for child in node.children:
+            self._compile_expr(code, child)
+            jumps.append(code.emit(jump_op))
+        code.emit(LOAD_CONST, code.add_const(not result))
+        end = code.emit(JUMP)
+        for jump in jumps:
+            code.patch(jump, code.here())
+        code.emit(LOAD_CONST, code.add_const(result))
+        code.patch(end, code.here())
+
+    def _compile_boolexpression(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_short_circuit(code, node, POP_JUMP_IF_FALSE, False)
+
+    def _compile_condition(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_short_circuit(code, node, POP_JUMP_IF_TRUE, True)
+
+    def _compile_python_call(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node.children[0])
+        code.emit(CALL_PYTHON, code.add_const(node.operation))
+
+    def _compile_function_call(self, code : CodeObject, node : AST.ASTNode, call_op : int = CALL_FUNCTION):
+        function_name = node.operation
+        if function_name in BUILTINS:
+            self._compile_expr(code, node.children[0])
+            code.emit(CALL_BUILTIN, BUILTINS.index(function_name))
+            return
+        # 和解释器一样，先检查函数是否存在再计算参数
+        name = code.add_name(function_name)
+        code.emit(CHECK_FUNCTION, name)
+        self._compile_expr(code, node.children[0])
+        code.emit(call_op, name)
+
+    def _compile_cse_store(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node.children[0])
+        code.emit(STORE_TEMP, node.value)
+
+    def _compile_cse_load(self, code : CodeObject, node : AST.ASTNode):
+        code.emit(LOAD_TEMP, node.value)
+
+    # ---------------------------- 语句 ----------------------------
+
+    def _compile_program(self, code : CodeObject, node : AST.ASTNode):
+        for child in node.children:
+            self._compile_statement(code, child)
+
+    def _compile_call_statement(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node)
+        code.emit(POP_TOP)
+
+    def _compile_assign_statement(self, code : CodeObject, node : AST.ASTNode):
+        target = node.children[0]
+        name = code.add_name(target.value)
+        if code is not self._program and not self._scope.static:
+            self._compile_frame_assign(code, node)
+        elif target.type == 'array_item':
+            # 变量存在时检查数组、索引后赋值；不存在时和解释器一样把值赋给全局变量。
+            # 和解释器一样先检查索引再计算右边的表达式，索引不对时右边的表达式不会运行
+            check = code.emit(CHECK_ARRAY, name)
+            code.emit(0, 0) # CHECK_ARRAY的第二个操作数：变量不存在时的跳转目标
+            self._compile_expr(code, target.children[0])
+            code.emit(CHECK_INDEX, name)
+            self._compile_expr(code, node.children[1])
+            code.emit(STORE_ITEM, name)
+            end = code.emit(JUMP)
+            code.patch(check + 2, code.here())
+            self._compile_expr(code, node.children[1])
+            code.emit(STORE_GLOBAL, name)
+            code.patch(end, code.here())
+        else:
+            self._compile_expr(code, node.children[1])
+            code.emit(STORE_NAME, name)
+
+    def _compile_frame_assign(self, code : CodeObject, node : AST.ASTNode):
+        '''
+        函数体中的赋值，作用域分析不能确定变量只在一个栈帧中时使用
+
+        和解释器一样从栈顶往下给每个有这个变量的栈帧赋值，每次都重新计算索引和右边的表达式；
+        最外层的代码运行时栈中只有全局栈帧，STORE_NAME只计算一次就够了
+        '''
+        target = node.children[0]
+        name = code.add_name(target.value)
+        find = code.emit(FIND_FRAME, name)
+        code.emit(0, 0) # FIND_FRAME的第二个操作数：变量不存在时的跳转目标
+        loop = code.here()
+        if target.type == 'array_item':
+            code.emit(CHECK_FRAME_ARRAY, name)
+            self._compile_expr(code, target.children[0])
+            code.emit(CHECK_FRAME_INDEX, name)
+            self._compile_expr(code, node.children[1])
+            code.emit(STORE_FRAME_ITEM, name)
+        else:
+            self._compile_expr(code, node.children[1])
+            code.emit(STORE_FRAME, name)
+        code.emit(NEXT_FRAME, name)
+        code.emit(0, loop)
+        end = code.emit(JUMP)
+        code.patch(find + 2, code.here())
+        self._compile_expr(code, node.children[1])
+        code.emit(STORE_GLOBAL, name)
+        code.patch(end, code.here())
+
+    def _compile_function_define(self, code : CodeObject, node : AST.ASTNode):
+        '''函数声明，参数检查在编译期完成，出错时在运行到声明处再报错'''
+        function_name = node.operation
+        argument_names = []
+        error = None
+        if function_name in BUILTINS:
+            error = f'函数 {function_name} 是内置函数'
+        else:
+            for arg in node.children[0].children:
+                if arg.type != 'ID':
+                    error = f"函数 {function_name} 中有 {arg.type} ,希望是一个标识符"
+                    break
+                if arg.value in argument_names:
+                    error = f"在函数 {function_name} 中，{arg.value} 重复定义"
+                    break
+                argument_names.append(arg.value)
+        if error is not None:
+            code.emit(RAISE, code.add_const(error))
+            return
+
+        function = CodeObject(function_name, argument_names)
+        self._compile_statement(function, node.children[1])
+        function.emit(LOAD_CONST, function.add_const(None))
+        function.emit(RETURN_VALUE)
+        code.emit(MAKE_FUNCTION, code.add_const(function))
+
+    def _compile_return(self, code : CodeObject, node : AST.ASTNode):
+        if node.children and self._is_tail_call(code, node.children[0]):
+            self._compile_function_call(code, node.children[0], TAIL_CALL)
+            return
+        if node.children:
+            self._compile_expr(code, node.children[0])
+        else:
+            code.emit(LOAD_CONST, code.add_const(None))
+        code.emit(RETURN_VALUE)
+
+    def _is_tail_call(self, code : CodeObject, node : AST.ASTNode):
+        '''函数体中return f(...)的f不需要当前函数的栈帧时，可以编译成TAIL_CALL'''
+        return (code is not self._program and node.type == 'function_call' and node.operation not in BUILTINS
+                and self._scope.tail_call_safe(code.arguments, node.operation))
+
+    def _compile_if_statement(self, code : CodeObject, node : AST.ASTNode):
+        self._compile_expr(code, node.children[0])
+        jump_else = code.emit(POP_JUMP_IF_FALSE)
+        self._compile_statement(code, node.children[1])
+        if len(node.children) == 3:
+            jump_end = code.emit(JUMP)
+            code.patch(jump_else, code.here())
+            self._compile_statement(code, node.children[2])
+            code.patch(jump_end, code.here())
+        else:
+            code.patch(jump_else, code.here())
+
+    def _compile_while_statement(self, code : CodeObject, node : AST.ASTNode):
+        start = code.here()
+        self._compile_expr(code, node.children[0])
+        jump_end = code.emit(POP_JUMP_IF_FALSE)
+        self._compile_statement(code, node.children[1])
+        code.emit(JUMP, start)
+        code.patch(jump_end, code.here())
+
+# ---------------------------- 虚拟机 ----------------------------
+
+# VM.run和VM.resume暂停时的返回值
+SUSPENDED = object()
+# VM.waiting[0]：暂停的原因
+WAIT_INPUT = 'input'    # 等待输入一行，提示已经输出
+WAIT_PYTHON = 'python'  # 等待外部脚本的结果，VM.waiting为(WAIT_PYTHON, 脚本路径, 参数)
+
+class VM:
+    '''
+    运行CodeObject的栈式虚拟机
+
+    变量仍然存放在Interpreter.variables中，查找规则和逐节点解释时相同；
+    函数调用时把当前的(字节码, 指令位置, 操作数栈, 尾调用记录)压入虚拟机自己的调用栈，不会递归调用Python函数。
+    TAIL_CALL不压栈，用被调用函数的栈帧替换当前的栈帧，所以尾递归只占用固定的空间；
+    被替换掉的函数名按[函数名, 连续次数]记在尾调用记录中，出错时和普通调用一样逐层包装
+
+    suspend为True时，遇到input和外部脚本调用不会阻塞，而是保存当前状态并返回SUSPENDED，
+    waiting说明在等什么；调用者拿到结果后用resume（出错时用throw）继续运行
+    '''
+    def __init__(self, interpreter, suspend : bool = False):
+        self._interpreter = interpreter
+        self.suspend = suspend
+        self.waiting = None
+        self._frame = None  # 当前的(code, pc, stack, tail)
+        self._calls = []    # 调用者的(code, pc, stack, tail)
+
+    def run(self, code : CodeObject):
+        '''从头运行程序，返回程序的返回值，暂停时返回SUSPENDED'''
+        self._frame = (code, 0, [], None)
+        self._calls = []
+        return self._execute()
+
+    def resume(self, value):
+        '''把等待的结果（输入的一行或脚本的输出）作为input或外部脚本调用的值，继续运行'''
+        self.waiting = None
+        self._frame[2].append(value)
+        return self._execute()
+
+    def throw(self, error : Exception):
+        '''等待的外部脚本出错，在暂停的地方抛出error，和不暂停时一样逐层包装后抛出'''
+        self.waiting = None
+        return self._execute(error)
+
+    def _execute(self, error : Exception = None):
+        interpreter = self._interpreter
+        variables = interpreter.variables
+        functions = interpreter.functions
+        builtins = (interpreter._builtin_print, interpreter._builtin_input, interpreter._builtin_len)
+        run_python_script = interpreter._run_python_script
+        suspend = self.suspend
+
+        calls = self._calls  # 调用栈，每项是(code, pc, stack, tail)
+        # tail是当前函数尾调用时替换掉的函数：[[函数名, 连续次数], ...]，越后面越靠里，没有时为None
+        code, pc, stack, tail = self._frame
+        instructions = code.code
+        consts = code.consts
+        names = code.names
+        push = stack.append
+        pop = stack.pop
+        # optimizer复用的子表达式的值；这些表达式中没有函数调用和input，不会跨过暂停
+        temps = {}
+
+        try:
+            if error is not None:
+                raise error
+            while True:
+                op = instructions[pc]
+                arg = instructions[pc + 1]
+                pc += 2
+
+                if op == LOAD_NAME:
+                    name = names[arg]
+                    frame = variables[-1]
+                    if name in frame:
+                        push(frame[name])
+                    else:
+                        push(operations.load_name(variables, name))
+                elif op == LOAD_CONST:
+                    push(consts[arg])
+                elif op == STORE_NAME:
+                    if len(variables) == 1:
+                        variables[0][names[arg]] = pop()
+                    else:
+                        operations.store_name(variables, names[arg], pop())
+                elif op == POP_JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == JUMP:
+                    pc = arg
+                elif op == BINARY_ADD:
+                    val2 = pop()
+                    val1 = stack[-1]
+                    if type(val1) is int and type(val2) is int:
+                        stack[-1] = val1 + val2
+                    else:
+                        stack[-1] = operations.add(val1, val2)
+                elif op == BINARY_SUB:
+                    val2 = pop()
+                    val1 = stack[-1]
+                    if type(val1) is int and type(val2) is int:
+                        stack[-1] = val1 - val2
+                    else:
+                        stack[-1] = operations.subtract(val1, val2)
+                elif op == COMPARE:
+                    val2 = pop()
+                    val1 = stack[-1]
+                    if type(val1) is int and type(val2) is int:
+                        if arg == 2:
+                            stack[-1] = val1 < val2
+                        elif arg == 4:
+                            stack[-1] = val1 > val2
+                        else:
+                            stack[-1] = operations.compare(arg, val1, val2)
+                    else:
+                        stack[-1] = operations.compare(arg, val1, val2)
+                elif op == BINARY_MUL:
+                    val2 = pop()
+                    val1 = stack[-1]
+                    if type(val1) is int and type(val2) is int:
+                        stack[-1] = val1 * val2
+                    else:
+                        stack[-1] = operations.multiply(val1, val2)
+                elif op == BINARY_DIV:
+                    val2 = pop()
+                    stack[-1] = operations.divide(stack[-1], val2)
+                elif op == POP_JUMP_IF_TRUE:
+                    if pop():
+                        pc = arg
+                elif op == BUILD_LIST:
+                    if arg:
+                        items = stack[-arg:]
+                        del stack[-arg:]
+                        push(items)
+                    else:
+                        push([])
+                elif op == LOAD_ITEM:
+                    stack[-1] = operations.load_item(variables, names[arg], stack[-1])
+                elif op == CHECK_FUNCTION:
+                    if names[arg] not in functions:
+                        raise Exception(f'{names[arg]} 未定义，无法调用')
+                elif op == CALL_FUNCTION:
+                    function_name = names[arg]
+                    arguments = pop()
+                    function = functions[function_name]
+                    defined_arguments = function['arguments']
+                    if len(arguments) != len(defined_arguments):
+                        raise Exception(f"{function_name} 函数的参数不匹配")
+                    # 保存当前位置，切换到函数体
+                    calls.append((code, pc, stack, tail))
+                    variables.append(dict(zip(defined_arguments, arguments)))
+                    code = function['code']
+                    instructions = code.code
+                    consts = code.consts
+                    names = code.names
+                    pc = 0
+                    stack = []
+                    push = stack.append
+                    pop = stack.pop
+                    tail = None
+                elif op == TAIL_CALL:
+                    function_name = names[arg]
+                    arguments = pop()
+                    function = functions[function_name]
+                    defined_arguments = function['arguments']
+                    if len(arguments) != len(defined_arguments):
+                        raise Exception(f"{function_name} 函数的参数不匹配")
+                    # 记下被替换的函数，自己递归时只增加次数
+                    if tail is None:
+                        tail = [[code.name, 1]]
+                    elif tail[-1][0] == code.name:
+                        tail[-1][1] += 1
+                    else:
+                        tail.append([code.name, 1])
+                    # 编译时已经确认被调用的函数用不到当前栈帧中的参数；return语句执行时操作数栈是空的，可以接着用
+                    variables[-1] = dict(zip(defined_arguments, arguments))
+                    code = function['code']
+                    instructions = code.code
+                    consts = code.consts
+                    names = code.names
+                    pc = 0
+                elif op == RETURN_VALUE:
+                    value = pop()
+                    if not calls:
+                        return value
+                    # 回到调用者
+                    variables.pop()
+                    code, pc, stack, tail = calls.pop()
+                    instructions = code.code
+                    consts = code.consts
+                    names = code.names
+                    push = stack.append
+                    pop = stack.pop
+                    push(value)
+                elif op == POP_TOP:
+                    pop()
+                elif op == CALL_BUILTIN:
+                    if suspend and arg == 1:
+                        # input：输出提示后暂停
+                        builtins[0](pop())
+                        self._frame = (code, pc, stack, tail)
+                        self.waiting = (WAIT_INPUT,)
+                        return SUSPENDED
+                    stack[-1] = builtins[arg](stack[-1])
+                elif op == UNARY_NOT:
+                    stack[-1] = not stack[-1]
+                elif op == UNARY_NEG:
+                    stack[-1] = operations.negative(stack[-1])
+                elif op == ATOI:
+                    stack[-1] = operations.atoi(stack[-1])
+                elif op == ITOA:
+                    stack[-1] = str(stack[-1])
+                elif op == CALL_PYTHON:
+                    if suspend:
+                        self._frame = (code, pc, stack, tail)
+                        self.waiting = (WAIT_PYTHON, consts[arg], pop())
+                        return SUSPENDED
+                    stack[-1] = run_python_script(consts[arg], stack[-1])
+                elif op == CHECK_ARRAY:
+                    target = instructions[pc + 1]
+                    pc += 2
+                    if not operations.find_array(variables, names[arg]):
+                        pc = target
+                elif op == CHECK_INDEX:
+                    operations.check_index(names[arg], operations.load_name(variables, names[arg]), stack[-1])
+                elif op == STORE_ITEM:
+                    value = pop()
+                    operations.store_item(variables, names[arg], pop(), value)
+                elif op == STORE_GLOBAL:
+                    variables[0][names[arg]] = pop()
+                elif op == FIND_FRAME:
+                    target = instructions[pc + 1]
+                    pc += 2
+                    index = operations.find_frame(variables, names[arg], len(variables) - 1)
+                    if index < 0:
+                        pc = target
+                    else:
+                        push(index)
+                elif op == NEXT_FRAME:
+                    target = instructions[pc + 1]
+                    pc += 2
+                    index = operations.find_frame(variables, names[arg], pop() - 1)
+                    if index >= 0:
+                        push(index)
+                        pc = target
+                elif op == STORE_FRAME:
+                    value = pop()
+                    variables[stack[-1]][names[arg]] = value
+                elif op == CHECK_FRAME_ARRAY:
+                    push(operations.check_array(names[arg], variables[stack[-1]].get(names[arg])))
+                elif op == CHECK_FRAME_INDEX:
+                    operations.check_index(names[arg], stack[-2], stack[-1])
+                elif op == STORE_FRAME_ITEM:
+                    value = pop()
+                    idx = pop()
+                    pop()
+                    variables[stack[-1]][names[arg]][idx] = value
+                elif op == MAKE_FUNCTION:
+                    function = consts[arg]
+                    functions[function.name] = {
+                        'arguments': function.arguments,
+                        'code': function,
+                    }
+                elif op == RAISE:
+                    raise Exception(consts[arg])
+                elif op == STORE_TEMP:
+                    temps[arg] = stack[-1]
+                elif op == LOAD_TEMP:
+                    push(temps[arg])
+                else:
+                    raise Exception(f"未知的字节码 {op}")
+        except Exception as e:
+            # 和解释器一样，每一层DSL函数都把异常包装成“函数运行中出错”，尾调用替换掉的函数也算一层
+            error = e
+            while calls:
+                variables.pop()
+                error = _wrap_function_error(error, code.name)
+                for function_name, count in reversed(tail or ()):
+                    for _ in range(count):
+                        error = _wrap_function_error(error, function_name)
+                code, _, _, tail = calls.pop()
+        raise error
+
+def _wrap_function_error(error : Exception, function_name : str):
+    wrapped = Exception(f"函数 {function_name} 运行中出错")
+    wrapped.__context__ = error
+    return wrapped
+
+# ---------------------------- 会话的保存和恢复 ----------------------------
+
+# 保存的会话的格式版本
+SESSION_VERSION = 2
+
+def code_objects(program : CodeObject):
+    '''程序和其中所有函数的字节码，按先序排列；同一个程序每次编译的顺序都相同'''
+    result = []
+    pending = [program]
+    while pending:
+        code = pending.pop()
+        result.append(code)
+        pending.extend(reversed([const for const in code.consts if isinstance(const, CodeObject)]))
+    return result
+
+def program_digest(program : CodeObject):
+    '''程序的哈希值，保存的会话只能在哈希值相同的程序中恢复'''
+    if program.digest is None:
+        import hashlib # 只有保存会话时用到
+        codes = code_objects(program)
+        index = {id(code): i for i, code in enumerate(codes)}
+        items = [(code.name, code.arguments, code.code.tobytes(), code.names,
+                  [('code', index[id(const)]) if isinstance(const, CodeObject) else const for const in code.consts])
+                 for code in codes]
+        program.digest = hashlib.sha256(marshal.dumps(items)).hexdigest()
+    return program.digest
+
+def dumps_session(vm : VM, program : CodeObject) -> bytes:
+    '''
+    把在input处暂停的会话保存成二进制数据
+
+    保存变量栈帧、定义过的函数和虚拟机的调用栈，字节码用它在program中的序号表示。
+    数组原样保存，marshal会保留多个变量指向同一个数组的关系
+    '''
+    if vm.waiting is None or vm.waiting[0] != WAIT_INPUT:
+        raise Exception("只能保存在input处暂停的会话")
+    index = {id(code): i for i, code in enumerate(code_objects(program))}
+    interpreter = vm._interpreter
+    functions = {name: index[id(function['code'])] for name, function in interpreter.functions.items()}
+    frames = [(index[id(code)], pc, stack, tail) for code, pc, stack, tail in vm._calls + [vm._frame]]
+    return marshal.dumps((SESSION_VERSION, program_digest(program), interpreter.variables, functions, frames))
+
+def loads_session(interpreter, program : CodeObject, data : bytes) -> VM:
+    '''
+    在interpreter中恢复dumps_session保存的会话，返回等待输入的虚拟机，用resume传入输入的一行继续运行
+
+    interpreter可以是另一个进程中新建的解释器，原来的变量和函数会被替换
+    '''
+    try:
+        version, digest, variables, functions, frames = marshal.loads(data)
+    except (ValueError, EOFError, TypeError):
+        raise Exception("会话数据已损坏")
+    if version != SESSION_VERSION:
+        raise Exception(f"不支持的会话格式版本 {version}")
+    if digest != program_digest(program):
+        raise Exception("会话不是由这个程序保存的")
+    codes = code_objects(program)
+    interpreter.variables = variables
+    interpreter.functions = {name: {'arguments': codes[i].arguments, 'code': codes[i]}
+                             for name, i in functions.items()}
+    vm = VM(interpreter, suspend=True)
+    frames = [(codes[i], pc, stack, tail) for i, pc, stack, tail in frames]
+    vm._frame = frames.pop()
+    vm._calls = frames
+    vm.waiting = (WAIT_INPUT,)
+    return vm
+
+# ---------------------------- 反汇编 ----------------------------
+
+def disassemble(code : CodeObject, file=None):
+    '''打印字节码，函数体在后面依次打印'''
+    file = file if file is not None else sys.stdout
+    targets = set()
+    for pc in range(0, len(code.code), 2):
+        op, arg = code.code[pc], code.code[pc + 1]
+        if op in JUMP_OPS:
+            targets.add(arg)
+        if op in WIDE_OPS:
+            targets.add(code.code[pc + 3])
+
+    print(f"Disassembly of {code.name}({', '.join(code.arguments)}):", file=file)
+    functions = []
+    pc = 0
+    while pc < len(code.code):
+        op, arg = code.code[pc], code.code[pc + 1]
+        label = '>>' if pc in targets else '  '
+        detail = ''
+        if op in NAME_OPS:
+            detail = f'({code.names[arg]})'
+        elif op in CONST_OPS:
+            const = code.consts[arg]
+            if isinstance(const, CodeObject):
+                functions.append(const)
+                detail = f'(<code {const.name}>)'
+            else:
+                detail = f'({const!r})'
+        elif op == COMPARE:
+            detail = f'({COMPARE_OPS[arg]})'
+        elif op == CALL_BUILTIN:
+            detail = f'({BUILTINS[arg]})'
+        elif op in JUMP_OPS:
+            detail = f'(to {arg})'
+        if op in WIDE_OPS:
+            detail += f' (to {code.code[pc + 3]})'
+        print(f'{label} {pc:>5} {OPNAMES[op]:<18} {arg:>4} {detail}'.rstrip(), file=file)
+        pc += 4 if op in WIDE_OPS else 2
+
+    for function in functions:
+        print(file=file)
+        disassemble(function, file)
+
+# 示例用法
+if __name__ == '__main__':
+    import lexer, parser
+    if len(sys.argv) < 2:
+        raise Exception("需要输入您的代码文件")
+    elif len(sys.argv) > 2:
+        raise Exception("您输入的文件太多了")
+    else :
+        with open(sys.argv[1], 'r', encoding='utf-8') as file:
+            source = file.read()
+        node = parser.Parser(lexer.Lexer()).parse(source)
+        disassemble(BytecodeCompiler().compile(node))
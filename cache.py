@@ -0,0 +1,50 @@
+# cache.py
+# 这个模块管理编译结果的磁盘缓存。
+# 缓存文件放在脚本所在目录的__dslcache__中，文件名是源代码和编译器版本的哈希值，
+# 源代码没有变化时直接读取缓存，跳过词法分析、语法分析和编译。
+import os, sys
+
+CACHE_DIR = '__dslcache__'
+
+def source_key(code : str, *versions):
+    '''根据源代码和各个编译器版本计算缓存键'''
+    import hashlib # 只有用到缓存的运行模式需要，不在启动时导入
+    digest = hashlib.sha256()
+    for version in versions:
+        digest.update(str(version).encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(code.encode('utf-8'))
+    return digest.hexdigest()
+
+def file_digest(path : str):
+    '''按块读入文件计算哈希值，可以代替源代码传给source_key，不需要把整个文件读进内存'''
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_path(source_path : str, key : str, suffix : str):
+    '''缓存文件路径，suffix区分不同种类的缓存'''
+    directory = os.path.join(os.path.dirname(os.path.abspath(source_path)), CACHE_DIR)
+    return os.path.join(directory, f'{key}.{sys.implementation.cache_tag}{suffix}')
+
+def load(path : str):
+    '''读取缓存，不存在时返回None'''
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except OSError:
+        return None
+
+def store(path : str, data : bytes):
+    '''写入缓存，先写临时文件再替换，写不进去时直接放弃'''
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
@@ -0,0 +1,658 @@
+# compiler.py
+# 这个模块把AST树编译成嵌套的Python闭包。
+# 节点类型和运算符都在编译期确定，运行时不再需要逐个比较node.type字符串。
+# 作用域分析通过时，变量在编译期绑定到槽位，栈帧是定长的数组，访问变量不再随调用深度变慢。
+import AST, resolver, memo
+import operator
+
+# 内置函数名，和Interpreter中的判断保持一致
+BUILTINS = ('print', 'input', 'len')
+
+# 还没有赋值的全局槽位
+_UNSET = object()
+
+class Compiler:
+    '''
+    把AST树编译成闭包，运行语义与Interpreter逐节点解释完全一致
+
+    表达式编译成无参函数，调用后返回表达式的值；
+    语句也编译成无参函数，正常执行完返回None，执行了return语句时返回(返回值,)
+
+    resolver.Resolver分析通过时使用槽位：全局变量存放在globals数组中，
+    函数的栈帧就是参数数组，当前栈帧放在current[0]中；否则和解释器一样使用Interpreter.variables
+    '''
+    def __init__(self, interpreter):
+        self._interpreter = interpreter
+        self._resolver = None
+        self.globals = []   # 全局槽位
+        self.current = [None]   # 当前函数的栈帧
+        self._statements = {
+            'assign':        self._compile_assign_statement,
+            'function_def':  self._compile_function_define,
+            'program':       self._compile_program,
+            'return':        self._compile_return,
+            'python_call':   self._compile_call_statement,
+            'function_call': self._compile_call_statement,
+            'if':            self._compile_if_statement,
+            'while':         self._compile_while_statement,
+        }
+        self._expressions = {
+            'STR':            self._compile_literal,
+            'NUMBER':         self._compile_literal,
+            'TRUE':           self._compile_literal,
+            'FALSE':          self._compile_literal,
+            'ID':             self._compile_ID,
+            'array_item':     self._compile_array_item,
+            'array':          self._compile_array,
+            'argument_list':  self._compile_array,
+            'factor':         self._compile_factor,
+            'term':           self._compile_term,
+            'expression':     self._compile_expression,
+            'boolfactor':     self._compile_boolfactor,
+            'boolterm':       self._compile_boolterm,
+            'boolexpression': self._compile_boolexpression,
+            'condition':      self._compile_condition,
+            'python_call':    self._compile_python_call,
+            'function_call':  self._compile_function_call,
+            'cse_store':      self._compile_cse_store,
+            'cse_load':       self._compile_cse_load,
+        }
+        self._temps = {}    # optimizer复用的子表达式的槽位 -> 存放值的单元
+
+    def compile(self, node : AST.ASTNode):
+        '''编译整个程序，返回可以直接调用的闭包'''
+        scope = resolver.Resolver().resolve(node)
+        if scope.static:
+            self._resolver = scope
+            self.globals[:] = [_UNSET] * len(scope.globals)
+        program = self._compile_statement(node)
+        def run():
+            program()
+        return run
+
+    def _compile_statement(self, node : AST.ASTNode):
+        '''编译一条语句，未知的节点类型什么也不做'''
+        compile_node = self._statements.get(node.type)
+        if compile_node is None:
+            return lambda: None
+        return compile_node(node)
+
+    def _compile_expr(self, node : AST.ASTNode):
+        '''编译一个表达式，未知的节点类型值为None'''
+        compile_node = self._expressions.get(node.type)
+        if compile_node is None:
+            return lambda: None
+        return compile_node(node)
+
+    # ---------------------------- 表达式 ----------------------------
+
+    def _compile_literal(self, node : AST.ASTNode):
+        '''常量直接返回值'''
+        value = node.value
+        return lambda: value
+
+    def _compile_ID(self, node : AST.ASTNode):
+        '''变量从栈顶开始查找'''
+        name = node.value
+        if self._resolver is not None:
+            kind, slot = self._resolver.binding(node)
+            if kind == resolver.LOCAL:
+                current = self.current
+                return lambda: current[0][slot]
+            global_slots = self.globals
+            def load_global():
+                value = global_slots[slot]
+                if value is _UNSET:
+                    raise Exception(f"变量 {name} 未赋值")
+                return value
+            return load_global
+
+        variables = self._interpreter.variables
+        def load():
+            frame = variables[-1]
+            if name in frame:
+                return frame[name]
+            for i in range(len(variables) - 2, -1, -1):
+                if name in variables[i]:
+                    return variables[i][name]
+            raise Exception(f"变量 {name} 未赋值")
+        return load
+
+    def _compile_array_item(self, node : AST.ASTNode):
+        '''数组元素，子节点是索引表达式'''
+        name = node.value
+        index = self._compile_expr(node.children[0])
+        if self._resolver is not None:
+            return self._compile_resolved_item(node, name, index)
+        variables = self._interpreter.variables
+        def load():
+            idx = index()
+            if not isinstance(idx, int):
+                raise Exception(f"数组 {name} 的索引 {idx} 不是一个数字")
+            for i in range(len(variables) - 1, -1, -1):
+                if name in variables[i]:
+                    m = variables[i][name]
+                    if isinstance(m, (int, float)):
+                        raise Exception(f"变量 {name} 是一个数而不是数组")
+                    if len(m) <= idx or idx < 0:
+                        raise Exception(f"数组 {name} 没有第 {idx} 项")
+                    return m[idx]
+            raise Exception(f"没有找到变量 {name}")
+        return load
+
+    def _compile_resolved_item(self, node : AST.ASTNode, name : str, index):
+        '''绑定到槽位的数组元素'''
+        load_slot = self._slot_loader(node)
+        def load():
+            idx = index()
+            if not isinstance(idx, int):
+                raise Exception(f"数组 {name} 的索引 {idx} 不是一个数字")
+            m = load_slot()
+            if m is _UNSET:
+                raise Exception(f"没有找到变量 {name}")
+            if isinstance(m, (int, float)):
+                raise Exception(f"变量 {name} 是一个数而不是数组")
+            if len(m) <= idx or idx < 0:
+                raise Exception(f"数组 {name} 没有第 {idx} 项")
+            return m[idx]
+        return load
+
+    def _slot_loader(self, node : AST.ASTNode):
+        '''读取节点绑定的槽位，全局变量没有赋值时返回_UNSET'''
+        kind, slot = self._resolver.binding(node)
+        if kind == resolver.LOCAL:
+            current = self.current
+            return lambda: current[0][slot]
+        global_slots = self.globals
+        return lambda: global_slots[slot]
+
+    def _slot_storer(self, node : AST.ASTNode):
+        '''返回给节点绑定的槽位赋值的函数'''
+        kind, slot = self._resolver.binding(node)
+        if kind == resolver.LOCAL:
+            current = self.current
+            def store_local(value):
+                current[0][slot] = value
+            return store_local
+        global_slots = self.globals
+        def store_global(value):
+            global_slots[slot] = value
+        return store_global
+
+    def _compile_array(self, node : AST.ASTNode):
+        '''数组和参数列表，按顺序求出每一项'''
+        items = [self._compile_expr(child) for child in node.children]
+        if self._interpreter._can_gather_python_calls(node):
+            gather = self._interpreter._gather_python_calls
+            calls = [(child.operation, self._compile_expr(child.children[0])) if child.type == 'python_call'
+                     else (None, item) for child, item in zip(node.children, items)]
+            return lambda: gather(calls)
+        if len(items) == 0:
+            return lambda: []
+        if len(items) == 1:
+            item0, = items
+            return lambda: [item0()]
+        if len(items) == 2:
+            item0, item1 = items
+            return lambda: [item0(), item1()]
+        return lambda: [item() for item in items]
+
+    def _compile_factor(self, node : AST.ASTNode):
+        '''一元运算：取负、atoi和itoa'''
+        operand = self._compile_expr(node.children[0])
+        if node.operation == '-':
+            def negative():
+                val = operand()
+                if isinstance(val, (int, float)):
+                    return -val
+                raise Exception(f"{val} 不是数，无法取负值")
+            return negative
+
+        if node.operation == 'atoi':
+            def atoi():
+                val = operand()
+                if not isinstance(val, str):
+                    raise Exception(f"{val} 不是字符串, 操作符atoi出错")
+                try:
+                    return int(val)
+                except ValueError:
+                    try:
+                        return float(val)
+                    except ValueError:
+                        raise Exception(f"字符串 '{val}' 无法转换成数字")
+            return atoi
+
+        if node.operation == 'itoa':
+            return lambda: str(operand())
+
+        def unknown():
+            operand()
+        return unknown
+
+    def _compile_term(self, node : AST.ASTNode):
+        '''乘除法'''
+        left = self._compile_expr(node.children[0])
+        right = self._compile_expr(node.children[1])
+        if node.operation == '*':
+            def multiply():
+                val1 = left()
+                val2 = right()
+                if type(val1) is int and type(val2) is int:
+                    return val1 * val2
+                if isinstance(val1, int) or isinstance(val2, int):
+                    return val1 * val2
+                if isinstance(val1, float) and isinstance(val2, float):
+                    return val1 * val2
+                raise Exception(f"{val1} 和 {val2} 无法做乘法")
+            return multiply
+
+        if node.operation == '/':
+            def divide():
+                val1 = left()
+                val2 = right()
+                if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+                    if val2 == 0:
+                        raise Exception(f"除数不能为零 ({val1} / {val2})")
+                    return val1 / val2
+                raise Exception(f"{val1} 和 {val2} 无法做除法")
+            return divide
+
+        return self._compile_unknown_binary(left, right)
+
+    def _compile_expression(self, node : AST.ASTNode):
+        '''加减法'''
+        left = self._compile_expr(node.children[0])
+        right = self._compile_expr(node.children[1])
+        if node.operation == '+':
+            def add():
+                val1 = left()
+                val2 = right()
+                if type(val1) is int and type(val2) is int:
+                    return val1 + val2
+                if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+                    return val1 + val2
+                if isinstance(val1, str) and isinstance(val2, str):
+                    return val1 + val2
+                if isinstance(val1, list) and isinstance(val2, list):
+                    return val1 + val2
+                raise Exception(f"{val1} 和 {val2} 类型不一致，不能进行加法")
+            return add
+
+        if node.operation == '-':
+            def subtract():
+                val1 = left()
+                val2 = right()
+                if type(val1) is int and type(val2) is int:
+                    return val1 - val2
+                if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+                    return val1 - val2
+                raise Exception(f"{val1} 和 {val2} 不是全数，不能进行减法")
+            return subtract
+
+        return self._compile_unknown_binary(left, right)
+
+    def _compile_boolfactor(self, node : AST.ASTNode):
+        '''not取反'''
+        operand = self._compile_expr(node.children[0])
+        if node.operation == 'not':
+            return lambda: not operand()
+        def unknown():
+            operand()
+        return unknown
+
+    def _compile_boolterm(self, node : AST.ASTNode):
+        '''比较运算'''
+        left = self._compile_expr(node.children[0])
+        right = self._compile_expr(node.children[1])
+        operation = node.operation
+        if operation == '==':
+            return lambda: left() == right()
+        if operation == '!=':
+            return lambda: left() != right()
+
+        compare = _COMPARISONS.get(operation)
+        if compare is None:
+            return self._compile_unknown_binary(left, right)
+        def boolterm():
+            val1 = left()
+            val2 = right()
+            if type(val1) is int and type(val2) is int:
+                return compare(val1, val2)
+            if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+                return compare(val1, val2)
+            if isinstance(val1, str) and isinstance(val2, str):
+                return compare(val1, val2)
+            if isinstance(val1, list) and isinstance(val2, list):
+                return compare(val1, val2)
+            raise Exception(f"{val1} 和 {val2} 之间不能使用{operation}运算符")
+        return boolterm
+
+    def _compile_boolexpression(self, node : AST.ASTNode):
+        '''并运算，遇到假值立即返回False'''
+        operands = [self._compile_expr(child) for child in node.children]
+        if len(operands) == 2:
+            first, second = operands
+            return lambda: True if first() and second() else False
+        def boolexpression():
+            for operand in operands:
+                if not operand():
+                    return False
+            return True
+        return boolexpression
+
+    def _compile_condition(self, node : AST.ASTNode):
+        '''或运算，遇到真值立即返回True'''
+        operands = [self._compile_expr(child) for child in node.children]
+        if len(operands) == 2:
+            first, second = operands
+            return lambda: True if first() or second() else False
+        def condition():
+            for operand in operands:
+                if operand():
+                    return True
+            return False
+        return condition
+
+    def _temp_cell(self, slot : int):
+        cell = self._temps.get(slot)
+        if cell is None:
+            cell = self._temps[slot] = [None]
+        return cell
+
+    def _compile_cse_store(self, node : AST.ASTNode):
+        '''求值后存起来，同一个表达式中后面的cse_load直接使用'''
+        operand = self._compile_expr(node.children[0])
+        cell = self._temp_cell(node.value)
+        def store():
+            value = cell[0] = operand()
+            return value
+        return store
+
+    def _compile_cse_load(self, node : AST.ASTNode):
+        cell = self._temp_cell(node.value)
+        return lambda: cell[0]
+
+    def _compile_unknown_binary(self, left, right):
+        '''不认识的二元运算符，和解释器一样求值后返回None'''
+        def unknown():
+            left()
+            right()
+        return unknown
+
+    def _compile_python_call(self, node : AST.ASTNode):
+        '''调用外部python脚本'''
+        script_path = node.operation
+        arguments = self._compile_expr(node.children[0])
+        run_python_script = self._interpreter._run_python_script
+        return lambda: run_python_script(script_path, arguments())
+
+    def _compile_function_call(self, node : AST.ASTNode):
+        '''函数调用，内置函数在编译期就确定'''
+        function_name = node.operation
+        arguments = self._compile_expr(node.children[0])
+        interpreter = self._interpreter
+
+        if function_name == 'print':
+            builtin_print = interpreter._builtin_print
+            return lambda: builtin_print(arguments())
+        if function_name == 'input':
+            builtin_input = interpreter._builtin_input
+            return lambda: builtin_input(arguments())
+        if function_name == 'len':
+            builtin_len = interpreter._builtin_len
+            return lambda: builtin_len(arguments())
+
+        functions = interpreter.functions
+        if self._resolver is not None:
+            return self._compile_resolved_call(function_name, arguments)
+        variables = interpreter.variables
+        def call():
+            if function_name not in functions:
+                raise Exception(f'{function_name} 未定义，无法调用')
+            values = arguments()
+            function = functions[function_name]
+            defined_arguments = function['arguments']
+            if len(values) != len(defined_arguments):
+                raise Exception(f"{function_name} 函数的参数不匹配")
+            memo_cache = function['memo']
+            if memo_cache is not None:
+                key = memo_cache.key(values)
+                value = memo_cache.lookup(key)
+                if value is not memo.MISSING:
+                    return value
+
+            # 设置栈帧
+            variables.append(dict(zip(defined_arguments, values)))
+            try:
+                result = function['code']()
+            except Exception:
+                raise Exception(f"函数 {function_name} 运行中出错")
+            finally:
+                # 弹出栈帧
+                variables.pop()
+            value = result[0] if result is not None else None
+            if memo_cache is not None:
+                memo_cache.store(key, values, value)
+            return value
+        return call
+
+    def _compile_resolved_call(self, function_name : str, arguments):
+        '''调用使用槽位的函数，参数数组直接作为新的栈帧'''
+        functions = self._interpreter.functions
+        current = self.current
+        def call():
+            if function_name not in functions:
+                raise Exception(f'{function_name} 未定义，无法调用')
+            values = arguments()
+            function = functions[function_name]
+            if len(values) != len(function['arguments']):
+                raise Exception(f"{function_name} 函数的参数不匹配")
+            memo_cache = function['memo']
+            if memo_cache is not None:
+                key = memo_cache.key(values)
+                value = memo_cache.lookup(key)
+                if value is not memo.MISSING:
+                    return value
+
+            caller = current[0]
+            current[0] = values
+            try:
+                result = function['code']()
+            except Exception:
+                raise Exception(f"函数 {function_name} 运行中出错")
+            finally:
+                current[0] = caller
+            value = result[0] if result is not None else None
+            if memo_cache is not None:
+                memo_cache.store(key, values, value)
+            return value
+        return call
+
+    # ---------------------------- 语句 ----------------------------
+
+    def _compile_program(self, node : AST.ASTNode):
+        '''一段程序，遇到return立即把结果交给上层'''
+        statements = [self._compile_statement(child) for child in node.children]
+        if len(statements) == 1:
+            return statements[0]
+        def program():
+            for statement in statements:
+                result = statement()
+                if result is not None:
+                    return result
+            return None
+        return program
+
+    def _compile_call_statement(self, node : AST.ASTNode):
+        '''作为语句的函数调用和脚本调用，丢弃返回值'''
+        call = self._compile_expr(node)
+        def statement():
+            call()
+        return statement
+
+    def _compile_assign_statement(self, node : AST.ASTNode):
+        '''赋值语句，和解释器一样给栈中所有同名变量赋值，找不到时设为全局变量'''
+        target = node.children[0]
+        var_name = target.value
+        value = self._compile_expr(node.children[1])
+        if self._resolver is not None and target.type in ('ID', 'array_item'):
+            return self._compile_resolved_assign(target, value)
+        variables = self._interpreter.variables
+
+        if target.type == 'ID':
+            def assign():
+                if len(variables) == 1:
+                    # 只有全局栈帧时，找没找到都是给全局变量赋值
+                    variables[0][var_name] = value()
+                    return
+                find_var = False
+                for i in range(len(variables) - 1, -1, -1):
+                    if var_name in variables[i]:
+                        find_var = True
+                        variables[i][var_name] = value()
+                if not find_var:
+                    variables[0][var_name] = value()
+            return assign
+
+        if target.type == 'array_item':
+            index = self._compile_expr(target.children[0])
+            def assign_item():
+                find_var = False
+                for i in range(len(variables) - 1, -1, -1):
+                    if var_name in variables[i]:
+                        find_var = True
+                        array = variables[i].get(var_name)
+                        if not isinstance(array, list):
+                            raise Exception(f'{var_name} 是一个变量而不是数组')
+                        idx = index()
+                        if not isinstance(idx, int):
+                            raise Exception(f'{idx} 不是整数')
+                        if idx >= len(array) or idx < 0:
+                            raise Exception(f'数组 {var_name} 不包含第 {idx} 项')
+                        variables[i][var_name][idx] = value()
+                if not find_var:
+                    variables[0][var_name] = value()
+            return assign_item
+
+        def assign_unknown():
+            find_var = False
+            for i in range(len(variables) - 1, -1, -1):
+                if var_name in variables[i]:
+                    find_var = True
+            if not find_var:
+                variables[0][var_name] = value()
+        return assign_unknown
+
+    def _compile_resolved_assign(self, target : AST.ASTNode, value):
+        '''给绑定到槽位的变量或数组元素赋值'''
+        if target.type == 'ID':
+            kind, slot = self._resolver.binding(target)
+            if kind == resolver.LOCAL:
+                current = self.current
+                def assign_local():
+                    current[0][slot] = value()
+                return assign_local
+            global_slots = self.globals
+            def assign_global():
+                global_slots[slot] = value()
+            return assign_global
+
+        store = self._slot_storer(target)
+        var_name = target.value
+        load = self._slot_loader(target)
+        index = self._compile_expr(target.children[0])
+        def assign_item():
+            array = load()
+            if array is _UNSET:
+                # 和解释器一样，找不到变量时把值赋给全局变量
+                store(value())
+                return
+            if not isinstance(array, list):
+                raise Exception(f'{var_name} 是一个变量而不是数组')
+            idx = index()
+            if not isinstance(idx, int):
+                raise Exception(f'{idx} 不是整数')
+            if idx >= len(array) or idx < 0:
+                raise Exception(f'数组 {var_name} 不包含第 {idx} 项')
+            array[idx] = value()
+        return assign_item
+
+    def _compile_function_define(self, node : AST.ASTNode):
+        '''函数声明，参数检查在编译期完成，出错时在运行到声明处再报错'''
+        function_name = node.operation
+        error = None
+        argument_names = []
+        if function_name in BUILTINS:
+            error = f'函数 {function_name} 是内置函数'
+        else:
+            for arg in node.children[0].children:
+                if arg.type != 'ID':
+                    error = f"函数 {function_name} 中有 {arg.type} ,希望是一个标识符"
+                    break
+                if arg.value in argument_names:
+                    error = f"在函数 {function_name} 中，{arg.value} 重复定义"
+                    break
+                argument_names.append(arg.value)
+
+        if error is not None:
+            def define_error():
+                raise Exception(error)
+            return define_error
+
+        function = {
+            'arguments': argument_names,
+            'body': node.children[1],
+            'code': self._compile_program(node.children[1]),
+            'memo': self._interpreter._memo_cache(function_name),
+        }
+        functions = self._interpreter.functions
+        clear_memo = self._interpreter._clear_memo
+        def define():
+            if function_name in functions:
+                clear_memo()
+            functions[function_name] = function
+        return define
+
+    def _compile_return(self, node : AST.ASTNode):
+        '''返回语句，结果包装成一元组交给上层'''
+        if not node.children:
+            return lambda: (None,)
+        value = self._compile_expr(node.children[0])
+        return lambda: (value(),)
+
+    def _compile_if_statement(self, node : AST.ASTNode):
+        '''if语句，第一个子节点是条件，后面是一个或两个program'''
+        condition = self._compile_expr(node.children[0])
+        then_branch = self._compile_statement(node.children[1])
+        if len(node.children) == 3:
+            else_branch = self._compile_statement(node.children[2])
+            def if_else():
+                if condition():
+                    return then_branch()
+                return else_branch()
+            return if_else
+        def if_only():
+            if condition():
+                return then_branch()
+            return None
+        return if_only
+
+    def _compile_while_statement(self, node : AST.ASTNode):
+        '''while语句，循环体中执行了return就结束循环'''
+        condition = self._compile_expr(node.children[0])
+        body = self._compile_statement(node.children[1])
+        def while_loop():
+            while condition():
+                result = body()
+                if result is not None:
+                    return result
+            return None
+        return while_loop
+
+# 比较运算符对应的操作
+_COMPARISONS = {
+    '>':  operator.gt,
+    '>=': operator.ge,
+    '<':  operator.lt,
+    '<=': operator.le,
+}
@@ -1,19 +1,103 @@
 # interpreter.py
-import AST, parser, lexer
-import os, subprocess, sys
-from contextlib import contextmanager, redirect_stdout
+import AST, compiler, bytecode, transpiler, pycall, memo
+import os, re, sys
+
+# 转义字符：反斜杠和它后面的一个字符，不认识的转义和末尾单独的反斜杠都去掉
+ESCAPE_PATTERN = re.compile(r'\\(.?)', re.S)
+ESCAPES = {'n': '\n', 't': '\t', '\'': '\'', '"': '"', '\\': '\\'}
+# 最多记住多少个字符串转义后的结果
+ESCAPE_CACHE_SIZE = 4096
+
+def _unescape(match):
+    return ESCAPES.get(match.group(1), '')
+
+class BufferedOutput:
+    '''
+    DSL程序的输出缓冲区
+
+    print的内容先放在列表里，攒到size个字符、遇到input或程序结束时才一次写入stream；
+    line_buffering为True时（默认在stream是终端时）每次输出换行都写入，交互时能及时看到。
+    写入stream后由stream自己的缓冲决定何时真正输出
+    '''
+    def __init__(self, stream, size : int = 1 << 16, line_buffering : bool = None):
+        self.stream = stream
+        self.size = size
+        if line_buffering is None:
+            line_buffering = stream.isatty()
+        self.line_buffering = line_buffering
+        self._pending = []
+        self._length = 0
+
+    def write(self, text : str):
+        self._pending.append(text)
+        self._length += len(text)
+        if self._length >= self.size or self.line_buffering and '\n' in text:
+            self.flush()
+
+    def flush(self):
+        '''把缓冲区中的内容写入stream'''
+        if self._pending:
+            self.stream.write(''.join(self._pending))
+            self._pending.clear()
+            self._length = 0
 
 class Interpreter:
     ''' 按照规则运行AST树 '''
-    def __init__(self, node : AST.ASTNode):
-        self._parser = parser.Parser(lexer.Lexer())
+    # 支持的运行模式：tree直接遍历AST树，closure先编译成闭包再运行，vm编译成字节码后用虚拟机运行，
+    # python翻译成Python代码后运行
+    modes = ('tree', 'closure', 'vm', 'python')
+
+    def __init__(self, node : AST.ASTNode, mode : str = 'tree', program = None, python_runner = None,
+                 output = None, memo_size : int = 0):
+        '''
+            para node:          AST树根节点
+            para mode:          运行模式
+            para program:       已经编译好的程序（比如从缓存读出的Python代码对象），为None时在run中编译
+            para python_runner: 运行python_call脚本的方式（见pycall模块），为None时每次调用启动一个新进程
+            para output:        print和input的提示写到哪个文件对象（比如BufferedOutput），为None时写到sys.stdout
+            para memo_size:     每个纯函数最多缓存多少个调用结果（见memo模块），0表示不缓存；只用于tree和closure模式
+        '''
+        if mode not in self.modes:
+            raise Exception(f"不支持的运行模式 {mode}")
+        self._parser = None # 语法分析器，第一次用到时才创建
         self.root_node = node # AST树根节点
+        self.mode = mode # 运行模式
+        self.program = program # 编译好的程序
         self.variables = [{}]  # 存储变量及其值，模仿栈帧
         self.functions = {}  # 存储函数
         self.returned = False # 存储是否返回
+        self.python_runner = python_runner or pycall.SubprocessRunner() # 运行外部脚本
+        self._executor = None # 并发运行外部脚本的线程池，第一次用到时创建
+        self._gather = {} # id(数组或参数列表节点) -> 其中的python_call能否并发运行
+        self.output = output # 输出的目标
+        self._escapes = {} # 字符串 -> 转义后的结果，程序中的字符串字面量只转义一次
+        self._temps = {} # optimizer复用的子表达式的值，槽位 -> 值
+        self._call_sites = {} # id(function_call节点) -> 调用的目标，见_resolve_call_site
+        self._call_site_ids = {} # 函数名 -> 缓存了这个函数的调用节点id，重新定义函数时清除
+        self.memo_size = memo_size
+        self.memo_caches = {} # 纯函数名 -> memo.MemoCache
+        self._pure_functions = set() # 调用结果可以缓存的函数名，在run中分析
     
+    def _get_parser(self):
+        '''语法分析器，构造时要读入分析表，所以只在需要时创建'''
+        if self._parser is None:
+            import lexer, parser # 运行时一般用不到语法分析器，不在启动时导入PLY
+            self._parser = parser.Parser(lexer.Lexer())
+        return self._parser
+
     def run(self):
-        self._execute_node(self.root_node)
+        if self.memo_size > 0 and self.mode in ('tree', 'closure'):
+            self._pure_functions = memo.pure_functions(self.root_node)
+        if self.mode == 'closure':
+            compiler.Compiler(self).compile(self.root_node)()
+        elif self.mode == 'vm':
+            bytecode.VM(self).run(bytecode.BytecodeCompiler().compile(self.root_node))
+        elif self.mode == 'python':
+            if self.program is None:
+                self.program = transpiler.compile_program(self.root_node)
+            transpiler.run(self, self.program)
+        else:
+            self._execute_node(self.root_node)
     
     def _get_ASTNode_value(self, node : AST.ASTNode):
         '''获取节点的值'''
@@ -56,6 +140,13 @@ class Interpreter:
         if node.type == 'function_call':
             return self._execute_function_call(node)
 
+        if node.type == 'cse_store':
+            value = self._temps[node.value] = self._get_ASTNode_value(node.children[0])
+            return value
+
+        if node.type == 'cse_load':
+            return self._temps[node.value]
+
     def _get_ID_value(self, node : AST.ASTNode):
         '''根据ID获取一个值'''
         # 从栈顶开始查找变量
@@ -85,6 +176,13 @@ class Interpreter:
 
     def _get_array_value(self, node : AST.ASTNode):
         '''获取一个数组或参数列表的值，返回值是数组，子节点都是expression'''
+        gather = self._gather.get(id(node))
+        if gather is None:
+            gather = self._gather[id(node)] = self._can_gather_python_calls(node)
+        if gather:
+            return self._gather_python_calls(
+                [(it.operation, lambda it=it: self._get_ASTNode_value(it.children[0])) if it.type == 'python_call'
+                 else (None, lambda it=it: self._get_ASTNode_value(it)) for it in node.children])
         ans = []
         for it in node.children:
             ans.append(self._get_ASTNode_value(it))
@@ -270,9 +368,10 @@ class Interpreter:
 
     def _execute_python_call(self, node: AST.ASTNode):
         '''调用外部python脚本，子节点argument_list为调用的参数'''
-        script_path = node.operation  
-        arguments = self._get_ASTNode_value(node.children[0])
-        
+        return self._run_python_script(node.operation, self._get_ASTNode_value(node.children[0]))
+
+    def _run_python_script(self, script_path : str, arguments : list):
+        '''运行外部python脚本并返回其输出，各个运行模式共用'''
         if not os.path.isabs(script_path):  # If the path is relative, make it absolute
             script_path = os.path.join(os.getcwd(), script_path)
 
@@ -281,12 +380,78 @@ class Interpreter:
             raise Exception(f"Python 脚本 {script_path} 不存在")
         
         args = [str(arg) for arg in arguments]
+        returncode, stdout, stderr = self.python_runner.run(script_path, args)
+        if returncode != 0:
+            raise Exception(f"调用 {script_path} 脚本执行失败，错误信息:\n {stderr.strip()}")
+        return stdout.strip() # 脚本输出结果
+
+    def _can_gather_python_calls(self, node : AST.ASTNode):
+        '''
+        数组或参数列表中的python_call能否并发运行，各个运行模式共用
+
+        至少有两个python_call，并且各项中都没有函数调用时才并发：这时求值没有副作用，
+        只有外部脚本的运行顺序会改变，报错仍然和按顺序执行时一样
+        '''
+        if not getattr(self.python_runner, 'concurrent', False):
+            return False
+        if sum(1 for child in node.children if child.type == 'python_call') < 2:
+            return False
+        todo = list(node.children)
+        while todo:
+            child = todo.pop()
+            if child.type in ('function_call', 'function_def'):
+                return False
+            todo.extend(child.children)
+        return True
+
+    def _gather_python_calls(self, items : list):
+        '''
+        按顺序求出数组或参数列表的每一项，其中的外部脚本放进线程池并发运行，各个运行模式共用
+
+        items中每一项是(脚本路径, 求参数的函数)，不是python_call的项脚本路径为None、函数直接求出该项的值。
+        结果按原来的顺序排列；有多项出错时，报最左边一项的错
+        '''
+        from concurrent.futures import Future, ThreadPoolExecutor # 只在用到线程池时导入，减少启动时间
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor()
+        ans = []
         try:
-            result = subprocess.run([sys.executable, script_path] + args, 
-                                    capture_output=True, text=True, check=True)
-            return result.stdout.strip() # 脚本输出结果
-        except subprocess.CalledProcessError as e:
-            raise Exception(f"调用 {script_path} 脚本执行失败，错误信息:\n {e.stderr.strip()}")     
+            for script_path, evaluate in items:
+                if script_path is None:
+                    ans.append(evaluate())
+                else:
+                    ans.append(self._executor.submit(self._run_python_script, script_path, evaluate()))
+        except Exception:
+            # 左边的脚本出错时，按顺序执行根本不会走到这一项
+            for item in ans:
+                if isinstance(item, Future):
+                    item.result()
+            raise
+        return [item.result() if isinstance(item, Future) else item for item in ans]
+
+    def _builtin_print(self, arguments : list):
+        '''内置print函数，各个运行模式共用'''
+        handle_escape_sequences = self._handle_escape_sequences
+        (self.output or sys.stdout).write(''.join([handle_escape_sequences(str(arg)) for arg in arguments]))
+        return None
+
+    def _builtin_input(self, arguments : list):
+        '''内置input函数，先输出提示再读入一行'''
+        handle_escape_sequences = self._handle_escape_sequences
+        output = self.output or sys.stdout
+        output.write(''.join([handle_escape_sequences(str(arg)) for arg in arguments]))
+        output.flush() # 读入前提示要显示出来
+        return input()
+
+    def _builtin_len(self, arguments : list):
+        '''内置len函数，返回每个参数的长度，不是数组或字符串的为None'''
+        ans = []
+        for arg in arguments:
+            if isinstance(arg, (list, str)):
+                ans.append(len(arg))
+            else :
+                ans.append(None)
+        return ans
 
     def _execute_function_define(self, node: AST.ASTNode):
         '''函数函数声明，子节点为argument_list为函数参数，子节点的子节点应该全是ID'''
@@ -311,62 +476,106 @@ class Interpreter:
         program_body = node.children[1]
         
         # 存储在self.functions里
+        if function_name in self.functions:
+            self._clear_memo()
         self.functions[function_name] = {
             'arguments': argument_names,
             'body': program_body,
+            'memo': self._memo_cache(function_name),
         }
+        # 调用这个函数的地方缓存的是旧的定义
+        for site_id in self._call_site_ids.pop(function_name, ()):
+            del self._call_sites[site_id]
         
         return None
 
-    def _execute_function_call(self, node: AST.ASTNode):
-        '''函数调用，子节点为argument_list为函数参数，子节点的子节点都是expression'''
-        function_name = node.operation
-
-        # 内置print inut 和 len函数
-        if function_name == 'print' :
-            arguments = self._get_ASTNode_value(node.children[0])
-            args_str = [self._handle_escape_sequences(str(arg)) for arg in arguments]
-            print(''.join(args_str), end='')
+    def _memo_cache(self, function_name : str):
+        '''纯函数的结果缓存，其他函数返回None'''
+        if function_name not in self._pure_functions:
             return None
+        if function_name not in self.memo_caches:
+            self.memo_caches[function_name] = memo.MemoCache(function_name, self.memo_size)
+        return self.memo_caches[function_name]
+
+    def _clear_memo(self):
+        '''重新定义函数后，调用过它的纯函数缓存的结果可能不再正确'''
+        for cache in self.memo_caches.values():
+            cache.clear()
+
+    def _resolve_call_site(self, node : AST.ASTNode):
+        '''
+        查找调用节点的目标并缓存，
+        返回(内置函数, 参数名, 函数体, 参数个数是否一致, 是否并发运行参数中的外部脚本, 结果缓存)
+
+        内置函数不能被重新定义，一直缓存；DSL函数的缓存在重新定义时由_execute_function_define清除。
+        未定义的函数不缓存，每次调用都报错
+        '''
+        function_name = node.operation
+        builtin = {'print': self._builtin_print, 'input': self._builtin_input, 'len': self._builtin_len}.get(function_name)
+        if builtin is not None:
+            site = (builtin, None, None, True, False, None)
+        else:
+            if function_name not in self.functions:
+                raise Exception(f'{function_name} 未定义，无法调用')
+            function_tuple = self.functions[function_name]
+            argument_list = node.children[0]
+            site = (None, function_tuple['arguments'], function_tuple['body'],
+                    len(argument_list.children) == len(function_tuple['arguments']),
+                    self._can_gather_python_calls(argument_list), function_tuple['memo'])
+            self._call_site_ids.setdefault(function_name, []).append(id(node))
+        self._call_sites[id(node)] = site
+        return site
 
-        if function_name == 'input':
-            arguments = self._get_ASTNode_value(node.children[0])
-            args_str = [self._handle_escape_sequences(str(arg)) for arg in arguments]
-            print(''.join(args_str), end='')
-            return input()
-        
-        if function_name == 'len':
-            arguments = self._get_ASTNode_value(node.children[0])
-            ans = []
-            for arg in arguments:
-                if isinstance(arg, (list, str)):
-                    ans.append(len(arg))
-                else :
-                    ans.append(None)
-            return ans
+    def _execute_function_call(self, node: AST.ASTNode):
+        '''函数调用，子节点为argument_list为函数参数，子节点的子节点都是expression'''
+        site = self._call_sites.get(id(node))
+        if site is None:
+            site = self._resolve_call_site(node)
+        builtin, defined_arguments, body, matched, gather, memo_cache = site
 
-        if function_name not in self.functions:
-            raise Exception(f'{function_name} 未定义，无法调用')
-        
-        arguments = self._get_ASTNode_value(node.children[0])  # Arguments from the function call
-        
-        function_tuple = self.functions[function_name]
-        defined_arguments = function_tuple['arguments']
+        # 内置print input 和 len函数
+        if builtin is not None:
+            return builtin(self._get_ASTNode_value(node.children[0]))
 
-        if len(arguments) != len(defined_arguments):
-            raise Exception(f"{function_name} 函数的参数不匹配")
+        function_name = node.operation
+        if matched and not gather:
+            # 参数在调用者的栈帧中计算，直接放进新的栈帧，不经过参数数组
+            frame = {}
+            get_value = self._get_ASTNode_value
+            for arg_name, arg_node in zip(defined_arguments, node.children[0].children):
+                frame[arg_name] = get_value(arg_node)
+        else:
+            # 参数个数不对时也要先计算参数，参数出错时报参数的错
+            arguments = self._get_ASTNode_value(node.children[0])  # Arguments from the function call
+            frame = None
+
+        if self._call_sites.get(id(node)) is not site:
+            # 计算参数时重新定义了这个函数，和以前一样按新的定义调用
+            if frame is not None:
+                arguments = list(frame.values())
+                frame = None
+            _, defined_arguments, body, _, _, memo_cache = self._resolve_call_site(node)
+        if frame is None:
+            if len(arguments) != len(defined_arguments):
+                raise Exception(f"{function_name} 函数的参数不匹配")
+            frame = dict(zip(defined_arguments, arguments))
+
+        if memo_cache is not None:
+            arguments = list(frame.values())
+            key = memo_cache.key(arguments)
+            return_value = memo_cache.lookup(key)
+            if return_value is not memo.MISSING:
+                self.returned = False
+                return return_value
 
         # 设置栈帧
-        self.variables.append({})
-
-        for arg_name, arg_value in zip(defined_arguments, arguments):
-            self.variables[-1][arg_name] = arg_value  # Bind each argument to its value in the current scope
+        self.variables.append(frame)
 
         return_value = None
         self.returned = False
 
         try:
-            return_value = self._execute_node(function_tuple['body'])
+            return_value = self._execute_node(body)
         except Exception:
             raise Exception(f"函数 {function_name} 运行中出错")
         finally:
@@ -375,6 +584,8 @@ class Interpreter:
         
         # 将是否返回改为否
         self.returned = False
+        if memo_cache is not None:
+            memo_cache.store(key, arguments, return_value)
         return return_value
 
     def _execute_program(self, node : AST.ASTNode):
@@ -430,27 +641,19 @@ class Interpreter:
         return None
 
     def _handle_escape_sequences(self, text: str):
-        """处理字符串中的转义字符"""
-        ans = ''
-        escape = False
-        for ch in text:
-            if escape:
-                if ch == 'n':
-                    ans+='\n'
-                elif ch == 't':
-                    ans += '\t'
-                elif ch == '\'':
-                    ans += '\''
-                elif ch == '\"':
-                    ans += '\"'
-                elif ch == '\\':
-                    ans += '\\'
-                escape = False
-            else :
-                if ch == '\\':
-                    escape = True
-                else : 
-                    ans += ch
+        """
+        处理字符串中的转义字符
+
+        字符串的值保存的是源代码中的原文（len和比较都按原文），所以转义在输出时才处理；
+        同一个字符串（比如程序中的字面量）转义过一次后记下结果
+        """
+        if '\\' not in text:
+            return text
+        ans = self._escapes.get(text)
+        if ans is None:
+            ans = ESCAPE_PATTERN.sub(_unescape, text)
+            if len(self._escapes) < ESCAPE_CACHE_SIZE:
+                self._escapes[text] = ans
         return ans
     
 # 测试解释器
@@ -2,7 +2,10 @@
 # 这个模块是一个词法分析器，用于将输入的代码字符串分解成一系列的标记（tokens）。
 
 import ply.lex as lex
-import sys
+import mmap, os, re, sys
+
+# 按块读入文件时每块的大致字节数
+CHUNK_SIZE = 1 << 20
 
 class Lexer:
     # 定义保留字和它们的标记名称
@@ -80,7 +83,8 @@ class Lexer:
         r'[a-zA-Z_][0-9a-zA-Z_]*'
         t.type = self.reserved.get(t.value, 'ID')
         if t.type == 'ID' :
-            t.value = {'type' : 'ID', 'value' : t.value}
+            # 同名的变量共用一个字符串，比较和作为字典键时更快，也更省内存
+            t.value = {'type' : 'ID', 'value' : sys.intern(t.value)}
         elif t.type == 'TRUE':
             t.value = {'type' : 'TRUE', 'value' : True}
         elif t.type == 'FALSE':
@@ -107,25 +111,240 @@ class Lexer:
     # 定义错误处理规则
     def t_error(self, t):
         print(f"Illegal character {t.value[0]} in line {t.lexer.lineno}")
+        self.error_count += 1
         t.lexer.skip(1)
 
-    def __init__(self):
-        self.lexer = lex.lex(module=self)  # 构建词法分析器
+    def __init__(self, fast : bool = False):
+        '''
+            para fast: 为True时使用手写的Scanner代替PLY生成的词法分析器，产生的标记完全相同
+        '''
+        self.error_count = 0  # 遇到的非法字符数
+        if fast:
+            self.lexer = Scanner(self)
+            return
+        # 构建词法分析器，直接读入预先生成的lextab.py，跳过对规则的检查；
+        # lextab.py不会随规则自动更新，修改规则后需要删掉它重新生成
+        self.lexer = lex.lex(module=self, optimize=True, lextab='lextab',
+                             outputdir=os.path.dirname(os.path.abspath(__file__)))
 
     def tokenize(self, data):
         """对输入数据进行词法分析，返回标记列表。"""
-        self.lexer.input(data)
-        tokens = []
-        while True:
-            tok = self.lexer.token()
-            if not tok:
-                break  # 没有更多的输入
-            tokens.append(tok)
-        return tokens
+        return list(self.iter_tokens([data]))
+
+    def iter_tokens(self, chunks):
+        """
+        逐个产生标记，不把所有标记放进列表
+
+        :param chunks: 源代码片段，除最后一段外每段都要以换行结尾。
+                       标记不会跨行，所以各段可以分别交给PLY；行号在段之间连续，lexpos换算成在整个源代码中的位置
+
+        每个标记还有从1开始的列号col，由语法分析器记到AST节点上
+        """
+        self.lexer.lineno = 1
+        offset = 0
+        for chunk in chunks:
+            self.lexer.input(chunk)
+            line = None
+            line_start = 0
+            while True:
+                tok = self.lexer.token()
+                if not tok:
+                    break
+                if tok.lineno != line:
+                    # 每行只找一次行首
+                    line = tok.lineno
+                    line_start = chunk.rfind('\n', 0, tok.lexpos) + 1
+                tok.col = tok.lexpos - line_start + 1
+                tok.lexpos += offset
+                yield tok
+            offset += len(chunk)
+
+# Scanner中的字符类别
+_IGNORE, _DIGIT, _ID_START, _QUOTE, _NEWLINE, _HASH, _OPERATOR = range(7)
+
+class Scanner:
+    '''
+    手写的词法扫描器
+
+    PLY用一个很长的正则表达式依次尝试每条规则，再为NUMBER、ID等标记调用规则函数。
+    这里按当前字符的类别直接分派：运算符查表得到，数字、标识符、字符串等只用各自的正则表达式匹配一次。
+    规则之间的优先级和PLY的主正则表达式一致，产生的标记（类型、值、行号、lexpos）和遇到非法字符时的处理都和PLY相同。
+    接口也和PLY的词法分析器一样（input、token、skip、lineno、lexpos），可以直接交给yacc
+    '''
+    # PLY编译规则时使用re.VERBOSE
+    _match_number = re.compile(Lexer.t_NUMBER.__doc__, re.VERBOSE).match
+    _match_id = re.compile(Lexer.t_ID.__doc__, re.VERBOSE).match
+    _match_str = re.compile(Lexer.t_STR.__doc__, re.VERBOSE).match
+    _match_callpy = re.compile(Lexer.t_CALLPY.__doc__, re.VERBOSE).match
+    _match_newline = re.compile(Lexer.t_newline.__doc__, re.VERBOSE).match
+    _match_comment = re.compile(Lexer.t_ignore_COMMENT, re.VERBOSE).match
+
+    # 运算符：字符 -> (单独出现时的类型, 后面跟着=时的类型)，None表示不是合法的标记
+    _operators = {
+        '+': ('PLUS', None),   '-': ('MINUS', None),   '*': ('TIMES', None),    '/': ('DIVIDE', None),
+        '(': ('LPAREN', None), ')': ('RPAREN', None),  '[': ('LBRACKET', None), ']': ('RBRACKET', None),
+        ',': ('COMMA', None),  '=': ('ASSIGNMENT', 'EQUAL'), '<': ('LSS', 'LEQ'), '>': ('GTR', 'GEQ'),
+        '!': (None, 'NEQ'),
+    }
+
+    # 字符 -> 类别，表中没有的字符如果是数字（\d也匹配其他语言的数字）就是_DIGIT，否则只可能是CALLPY或非法字符
+    _classes = dict.fromkeys(Lexer.t_ignore, _IGNORE)
+    _classes.update(dict.fromkeys('0123456789', _DIGIT))
+    _classes.update(dict.fromkeys('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_', _ID_START))
+    _classes.update({'"' : _QUOTE, "'" : _QUOTE, '\n' : _NEWLINE, '#' : _HASH})
+    _classes.update(dict.fromkeys(_operators, _OPERATOR))
+
+    def __init__(self, module : Lexer):
+        '''
+            para module: 提供保留字表和t_error的Lexer
+        '''
+        self.module = module
+        self.lexdata = None
+        self.lexpos = 0
+        self.lineno = 1
+
+    def input(self, data : str):
+        '''和PLY一样，换输入时不重置行号'''
+        self.lexdata = data
+        self.lexpos = 0
+
+    def skip(self, n : int):
+        self.lexpos += n
+
+    def token(self):
+        '''返回下一个标记，没有更多输入时返回None'''
+        data = self.lexdata
+        length = len(data)
+        pos = self.lexpos
+        classes = self._classes
+        operators = self._operators
+        reserved = self.module.reserved
+        match_id = self._match_id
+        intern = sys.intern
+        LexToken = lex.LexToken
+        while pos < length:
+            ch = data[pos]
+            kind = classes.get(ch)
+            if kind == _IGNORE:
+                pos += 1
+                continue
+            if kind is None and ch.isdecimal():
+                kind = _DIGIT
+
+            tok = LexToken()
+            tok.lineno = self.lineno
+            tok.lexpos = pos
+
+            if kind == _ID_START:
+                m = match_id(data, pos)
+                self.lexpos = m.end()
+                value = m.group()
+                tok.type = type_str = reserved.get(value, 'ID')
+                if type_str == 'ID':
+                    value = {'type' : 'ID', 'value' : intern(value)}
+                elif type_str == 'TRUE':
+                    value = {'type' : 'TRUE', 'value' : True}
+                elif type_str == 'FALSE':
+                    value = {'type' : 'FALSE', 'value' : False}
+                tok.value = value
+                return tok
+
+            if kind == _OPERATOR and not data.startswith('/', pos + 1):
+                single, double = operators[ch]
+                if double is not None and data.startswith('=', pos + 1):
+                    self.lexpos = pos + 2
+                    tok.type = double
+                    tok.value = ch + '='
+                    return tok
+                if single is not None:
+                    self.lexpos = pos + 1
+                    tok.type = single
+                    tok.value = ch
+                    return tok
+
+            if kind == _DIGIT:
+                m = self._match_number(data, pos)
+                self.lexpos = m.end()
+                tok.type = 'NUMBER'
+                tok.value = {'value' : int(m.group()), 'type' : 'NUMBER'}
+                return tok
+
+            if kind == _NEWLINE:
+                pos = self._match_newline(data, pos).end()
+                self.lineno += pos - tok.lexpos
+                continue
+
+            if kind == _QUOTE:
+                m = self._match_str(data, pos)
+                if m:
+                    self.lexpos = m.end()
+                    tok.type = 'STR'
+                    tok.value = {'value' : m.group()[1:-1], 'type' : 'STR'}
+                    return tok
+
+            # CALLPY的第一个字符是正则表达式中的'.'，可以是除换行外的任意字符，优先级高于注释和运算符
+            if data.startswith('/', pos + 1):
+                m = self._match_callpy(data, pos)
+                if m:
+                    self.lexpos = m.end()
+                    tok.type = 'CALLPY'
+                    tok.value = {'value' : m.group()[2:], 'type' : 'CALLPY'}
+                    return tok
+
+            if kind == _HASH:
+                pos = self._match_comment(data, pos).end()
+                continue
+
+            if kind == _OPERATOR:
+                single, double = self._operators[ch]
+                if double is not None and data.startswith('=', pos + 1):
+                    self.lexpos = pos + 2
+                    tok.type = double
+                    tok.value = ch + '='
+                    return tok
+                if single is not None:
+                    self.lexpos = pos + 1
+                    tok.type = single
+                    tok.value = ch
+                    return tok
+
+            # 非法字符，和PLY一样交给t_error处理
+            tok.type = 'error'
+            tok.value = data[pos:]
+            tok.lexer = self
+            self.lexpos = pos
+            self.module.t_error(tok)
+            if self.lexpos == pos:
+                raise lex.LexError(f"Scanning error. Illegal character '{ch}'", data[pos:])
+            pos = self.lexpos
+
+        self.lexpos = pos
+        return None
+
+def read_chunks(path : str, chunk_size : int = CHUNK_SIZE):
+    '''
+    用mmap按行边界把文件分成大约chunk_size字节的片段，逐段解码
+
+    和用文本模式读入整个文件的结果一样：换行统一成\n，片段拼起来就是open(path).read()
+    '''
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < len(data):
+                end = data.find(b'\n', min(start + chunk_size, len(data)) - 1)
+                end = len(data) if end == -1 else end + 1
+                yield data[start:end].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                start = end
 
 # 示例用法
 if __name__ == '__main__':
-    tokenizer = Lexer()
+    # --fast 使用手写的Scanner
+    fast = '--fast' in sys.argv
+    if fast:
+        sys.argv.remove('--fast')
+    tokenizer = Lexer(fast)
     
     # 检查命令行参数
     if len(sys.argv) < 2:
@@ -0,0 +1,10 @@
+# lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'ASSIGNMENT', 'ATOI', 'BEGIN', 'CALLPY', 'COMMA', 'DIVIDE', 'ELSE', 'END', 'EQUAL', 'FALSE', 'FUNCTION', 'GEQ', 'GTR', 'ID', 'IF', 'ITOA', 'LBRACKET', 'LEQ', 'LPAREN', 'LSS', 'MINUS', 'NEQ', 'NOT', 'NUMBER', 'OR', 'PLUS', 'RBRACKET', 'RETURN', 'RPAREN', 'STR', 'TIMES', 'TRUE', 'WHILE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_NUMBER>\\d+(\\.\\d*)?)|(?P<t_ID>[a-zA-Z_][0-9a-zA-Z_]*)|(?P<t_STR>("((\\\\\\")|[^\\n\\"])*")|(\'((\\\\\\\')|[^\\n\\\'])*\'))|(?P<t_CALLPY>./([a-zA-Z]:\\\\)?([0-9a-zA-Z_]+\\\\)*[0-9a-zA-Z_]+.py)|(?P<t_newline>\\n+)|(?P<t_ignore_COMMENT>\\#.*)|(?P<t_NEQ>\\!=)|(?P<t_EQUAL>==)|(?P<t_GEQ>>=)|(?P<t_LBRACKET>\\[)|(?P<t_LEQ><=)|(?P<t_LPAREN>\\()|(?P<t_PLUS>\\+)|(?P<t_RBRACKET>\\])|(?P<t_RPAREN>\\))|(?P<t_TIMES>\\*)|(?P<t_ASSIGNMENT>=)|(?P<t_COMMA>,)|(?P<t_DIVIDE>/)|(?P<t_GTR>>)|(?P<t_LSS><)|(?P<t_MINUS>-)', [None, ('t_NUMBER', 'NUMBER'), None, ('t_ID', 'ID'), ('t_STR', 'STR'), None, None, None, None, None, None, ('t_CALLPY', 'CALLPY'), None, None, ('t_newline', 'newline'), (None, None), (None, 'NEQ'), (None, 'EQUAL'), (None, 'GEQ'), (None, 'LBRACKET'), (None, 'LEQ'), (None, 'LPAREN'), (None, 'PLUS'), (None, 'RBRACKET'), (None, 'RPAREN'), (None, 'TIMES'), (None, 'ASSIGNMENT'), (None, 'COMMA'), (None, 'DIVIDE'), (None, 'GTR'), (None, 'LSS'), (None, 'MINUS')])]}
+_lexstateignore = {'INITIAL': ' \t'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
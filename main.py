@@ -1,19 +1,194 @@
-# main.py
-import interpreter, parser, lexer
-import sys
+import interpreter, transpiler, optimizer, pycall, AST, cache
+import argparse, os, sys
+
+def add_runner_arguments(arg_parser : argparse.ArgumentParser):
+    '''添加运行python_call脚本相关的命令行参数，见create_runner'''
+    arg_parser.add_argument('--pycall', choices=('subprocess', 'pool', 'inprocess'), default='subprocess',
+                            help='python_call脚本的运行方式：subprocess每次启动新进程，pool使用常驻的工作进程池，'
+                                 'inprocess在解释器进程中直接运行（只适合可信的脚本）')
+    arg_parser.add_argument('--pool-size', type=int, default=None,
+                            help='工作进程池的进程数，默认为CPU数')
+    arg_parser.add_argument('--max-tasks', type=int, default=None,
+                            help='每个工作进程运行多少次脚本后换成新进程，默认不换')
+    arg_parser.add_argument('--cache-size', type=int, default=0,
+                            help='最多缓存多少条可缓存脚本的运行结果，默认为0，不缓存')
+    arg_parser.add_argument('--cache-config', default=None,
+                            help='列出可缓存脚本的JSON配置文件（要同时用--cache-size打开缓存）')
+    arg_parser.add_argument('--cache-stats', action='store_true',
+                            help='运行结束后输出脚本结果缓存的命中次数')
+
+def create_runner(args : argparse.Namespace):
+    '''按add_runner_arguments添加的参数创建运行python_call脚本的对象'''
+    if args.pycall == 'pool':
+        runner = pycall.WorkerPool(args.pool_size, args.max_tasks)
+    elif args.pycall == 'inprocess':
+        runner = pycall.InProcessRunner()
+    else:
+        runner = pycall.SubprocessRunner()
+    if args.cache_size > 0:
+        runner = pycall.CachingRunner(runner, args.cache_size, args.cache_config)
+    return runner
+
+def add_sampler_arguments(arg_parser : argparse.ArgumentParser):
+    '''添加采样性能分析的命令行参数，见start_sampler'''
+    arg_parser.add_argument('--sample', action='store_true',
+                            help='按固定频率采样正在执行的DSL代码行，结束后输出每一行的样本数（只支持tree和vm模式）')
+    arg_parser.add_argument('--sample-rate', type=int, default=100,
+                            help='每秒采样几次')
+
+def start_sampler(args : argparse.Namespace, node : AST.ASTNode):
+    '''按add_sampler_arguments添加的参数开始采样，没有指定--sample时返回None'''
+    if not args.sample:
+        return None
+    import sampler # 只有采样时用到
+    profiler = sampler.SamplingProfiler(node, args.file, args.sample_rate)
+    profiler.start()
+    return profiler
+
+# fast_lexer -> (词法分析器, 语法分析器)，批量运行时每个进程只构造一次
+_parsers = {}
+
+def _get_parser(fast_lexer : bool):
+    if fast_lexer not in _parsers:
+        import lexer, parser # 导入PLY也要十几毫秒，命中缓存时不导入
+        Lexer = lexer.Lexer(fast_lexer)
+        _parsers[fast_lexer] = (Lexer, parser.Parser(Lexer))
+    return _parsers[fast_lexer]
+
+def parse_file(path : str, source : str, fast_lexer : bool = False):
+    '''
+    返回(AST树, 词法错误数)。source是cache.file_digest(path)
+
+    源代码没有变化时直接读取缓存的AST树，不再运行PLY
+    '''
+    node = AST.load_tree(path, source)
+    if node is not None:
+        return node, 0
+    Lexer, Parser = _get_parser(fast_lexer)
+    Lexer.error_count = 0
+    node = Parser.parse_file(path)
+    # 词法分析报过错的程序不缓存，否则再次运行时看不到报错
+    if Lexer.error_count == 0:
+        AST.store_tree(path, source, node)
+    return node, Lexer.error_count
+
+def load_script(args : argparse.Namespace, path : str):
+    '''
+    按命令行参数读入path，返回(AST树, 编译好的程序)
+
+    只有python模式有编译好的程序；python模式命中缓存时AST树为None
+    '''
+    # 优化后的程序和没有优化的分开缓存
+    versions = ('optimize', optimizer.VERSION) if args.optimize else ()
+
+    # 缓存按文件内容的哈希值查找，源代码本身由语法分析器边读边分析，不整个读进内存
+    source = cache.file_digest(path)
+
+    node = None
+    program = None
+    if args.mode == 'python':
+        # 源代码没有变化时直接使用缓存的代码对象，跳过词法分析、语法分析和编译
+        program = transpiler.load_program(path, source, *versions)
+    if program is None:
+        node, lexer_errors = parse_file(path, source, args.fast_lexer)
+        if args.optimize:
+            stats = [] if args.optimize_stats else None
+            node = optimizer.optimize(node, stats=stats)
+            for name, before, after in stats or ():
+                print(f"优化 {name}：节点数 {before} -> {after}", file=sys.stderr)
+        if args.mode == 'python':
+            program = transpiler.compile_program(node, path)
+            if lexer_errors == 0:
+                transpiler.store_program(path, source, program, *versions)
+    return node, program
 
 def main():
-    if len(sys.argv) < 2:
-        raise Exception("需要输入您的代码文件")
-    elif len(sys.argv) > 2:
-        raise Exception("您输入的文件太多了")
-    else :
-        with open(sys.argv[1], 'r', encoding='utf-8') as file:
-            code = file.read()
-        Parser = parser.Parser(lexer.Lexer())
-        node = Parser.parse(code)
-        Interpreter = interpreter.Interpreter(node)
+    arg_parser = argparse.ArgumentParser(description='运行robot_dsl脚本')
+    arg_parser.add_argument('files', nargs='*', metavar='file',
+                            help='您的代码文件；给出多个文件或目录（其中所有的.dsl文件）时批量运行')
+    arg_parser.add_argument('--manifest', default=None,
+                            help='批量运行清单中的脚本，每行一个文件或目录，相对于清单所在目录，#开头的行是注释')
+    arg_parser.add_argument('--jobs', type=int, default=None,
+                            help='批量运行时的工作进程数，默认为CPU数')
+    arg_parser.add_argument('--output-dir', default=None,
+                            help='批量运行时把每个脚本的输出写到这个目录中的<脚本名>.out和.err，'
+                                 '默认输出到标准输出和标准错误，每行前面加上[脚本名]')
+    arg_parser.add_argument('--mode', choices=interpreter.Interpreter.modes, default='tree',
+                            help='运行模式：tree逐节点解释，closure先编译成闭包再运行，vm编译成字节码后用虚拟机运行，'
+                                 'python翻译成Python代码运行并缓存编译结果')
+    arg_parser.add_argument('--fast-lexer', action='store_true',
+                            help='用手写的词法扫描器代替PLY的词法分析器')
+    arg_parser.add_argument('--optimize', action='store_true',
+                            help='运行前优化AST树：折叠常量、删除不会执行的分支、复用重复的子表达式')
+    arg_parser.add_argument('--optimize-stats', action='store_true',
+                            help='输出每个优化前后的节点数（同时打开--optimize）')
+    arg_parser.add_argument('--memo-size', type=int, default=0,
+                            help='tree和closure模式中，每个纯函数最多缓存多少个调用结果，默认为0，不缓存')
+    arg_parser.add_argument('--memo-stats', action='store_true',
+                            help='运行结束后输出缓存了结果的函数和命中次数')
+    arg_parser.add_argument('--profile', action='store_true',
+                            help='统计每个函数、每条语句和外部脚本的次数和时间，结束后输出到标准错误（只支持tree模式）')
+    arg_parser.add_argument('--profile-folded', default=None,
+                            help='把折叠栈写到这个文件，可以用火焰图工具查看（同时打开--profile）')
+    add_sampler_arguments(arg_parser)
+    add_runner_arguments(arg_parser)
+    # 文件可以写在选项之间，比如 main.py a.dsl --manifest list.txt b.dsl
+    args = arg_parser.parse_intermixed_args()
+    if args.optimize_stats:
+        args.optimize = True
+    if args.profile_folded:
+        args.profile = True
+    if args.profile and args.mode != 'tree':
+        arg_parser.error('--profile 只支持 tree 模式')
+    if args.sample and args.mode not in ('tree', 'vm'):
+        arg_parser.error('--sample 只支持 tree 和 vm 模式')
+    if not args.files and args.manifest is None:
+        arg_parser.error('需要输入您的代码文件')
+
+    if len(args.files) != 1 or args.manifest is not None or os.path.isdir(args.files[0]):
+        import batch # 只有批量运行时用到
+        for option in ('profile', 'sample', 'memo_stats', 'cache_stats'):
+            if getattr(args, option):
+                arg_parser.error(f"批量运行时不支持 --{option.replace('_', '-')}")
+        if args.pycall == 'pool':
+            arg_parser.error('批量运行时不支持 --pycall pool，工作进程中不能再创建进程池')
+        try:
+            paths = batch.collect_scripts(args.files, args.manifest)
+        except OSError as e:
+            arg_parser.error(str(e))
+        sys.exit(batch.run_batch(args, paths))
+
+    args.file = args.files[0]
+    node, program = load_script(args, args.file)
+    runner = create_runner(args)
+    # 输出先攒在缓冲区里，遇到input、攒够或者程序结束时再写出
+    output = interpreter.BufferedOutput(sys.stdout)
+    if args.profile:
+        import profiler # 只有性能分析时用到
+        Interpreter = profiler.ProfilingInterpreter(node, python_runner=runner, output=output,
+                                                    memo_size=args.memo_size)
+    else:
+        Interpreter = interpreter.Interpreter(node, mode=args.mode, program=program, python_runner=runner,
+                                              output=output, memo_size=args.memo_size)
+    sampling = start_sampler(args, node)
+    try:
         Interpreter.run()
+    finally:
+        if sampling is not None:
+            sampling.stop()
+        output.flush()
+        runner.close()
+        if args.cache_stats and isinstance(runner, pycall.CachingRunner):
+            print(f"脚本结果缓存：命中 {runner.hits} 次，未命中 {runner.misses} 次", file=sys.stderr)
+        if args.memo_stats:
+            for name, memo_cache in sorted(Interpreter.memo_caches.items()):
+                print(f"函数 {name} 的结果缓存：命中 {memo_cache.hits} 次，未命中 {memo_cache.misses} 次", file=sys.stderr)
+        if args.profile:
+            Interpreter.report()
+            if args.profile_folded:
+                Interpreter.write_folded(args.profile_folded)
+        if sampling is not None:
+            sampling.report()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,131 @@
+# memo.py
+# 这个模块找出程序中的纯函数，并缓存它们的调用结果。
+# 变量是动态作用域的：函数能读到调用者的参数和全局变量，给变量赋值会改到栈中所有同名变量，
+# 所以这里的“纯”比较严格：函数体只读自己的参数，不赋值，不定义函数，不输出、不读入、不调用外部脚本，
+# 只调用纯函数。同名函数的每个定义都满足这些条件时，这个函数名才算纯函数。
+from collections import OrderedDict
+import copy
+import AST
+
+# 纯函数中可以调用的内置函数
+PURE_BUILTINS = ('len',)
+# 函数体中出现就不是纯函数的节点
+IMPURE_TYPES = ('assign', 'function_def', 'python_call')
+
+# MemoCache.lookup没有找到时的返回值
+MISSING = object()
+
+def pure_functions(node : AST.ASTNode):
+    '''程序中的纯函数名'''
+    definitions = {} # 函数名 -> [(这个定义是否满足条件, 调用的函数名)]
+    _collect_definitions(node, definitions)
+    pure = {name for name, defs in definitions.items() if all(ok for ok, _ in defs)}
+    # 调用了非纯函数（包括没有定义的函数）的函数也不是纯函数，直到没有变化
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            for _, calls in definitions[name]:
+                if not calls <= pure:
+                    pure.discard(name)
+                    changed = True
+                    break
+    return pure
+
+def _collect_definitions(node : AST.ASTNode, definitions : dict):
+    if node.type == 'function_def':
+        params = [arg.value for arg in node.children[0].children if arg.type == 'ID']
+        valid = len(params) == len(node.children[0].children) and len(set(params)) == len(params)
+        calls = set()
+        ok = valid and _check_body(node.children[1], set(params), calls)
+        definitions.setdefault(node.operation, []).append((ok, calls))
+    for child in node.children:
+        _collect_definitions(child, definitions)
+
+def _check_body(node : AST.ASTNode, params : set, calls : set):
+    '''函数体是否只读参数、没有副作用，把调用的DSL函数名加入calls'''
+    if node.type in IMPURE_TYPES:
+        return False
+    if node.type in ('ID', 'array_item') and node.value not in params:
+        return False
+    if node.type == 'function_call' and node.operation not in PURE_BUILTINS:
+        if node.operation in ('print', 'input'):
+            return False
+        calls.add(node.operation)
+    return all(_check_body(child, params, calls) for child in node.children)
+
+def freeze(value):
+    '''
+    参数值转换成缓存键
+
+    数组转换成元组；True和1、1和1.0在DSL中结果不同，键中带上类型。
+    小数用repr，0.0和-0.0转成字符串后不同
+    '''
+    if isinstance(value, list):
+        return (list, tuple([freeze(item) for item in value]))
+    if isinstance(value, float):
+        return (float, repr(value))
+    return (type(value), value)
+
+def _contains_list(values : list):
+    return any(isinstance(value, list) for value in values)
+
+class MemoCache:
+    '''
+    一个纯函数的调用结果，超过size条时淘汰最久没有用过的结果
+
+    返回数组时每次给出一份拷贝，调用者修改结果不会影响缓存。
+    参数中有数组时，返回的数组可能就是参数（或者包含参数），这样的结果不缓存
+    '''
+    def __init__(self, name : str, size : int):
+        self.name = name
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict() # freeze后的参数 -> (是否是数组, 返回值)
+
+    def key(self, arguments : list):
+        '''参数对应的缓存键，参数中的数组包含自己时返回None，不缓存'''
+        try:
+            return tuple([freeze(arg) for arg in arguments])
+        except RecursionError:
+            return None
+
+    def lookup(self, key):
+        '''缓存的结果，没有时返回MISSING'''
+        cached = self._results.get(key) if key is not None else None
+        if cached is None:
+            self.misses += 1
+            return MISSING
+        self._results.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(cached[1]) if cached[0] else cached[1]
+
+    def store(self, key, arguments : list, value):
+        if key is None:
+            return
+        if isinstance(value, list):
+            if _contains_list(arguments):
+                return
+            self._results[key] = (True, copy.deepcopy(value))
+        else:
+            self._results[key] = (False, value)
+        self._results.move_to_end(key)
+        while len(self._results) > self.size:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        self._results.clear()
+
+# 示例用法
+if __name__ == '__main__':
+    import lexer, parser, sys
+    if len(sys.argv) < 2:
+        raise Exception("需要输入您的代码文件")
+    elif len(sys.argv) > 2:
+        raise Exception("您输入的文件太多了")
+    else :
+        with open(sys.argv[1], 'r', encoding='utf-8') as file:
+            source = file.read()
+        node = parser.Parser(lexer.Lexer()).parse(source)
+        print(' '.join(sorted(pure_functions(node))))
@@ -0,0 +1,151 @@
+# operations.py
+# 这个模块是各个编译运行模式共用的运算，检查规则和报错信息与Interpreter逐节点解释时一致。
+
+# 比较运算符，compare的第一个参数是它们的下标
+COMPARE_OPS = ('==', '!=', '<', '<=', '>', '>=')
+
+def load_name(variables : list, name : str):
+    '''从栈顶开始查找变量'''
+    for i in range(len(variables) - 1, -1, -1):
+        if name in variables[i]:
+            return variables[i][name]
+    raise Exception(f"变量 {name} 未赋值")
+
+def store_name(variables : list, name : str, value):
+    '''给栈中所有同名变量赋值，找不到时设为全局变量'''
+    find_var = False
+    for i in range(len(variables) - 1, -1, -1):
+        if name in variables[i]:
+            find_var = True
+            variables[i][name] = value
+    if not find_var:
+        variables[0][name] = value
+
+def find_frame(variables : list, name : str, start : int):
+    '''
+    从第start个栈帧往下找有变量name的栈帧，返回下标，找不到时返回-1
+
+    解释器给栈中每个同名变量赋值时都重新计算一次右边的表达式，表达式可能改变栈中的变量，
+    所以每赋值一次再往下找下一个栈帧，而不是一开始就找出所有的栈帧
+    '''
+    for i in range(start, -1, -1):
+        if name in variables[i]:
+            return i
+    return -1
+
+def check_array(name : str, value):
+    '''给数组元素赋值前检查变量是数组，返回这个数组'''
+    if not isinstance(value, list):
+        raise Exception(f'{name} 是一个变量而不是数组')
+    return value
+
+def check_index(name : str, array : list, idx):
+    '''给数组元素赋值前检查索引'''
+    if not isinstance(idx, int):
+        raise Exception(f'{idx} 不是整数')
+    if idx >= len(array) or idx < 0:
+        raise Exception(f'数组 {name} 不包含第 {idx} 项')
+
+def load_item(variables : list, name : str, idx):
+    '''获取数组元素，先检查索引再从栈顶开始查找数组'''
+    if not isinstance(idx, int):
+        raise Exception(f"数组 {name} 的索引 {idx} 不是一个数字")
+    for i in range(len(variables) - 1, -1, -1):
+        if name in variables[i]:
+            m = variables[i][name]
+            if isinstance(m, (int, float)):
+                raise Exception(f"变量 {name} 是一个数而不是数组")
+            if len(m) <= idx or idx < 0:
+                raise Exception(f"数组 {name} 没有第 {idx} 项")
+            return m[idx]
+    raise Exception(f"没有找到变量 {name}")
+
+def find_array(variables : list, name : str):
+    '''数组元素赋值前检查变量，变量不存在返回False'''
+    find_var = False
+    for i in range(len(variables) - 1, -1, -1):
+        if name in variables[i]:
+            find_var = True
+            if not isinstance(variables[i].get(name), list):
+                raise Exception(f'{name} 是一个变量而不是数组')
+    return find_var
+
+def store_item(variables : list, name : str, idx, value):
+    '''给栈中所有同名数组的对应项赋值，数组本身已由find_array检查过'''
+    if not isinstance(idx, int):
+        raise Exception(f'{idx} 不是整数')
+    for i in range(len(variables) - 1, -1, -1):
+        if name in variables[i]:
+            array_value = variables[i][name]
+            if idx >= len(array_value) or idx < 0:
+                raise Exception(f'数组 {name} 不包含第 {idx} 项')
+            array_value[idx] = value
+
+def add(val1, val2):
+    '''加法，数、字符串和数组可以相加'''
+    if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+        return val1 + val2
+    if isinstance(val1, str) and isinstance(val2, str):
+        return val1 + val2
+    if isinstance(val1, list) and isinstance(val2, list):
+        return val1 + val2
+    raise Exception(f"{val1} 和 {val2} 类型不一致，不能进行加法")
+
+def subtract(val1, val2):
+    '''减法，只能对数使用'''
+    if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+        return val1 - val2
+    raise Exception(f"{val1} 和 {val2} 不是全数，不能进行减法")
+
+def multiply(val1, val2):
+    '''乘法，有一个是整数或者都是小数'''
+    if isinstance(val1, int) or isinstance(val2, int):
+        return val1 * val2
+    if isinstance(val1, float) and isinstance(val2, float):
+        return val1 * val2
+    raise Exception(f"{val1} 和 {val2} 无法做乘法")
+
+def divide(val1, val2):
+    '''除法，除数不能为零'''
+    if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+        if val2 == 0:
+            raise Exception(f"除数不能为零 ({val1} / {val2})")
+        return val1 / val2
+    raise Exception(f"{val1} 和 {val2} 无法做除法")
+
+def compare(op : int, val1, val2):
+    '''比较运算，op是COMPARE_OPS中的下标'''
+    if op == 0:
+        return val1 == val2
+    if op == 1:
+        return val1 != val2
+    operation = COMPARE_OPS[op]
+    if not ((isinstance(val1, (int, float)) and isinstance(val2, (int, float)))
+            or (isinstance(val1, str) and isinstance(val2, str))
+            or (isinstance(val1, list) and isinstance(val2, list))):
+        raise Exception(f"{val1} 和 {val2} 之间不能使用{operation}运算符")
+    if op == 2:
+        return val1 < val2
+    if op == 3:
+        return val1 <= val2
+    if op == 4:
+        return val1 > val2
+    return val1 >= val2
+
+def negative(val):
+    '''取负值'''
+    if isinstance(val, (int, float)):
+        return -val
+    raise Exception(f"{val} 不是数，无法取负值")
+
+def atoi(val):
+    '''字符串转数，不能转成整数时尝试转成小数'''
+    if not isinstance(val, str):
+        raise Exception(f"{val} 不是字符串, 操作符atoi出错")
+    try:
+        return int(val)
+    except ValueError:
+        try:
+            return float(val)
+        except ValueError:
+            raise Exception(f"字符串 '{val}' 无法转换成数字")
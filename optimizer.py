@@ -0,0 +1,347 @@
+# optimizer.py
+# 这个模块在语法分析之后、运行之前改写AST树，不改变程序的输出和报错：
+#   flatten   把嵌套的or/and展开成一层
+#   fold      计算只有字面量的运算，会出错的运算（比如除以零）保留到运行时再报错
+#   branches  删除条件为字面量的if/while中不会执行的部分，以及return后面的语句
+#   cse       同一个表达式中重复出现的无副作用子表达式只计算一次
+# 各个运行模式都支持cse_store/cse_load节点：cse_store计算子节点并把值存进编号为value的临时槽位，
+# cse_load直接取出这个值。
+import AST, operations
+import math, sys
+
+# 优化规则的版本，修改规则后要加一，让缓存的编译结果失效
+VERSION = 2
+
+PASSES = ('flatten', 'fold', 'branches', 'cse')
+
+# 折叠结果的大小限制，太长的字符串和太大的整数不折叠，避免程序和缓存变大
+MAX_FOLDED_STRING = 1024
+MAX_FOLDED_INT_BITS = 1024
+
+# 可以参与公共子表达式复用的节点类型：求值不修改变量，也不调用函数
+_CSE_TYPES = ('array_item', 'expression', 'term', 'factor', 'boolterm', 'boolfactor')
+# 不会修改变量、不会调用外部代码的节点类型
+_PURE_TYPES = AST.LITERAL_TYPES + ('ID', 'array_item', 'expression', 'term', 'factor', 'boolterm',
+                                   'boolfactor', 'boolexpression', 'condition', 'array', 'argument_list')
+
+def count_nodes(node : AST.ASTNode):
+    '''树中节点的个数，共用的字面量节点按出现次数计算'''
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+def optimize(node : AST.ASTNode, passes : tuple = PASSES, stats : list = None):
+    '''
+    依次运行passes中的优化，返回优化后的树（原来的树会被修改）
+
+    stats不为None时，每个优化结束后追加(名字, 优化前节点数, 优化后节点数)
+    '''
+    optimizer = Optimizer()
+    for name in passes:
+        before = count_nodes(node) if stats is not None else 0
+        node = getattr(optimizer, name)(node)
+        if stats is not None:
+            stats.append((name, before, count_nodes(node)))
+    return node
+
+def _is_literal(node : AST.ASTNode):
+    return node.type in AST.LITERAL_TYPES
+
+class Optimizer:
+    '''AST树上的各个优化，每个方法接收一棵树，返回改写后的树'''
+    def __init__(self):
+        self._literals = {} # 折叠出来的字面量节点也共用
+        self._slots = 0     # 已经分配的临时槽位数
+
+    def _literal(self, value):
+        '''值为value的字面量节点，不能表示成字面量时返回None'''
+        if isinstance(value, bool):
+            return AST.literal('TRUE' if value else 'FALSE', value, self._literals)
+        if isinstance(value, int):
+            if value.bit_length() > MAX_FOLDED_INT_BITS:
+                return None
+            return AST.literal('NUMBER', value, self._literals)
+        if isinstance(value, float):
+            # inf和nan没有对应的字面量写法
+            if not math.isfinite(value):
+                return None
+            return AST.literal('NUMBER', value, self._literals)
+        if isinstance(value, str):
+            if len(value) > MAX_FOLDED_STRING:
+                return None
+            return AST.literal('STR', value, self._literals)
+        return None
+
+    # ---------------------------- flatten ----------------------------
+
+    def flatten(self, node : AST.ASTNode):
+        '''
+        a or (b or c) 展开成 a or b or c，and同理
+
+        里层的结果只用来判断真假，求值顺序和短路的位置都不变
+        '''
+        for child in node.children:
+            self.flatten(child)
+        if node.type in ('condition', 'boolexpression'):
+            children = []
+            for child in node.children:
+                if child.type == node.type:
+                    children.extend(child.children)
+                else:
+                    children.append(child)
+            node.children = children
+        return node
+
+    # ---------------------------- fold ----------------------------
+
+    def fold(self, node : AST.ASTNode):
+        '''计算只有字面量的运算'''
+        if _is_literal(node):
+            return node
+        node.children = [self.fold(child) for child in node.children]
+        if node.type == 'condition':
+            return self._fold_short_circuit(node, True)
+        if node.type == 'boolexpression':
+            return self._fold_short_circuit(node, False)
+        if not node.children or not all(_is_literal(child) for child in node.children):
+            return node
+        try:
+            value = self._evaluate(node)
+        except Exception:
+            return node # 运行时会报错，留给运行时
+        if value is _UNKNOWN:
+            return node
+        folded = self._literal(value)
+        return folded if folded is not None else node
+
+    def _evaluate(self, node : AST.ASTNode):
+        '''计算子节点都是字面量的节点，和解释器的规则相同；不能计算时返回_UNKNOWN'''
+        values = [child.value for child in node.children]
+        operation = node.operation
+        if node.type == 'expression' and len(values) == 2:
+            if operation == '+':
+                return operations.add(*values)
+            if operation == '-':
+                return operations.subtract(*values)
+        elif node.type == 'term' and len(values) == 2:
+            if operation == '*':
+                # 字符串乘以整数可能很长，先估计长度
+                if isinstance(values[0], str) and isinstance(values[1], int) and \
+                        len(values[0]) * values[1] > MAX_FOLDED_STRING:
+                    return _UNKNOWN
+                if isinstance(values[1], str) and isinstance(values[0], int) and \
+                        len(values[1]) * values[0] > MAX_FOLDED_STRING:
+                    return _UNKNOWN
+                return operations.multiply(*values)
+            if operation == '/':
+                return operations.divide(*values)
+        elif node.type == 'factor' and len(values) == 1:
+            if operation == '-':
+                return operations.negative(values[0])
+            if operation == 'atoi':
+                return operations.atoi(values[0])
+            if operation == 'itoa':
+                return str(values[0])
+        elif node.type == 'boolterm' and len(values) == 2:
+            if operation in operations.COMPARE_OPS:
+                return operations.compare(operations.COMPARE_OPS.index(operation), *values)
+        elif node.type == 'boolfactor' and len(values) == 1:
+            if operation == 'not':
+                return not values[0]
+        return _UNKNOWN
+
+    def _fold_short_circuit(self, node : AST.ASTNode, is_or : bool):
+        '''
+        or遇到真的字面量后面都不会求值；假的字面量不影响结果，可以去掉（and相反）
+
+        第一个操作数就能确定结果时整个节点变成字面量；
+        只剩非字面量的操作数时节点保留，结果仍然要转换成True或False
+        '''
+        children = []
+        for child in node.children:
+            if _is_literal(child):
+                if bool(child.value) == is_or:
+                    if not children:
+                        return self._literal(is_or)
+                    children.append(self._literal(is_or))
+                    break
+                continue
+            children.append(child)
+        if not children:
+            return self._literal(not is_or)
+        node.children = children
+        return node
+
+    # ---------------------------- branches ----------------------------
+
+    def branches(self, node : AST.ASTNode):
+        '''删除不会执行的语句'''
+        if node.type == 'program':
+            self._prune_program(node)
+        else:
+            for child in node.children:
+                if not _is_literal(child):
+                    self.branches(child)
+        return node
+
+    def _prune_program(self, node : AST.ASTNode):
+        children = []
+        for child in node.children:
+            if child.type in ('if', 'while'):
+                self._test_only(child)
+            replacement = self._prune_statement(child)
+            if replacement == [child]:
+                self.branches(child)
+            children.extend(replacement)
+            if replacement and replacement[-1].type == 'return':
+                break # return后面的语句不会执行
+        node.children = children
+
+    def _test_only(self, node : AST.ASTNode):
+        '''if/while的条件只用来判断真假，只有一个操作数的or/and可以去掉'''
+        condition = node.children[0]
+        while condition.type in ('condition', 'boolexpression') and len(condition.children) == 1:
+            condition = condition.children[0]
+        node.children[0] = condition
+
+    def _prune_statement(self, node : AST.ASTNode):
+        '''返回代替这条语句的语句列表'''
+        if node.type == 'if' and _is_literal(node.children[0]):
+            # 条件是字面量时直接换成要执行的分支中的语句，这些语句和if在同一层执行，遇到return时一样会返回
+            if node.children[0].value:
+                return self._spliced(node.children[1])
+            if len(node.children) == 3:
+                return self._spliced(node.children[2])
+            return []
+        if node.type == 'while' and _is_literal(node.children[0]) and not node.children[0].value:
+            return []
+        return [node]
+
+    def _spliced(self, body : AST.ASTNode):
+        '''展开分支中的语句，分支本身也要先删除不会执行的语句'''
+        self._prune_program(body)
+        return body.children
+
+    # ---------------------------- cse ----------------------------
+
+    def cse(self, node : AST.ASTNode):
+        '''
+        在一个表达式中复用重复出现的无副作用子表达式
+
+        只处理不调用DSL函数、input和外部脚本的表达式，这样在两次出现之间变量不会被修改，
+        虚拟机也不会在中间暂停。第一次出现一定先于后面的出现求值时（不在or/and后面的操作数里），
+        第一次出现改成cse_store，后面的改成cse_load。
+        结果可能是新数组的运算不复用，否则两处会得到同一个数组
+        '''
+        for root in self._expression_roots(node):
+            parent, index = root
+            expr = parent.children[index]
+            if not self._is_pure(expr):
+                continue
+            self._reuse(parent, index)
+        return node
+
+    def _expression_roots(self, node : AST.ASTNode):
+        '''所有语句中的表达式的位置(父节点, 下标)'''
+        roots = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.type == 'program':
+                stack.extend(node.children)
+            elif node.type == 'assign':
+                target = node.children[0]
+                if target.type == 'array_item':
+                    roots.append((target, 0))
+                roots.append((node, 1))
+            elif node.type in ('if', 'while'):
+                roots.append((node, 0))
+                stack.extend(node.children[1:])
+            elif node.type == 'function_def':
+                stack.append(node.children[1])
+            elif node.type == 'return':
+                if node.children:
+                    roots.append((node, 0))
+            elif node.type == 'function_call':
+                # 作为语句的print/len，参数列表是一个表达式
+                if node.operation in ('print', 'len'):
+                    roots.append((node, 0))
+        return roots
+
+    def _is_pure(self, node : AST.ASTNode):
+        '''表达式中没有DSL函数、input和外部脚本调用'''
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.type == 'function_call':
+                if node.operation not in ('print', 'len'):
+                    return False
+            elif node.type not in _PURE_TYPES:
+                return False
+            stack.extend(node.children)
+        return True
+
+    def _reuse(self, parent : AST.ASTNode, index : int):
+        seen = {}   # 子表达式 -> [第一次出现的父节点, 下标, 条件路径, 槽位]
+        # 按求值顺序遍历：(父节点, 下标, 条件路径)，条件路径记录经过的or/and中不一定求值的操作数
+        stack = [(parent, index, ())]
+        while stack:
+            parent, index, path = stack.pop()
+            node = parent.children[index]
+            if node.type in _CSE_TYPES and (node.type == 'array_item' or not _may_be_list(node)):
+                key = _expression_key(node)
+                first = seen.get(key)
+                if first is not None and path[:len(first[2])] == first[2]:
+                    # 第一次出现一定已经求过值
+                    if first[3] is None:
+                        first[3] = self._slots
+                        self._slots += 1
+                        stored = first[0].children[first[1]]
+                        first[0].children[first[1]] = AST.ASTNode('cse_store', value=first[3], children=[stored],
+                                                                  lineno=stored.lineno, col=stored.col)
+                    parent.children[index] = AST.ASTNode('cse_load', value=first[3], lineno=node.lineno, col=node.col)
+                    continue
+                if first is None:
+                    seen[key] = [parent, index, path, None]
+            conditional = node.type in ('condition', 'boolexpression')
+            for i in range(len(node.children) - 1, -1, -1):
+                child_path = path + ((id(node), i),) if conditional and i > 0 else path
+                stack.append((node, i, child_path))
+
+_UNKNOWN = object()
+
+def _expression_key(node : AST.ASTNode):
+    '''结构相同的表达式有相同的键，1、1.0和true不相同'''
+    if _is_literal(node):
+        return (node.type, type(node.value), node.value)
+    return (node.type, node.value, node.operation, tuple(_expression_key(child) for child in node.children))
+
+def _may_be_list(node : AST.ASTNode):
+    '''表达式的值可能是一个新数组'''
+    if node.type in ('expression', 'term'):
+        if node.operation == '+':
+            return _may_be_list(node.children[0]) and _may_be_list(node.children[1])
+        if node.operation == '*':
+            return _may_be_list(node.children[0]) or _may_be_list(node.children[1])
+        return False
+    return node.type in ('ID', 'array_item', 'array', 'argument_list', 'function_call', 'cse_load', 'cse_store')
+
+# 示例用法
+if __name__ == '__main__':
+    import lexer, parser
+    if len(sys.argv) < 2:
+        raise Exception("需要输入您的代码文件")
+    elif len(sys.argv) > 2:
+        raise Exception("您输入的文件太多了")
+    else :
+        with open(sys.argv[1], 'r', encoding='utf-8') as file:
+            source = file.read()
+        stats = []
+        root = optimize(parser.Parser(lexer.Lexer()).parse(source), stats=stats)
+        root.print()
+        for name, before, after in stats:
+            print(f"{name}: {before} -> {after}", file=sys.stderr)
@@ -2,7 +2,7 @@
 import ply.yacc as yacc
 import lexer
 import AST
-import sys
+import os, sys
 
 class ParserError(Exception):
     def __init__(self, message, token=None):
@@ -97,15 +97,42 @@ class Parser:
     def __init__(self, Lexer: lexer.Lexer):
         self._lexer = Lexer
         self.tokens = Lexer.tokens
-        self._yacc = yacc.yacc(module=self, debug=True, method='LALR')
+        self._literals = {} # 共用的字面量节点
+        # 分析表预先生成在parsetab.py中，文法的签名一致时直接读入；
+        # 修改文法后PLY会重新生成并覆盖parsetab.py
+        self._yacc = yacc.yacc(module=self, debug=False, method='LALR', tabmodule='parsetab',
+                               outputdir=os.path.dirname(os.path.abspath(__file__)))
 
     def _p_ASTNode(self, node):
         """用p构造ASTNode"""
         if isinstance(node, AST.ASTNode):
             return node
+        elif node['type'] in AST.LITERAL_TYPES:
+            # 值相同的字面量共用一个节点
+            return AST.literal(node['type'], node['value'], self._literals)
         else:
             return AST.ASTNode(type=node['type'], value=node['value'])
 
+    def _locate(self, node : AST.ASTNode, p, n : int = 1):
+        """
+        把p中从第n个符号起第一个知道位置的符号的行号、列号记到node上，返回node
+
+        词法标记的位置由Lexer.iter_tokens给出；非终结符的值是AST节点时用节点的位置，
+        共用的字面量节点没有位置，跳过它看后面的符号
+        """
+        for symbol in p.slice[n:]:
+            col = getattr(symbol, 'col', None)
+            if col is not None:
+                node.lineno = symbol.lineno
+                node.col = col
+                break
+            value = symbol.value
+            if isinstance(value, AST.ASTNode) and value.lineno is not None:
+                node.lineno = value.lineno
+                node.col = value.col
+                break
+        return node
+
     def _create_children(self, *child_list):
         """构造ASTNode的数组"""
         root_children = []
@@ -140,8 +167,8 @@ class Parser:
         '''
             python_call : CALLPY LPAREN argument_lists RPAREN
         '''
-        p[0] = AST.ASTNode(type = 'python_call', operation = p[1]['value'], 
-                           children=self._create_children(p[3]))
+        p[0] = self._locate(AST.ASTNode(type = 'python_call', operation = p[1]['value'], 
+                                         children=self._create_children(p[3])), p)
         
     def p_assign(self, p):
         """
@@ -149,8 +176,10 @@ class Parser:
                   | array_item ASSIGNMENT expression
         """
         if len(p) == 4:
-            p[0] = AST.ASTNode(type='assign', operation=p[2],
-                               children=self._create_children(p[1], p[3]))
+            p[0] = self._locate(AST.ASTNode(type='assign', operation=p[2],
+                                            children=self._create_children(p[1], p[3])), p)
+            if isinstance(p[1], dict):
+                self._locate(p[0].children[0], p)
 
     def p_if_state(self, p):
         '''
@@ -161,24 +190,25 @@ class Parser:
             p[0] = AST.ASTNode(type='if', children=self._create_children(p[2], p[4]))
         else:
             p[0] = AST.ASTNode(type='if', children=self._create_children(p[2], p[4], p[6]))
+        self._locate(p[0], p)
 
     def p_while_state(self, p):
         '''while_state : WHILE condition BEGIN program END'''
-        p[0] = AST.ASTNode(type='while', children=self._create_children(p[2], p[4]))
+        p[0] = self._locate(AST.ASTNode(type='while', children=self._create_children(p[2], p[4])), p)
 
     def p_function_def(self, p):
         '''
             function_def : FUNCTION ID LPAREN argument_lists RPAREN BEGIN program END
         '''
-        p[0] = AST.ASTNode(type='function_def', operation=p[2]['value'],
-                           children=self._create_children(p[4], p[7]))
+        p[0] = self._locate(AST.ASTNode(type='function_def', operation=p[2]['value'],
+                                         children=self._create_children(p[4], p[7])), p)
 
     def p_function_call(self, p):
         '''
             function_call : ID LPAREN argument_lists RPAREN
         '''
-        p[0] = AST.ASTNode(type='function_call', operation=p[1]['value'],
-                           children=self._create_children(p[3]))
+        p[0] = self._locate(AST.ASTNode(type='function_call', operation=p[1]['value'],
+                                         children=self._create_children(p[3])), p)
 
     def p_return_statement(self, p):
         '''
@@ -189,6 +219,7 @@ class Parser:
             p[0] = AST.ASTNode(type='return')
         else:
             p[0] = AST.ASTNode(type='return', children=self._create_children(p[2]))
+        self._locate(p[0], p)
 
     def p_condition(self, p):
         '''    
@@ -200,8 +231,8 @@ class Parser:
                 p[0] = p[1]
                 p[0].add_child(self._p_ASTNode(p[3]))
             else :
-                p[0] = AST.ASTNode(type='condition', operation=p[2],
-                                   children=self._create_children(p[1], p[3]))
+                p[0] = self._locate(AST.ASTNode(type='condition', operation=p[2],
+                                                children=self._create_children(p[1], p[3])), p)
         else :
             p[0] = p[1]
 
@@ -215,8 +246,8 @@ class Parser:
                 p[0] = p[1]
                 p[0].add_child(self._p_ASTNode(p[3]))
             else :
-                p[0] = AST.ASTNode(type='boolexpression', operation=p[2],
-                                   children=self._create_children(p[1], p[3]))
+                p[0] = self._locate(AST.ASTNode(type='boolexpression', operation=p[2],
+                                                children=self._create_children(p[1], p[3])), p)
         else :
             p[0] = self._p_ASTNode(p[1])
     
@@ -233,8 +264,8 @@ class Parser:
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = AST.ASTNode(type = 'boolterm', operation=p[2], 
-                               children=self._create_children(p[1], p[3]))
+            p[0] = self._locate(AST.ASTNode(type = 'boolterm', operation=p[2], 
+                                            children=self._create_children(p[1], p[3])), p)
     def p_boolfactor(self, p):
         '''
             boolfactor :  NOT boolfactor
@@ -243,8 +274,8 @@ class Parser:
         if len(p) == 2 :
             p[0] = p[1]
         else:
-            p[0] = AST.ASTNode(type='boolfactor', operation=p[1], 
-                               children=self._create_children(p[2]))
+            p[0] = self._locate(AST.ASTNode(type='boolfactor', operation=p[1], 
+                                            children=self._create_children(p[2])), p)
 
     def p_expression(self, p):
         """
@@ -253,8 +284,8 @@ class Parser:
                         | term
         """
         if len(p) == 4:
-            p[0] = AST.ASTNode(type='expression', operation=p[2], 
-                               children=self._create_children(p[1], p[3]))
+            p[0] = self._locate(AST.ASTNode(type='expression', operation=p[2], 
+                                            children=self._create_children(p[1], p[3])), p)
         else:
             p[0] = p[1]
 
@@ -265,8 +296,8 @@ class Parser:
                 | factor
         """
         if len(p) == 4:
-            p[0] = AST.ASTNode(type='term', operation=p[2], 
-                               children=self._create_children(p[1], p[3]))
+            p[0] = self._locate(AST.ASTNode(type='term', operation=p[2], 
+                                            children=self._create_children(p[1], p[3])), p)
         else:
             p[0] = p[1]
     def p_factor(self, p):
@@ -286,27 +317,31 @@ class Parser:
                   | function_call
         """
         if len(p) == 2:
-            p[0] = p[1]
+            if isinstance(p[1], dict) and p[1]['type'] == 'ID':
+                # 标识符在这里就变成节点，之后的规则拿不到它的词法标记
+                p[0] = self._locate(self._p_ASTNode(p[1]), p)
+            else:
+                p[0] = p[1]
         elif len(p) == 3 : # factor -> -factor
-            p[0] = AST.ASTNode(type='factor', operation=p[1],
-                               children=self._create_children(p[2]))
+            p[0] = self._locate(AST.ASTNode(type='factor', operation=p[1],
+                                            children=self._create_children(p[2])), p)
         elif len(p) == 4: # factor -> (atoi)factor | (itoa)factor
             p[0] = p[2]
         elif len(p) == 5 : # factor -> (itoa)factor | (atoi)factor
-            p[0] = AST.ASTNode(type='factor', operation=p[2],
-                               children=self._create_children(p[4]))
+            p[0] = self._locate(AST.ASTNode(type='factor', operation=p[2],
+                                            children=self._create_children(p[4])), p)
             
     def p_array_item(self, p):
         '''
             array_item : ID LBRACKET expression RBRACKET
         '''
-        p[0] = AST.ASTNode(type='array_item', value=p[1]['value'], children=self._create_children(p[3]))
+        p[0] = self._locate(AST.ASTNode(type='array_item', value=p[1]['value'], children=self._create_children(p[3])), p)
 
     def p_array(self, p) :
         '''
             array : LBRACKET argument_lists RBRACKET
         '''
-        p[0] = AST.ASTNode(type='array', children=self._create_children(p[2]))
+        p[0] = self._locate(AST.ASTNode(type='array', children=self._create_children(p[2])), p)
     
     def p_argument_lists(self, p):
         """
@@ -346,7 +381,16 @@ class Parser:
         
     def parse(self, code : str):
         '''对目标文件进行语法分析，返回AST数的根节点'''
-        return self._yacc.parse(code, lexer=self._lexer.lexer)
+        return self.parse_tokens(self._lexer.iter_tokens([code]))
+
+    def parse_file(self, path : str):
+        '''边读文件边进行语法分析，整个源代码和所有标记不会同时放在内存中'''
+        return self.parse_tokens(self._lexer.iter_tokens(lexer.read_chunks(path)))
+
+    def parse_tokens(self, tokens):
+        '''对已经得到的标记（Lexer.iter_tokens或tokenize的结果）进行语法分析，返回AST树的根节点'''
+        tokens = iter(tokens)
+        return self._yacc.parse(lexer=self._lexer.lexer, tokenfunc=lambda: next(tokens, None))
         
 # 示例用法
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+
+# parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'AND ASSIGNMENT ATOI BEGIN CALLPY COMMA DIVIDE ELSE END EQUAL FALSE FUNCTION GEQ GTR ID IF ITOA LBRACKET LEQ LPAREN LSS MINUS NEQ NOT NUMBER OR PLUS RBRACKET RETURN RPAREN STR TIMES TRUE WHILE\n            program : program statement\n                   | \n        \n            statement : assign\n                     | if_state\n                     | while_state\n                     | python_call\n                     | function_call\n                     | function_def\n                     | return_statement\n        \n            python_call : CALLPY LPAREN argument_lists RPAREN\n        \n            assign : ID ASSIGNMENT expression\n                  | array_item ASSIGNMENT expression\n        \n            if_state : IF condition BEGIN program END\n                    | IF condition BEGIN program ELSE program END\n        while_state : WHILE condition BEGIN program END\n            function_def : FUNCTION ID LPAREN argument_lists RPAREN BEGIN program END\n        \n            function_call : ID LPAREN argument_lists RPAREN\n        \n            return_statement : RETURN\n                              | RETURN condition\n            \n            condition ::= condition OR boolexpression\n                        | boolexpression\n        \n            boolexpression : boolexpression AND boolterm\n                            | boolterm\n        \n            boolterm : boolfactor\n                      | boolterm EQUAL boolfactor\n                      | boolterm NEQ boolfactor\n                      | boolterm LEQ boolfactor\n                      | boolterm LSS boolfactor\n                      | boolterm GEQ boolfactor\n                      | boolterm GTR boolfactor\n        \n            boolfactor :  NOT boolfactor\n                        | expression\n        \n            expression : expression PLUS term\n                        | expression MINUS term\n                        | term\n        \n            term : term TIMES factor\n                | term DIVIDE factor\n                | factor\n        \n            factor : LPAREN condition RPAREN\n                  | MINUS factor\n                  | LPAREN ATOI RPAREN factor\n                  | LPAREN ITOA RPAREN factor\n                  | NUMBER\n                  | STR\n                  | ID\n                  | array_item\n                  | array\n                  | python_call\n                  | TRUE\n                  | FALSE\n                  | function_call\n        \n            array_item : ID LBRACKET expression RBRACKET\n        \n            array : LBRACKET argument_lists RBRACKET\n        \n            argument_lists : argument_list \n                            |\n        \n            argument_list : expression\n                        | argument_list COMMA expression\n        '
+    
+_lr_action_items = {'ID':([0,1,2,3,4,5,6,7,8,9,12,13,15,16,17,18,19,20,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,42,44,45,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,90,91,92,93,94,97,98,99,100,101,103,104,105,106,107,],[-2,10,-1,-3,-4,-5,-6,-7,-8,-9,33,33,43,33,33,33,33,33,-21,-23,-24,33,-32,-35,33,-38,33,-43,-44,-45,-46,-47,-48,-49,-50,-51,33,33,-19,-11,-12,-2,33,33,33,33,33,33,33,33,-31,33,33,33,33,-40,-2,33,-17,33,-52,10,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,33,33,-53,10,-10,-13,-2,-41,-42,-15,10,-2,-14,10,-16,]),'IF':([0,1,2,3,4,5,6,7,8,9,16,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,44,45,50,51,60,65,70,73,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,92,93,94,97,98,99,100,101,103,104,105,106,107,],[-2,12,-1,-3,-4,-5,-6,-7,-8,-9,-18,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-19,-11,-12,-2,-31,-40,-2,-17,-52,12,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,12,-10,-13,-2,-41,-42,-15,12,-2,-14,12,-16,]),'WHILE':([0,1,2,3,4,5,6,7,8,9,16,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,44,45,50,51,60,65,70,73,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,92,93,94,97,98,99,100,101,103,104,105,106,107,],[-2,13,-1,-3,-4,-5,-6,-7,-8,-9,-18,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-19,-11,-12,-2,-31,-40,-2,-17,-52,13,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,13,-10,-13,-2,-41,-42,-15,13,-2,-14,13,-16,]),'CALLPY':([0,1,2,3,4,5,6,7,8,9,12,13,16,17,18,19,20,22,23,24,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,42,44,45,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,70,72,73,74,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,90,91,92,93,94,97,98,99,100,101,103,104,105,106,107,],[-2,14,-1,-3,-4,-5,-6,-7,-8,-9,14,14,14,14,14,14,14,-21,-23,-24,14,-32,-35,14,-38,14,-43,-44,-45,-46,-47,-48,-49,-50,-51,14,14,-19,-11,-12,-2,14,14,14,14,14,14,14,14,-31,14,14,14,14,-40,-2,14,-17,14,-52,14,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,14,14,-53,14,-10,-13,-2,-41,-42,-15,14,-2,-14,14,-16,]),'FUNCTION':([0,1,2,3,4,5,6,7,8,9,16,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,44,45,50,51,60,65,70,73,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,92,93,94,97,98,99,100,101,103,104,105,106,107,],[-2,15,-1,-3,-4,-5,-6,-7,-8,-9,-18,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-19,-11,-12,-2,-31,-40,-2,-17,-52,15,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,15,-10,-13,-2,-41,-42,-15,15,-2,-14,15,-16,]),'RETURN':([0,1,2,3,4,5,6,7,8,9,16,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,44,45,50,51,60,65,70,73,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,92,93,94,97,98,99,100,101,103,104,105,106,107,],[-2,16,-1,-3,-4,-5,-6,-7,-8,-9,-18,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-19,-11,-12,-2,-31,-40,-2,-17,-52,16,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,16,-10,-13,-2,-41,-42,-15,16,-2,-14,16,-16,]),'$end':([0,1,2,3,4,5,6,7,8,9,16,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,44,45,50,60,65,73,75,77,78,79,80,81,82,83,84,85,86,87,88,89,92,94,97,99,100,101,105,107,],[-2,0,-1,-3,-4,-5,-6,-7,-8,-9,-18,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-19,-11,-12,-31,-40,-17,-52,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-13,-41,-42,-15,-14,-16,]),'END':([2,3,4,5,6,7,8,9,16,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,44,45,50,51,60,65,70,73,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,92,93,94,97,98,99,100,101,103,104,105,106,107,],[-1,-3,-4,-5,-6,-7,-8,-9,-18,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-19,-11,-12,-2,-31,-40,-2,-17,-52,97,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,101,-10,-13,-2,-41,-42,-15,105,-2,-14,107,-16,]),'ELSE':([2,3,4,5,6,7,8,9,16,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,44,45,50,51,60,65,73,75,76,77,78,79,80,81,82,83,84,85,86,87,88,89,92,94,97,99,100,101,105,107,],[-1,-3,-4,-5,-6,-7,-8,-9,-18,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-19,-11,-12,-2,-31,-40,-17,-52,98,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-13,-41,-42,-15,-14,-16,]),'ASSIGNMENT':([10,11,75,],[17,20,-52,]),'LPAREN':([10,12,13,14,16,17,18,19,20,25,28,30,33,40,42,43,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[18,30,30,42,30,30,30,30,30,30,30,30,18,30,30,72,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,30,]),'LBRACKET':([10,12,13,16,17,18,19,20,25,28,30,33,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[19,40,40,40,40,40,40,40,40,40,40,19,40,40,40,40,40,40,40,40,40,40,40,40,40,40,40,40,40,40,]),'NOT':([12,13,16,25,30,52,53,54,55,56,57,58,59,],[25,25,25,25,25,25,25,25,25,25,25,25,25,]),'MINUS':([12,13,16,17,18,19,20,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,40,42,45,48,49,50,52,53,54,55,56,57,58,59,61,62,63,64,65,72,73,74,75,85,86,87,88,89,90,91,92,94,96,99,100,],[28,28,28,28,28,28,28,28,62,-35,28,-38,28,-43,-44,-45,-46,-47,-48,-49,-50,-51,28,28,62,62,62,62,28,28,28,28,28,28,28,28,28,28,28,28,-40,28,-17,28,-52,-33,-34,-36,-37,-39,28,28,-53,-10,62,-41,-42,]),'NUMBER':([12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,31,]),'STR':([12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,32,]),'TRUE':([12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,37,]),'FALSE':([12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,38,]),'RPAREN':([18,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,42,46,47,48,60,65,66,67,68,71,72,73,75,77,78,79,80,81,82,83,84,85,86,87,88,89,92,94,95,96,99,100,],[-55,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-55,73,-54,-56,-31,-40,89,90,91,94,-55,-17,-52,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,102,-57,-41,-42,]),'BEGIN':([21,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,41,60,65,73,75,77,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,102,],[51,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,70,-31,-40,-17,-52,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,104,]),'OR':([21,22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,41,44,60,65,66,73,75,77,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[52,-21,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,52,52,-31,-40,52,-17,-52,-20,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'AND':([22,23,24,26,27,29,31,32,33,34,35,36,37,38,39,60,65,73,75,77,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[53,-23,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-31,-40,-17,-52,53,-22,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'EQUAL':([23,24,26,27,29,31,32,33,34,35,36,37,38,39,60,65,73,75,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[54,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-31,-40,-17,-52,54,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'NEQ':([23,24,26,27,29,31,32,33,34,35,36,37,38,39,60,65,73,75,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[55,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-31,-40,-17,-52,55,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'LEQ':([23,24,26,27,29,31,32,33,34,35,36,37,38,39,60,65,73,75,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[56,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-31,-40,-17,-52,56,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'LSS':([23,24,26,27,29,31,32,33,34,35,36,37,38,39,60,65,73,75,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[57,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-31,-40,-17,-52,57,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'GEQ':([23,24,26,27,29,31,32,33,34,35,36,37,38,39,60,65,73,75,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[58,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-31,-40,-17,-52,58,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'GTR':([23,24,26,27,29,31,32,33,34,35,36,37,38,39,60,65,73,75,78,79,80,81,82,83,84,85,86,87,88,89,92,94,99,100,],[59,-24,-32,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-31,-40,-17,-52,59,-25,-26,-27,-28,-29,-30,-33,-34,-36,-37,-39,-53,-10,-41,-42,]),'PLUS':([26,27,29,31,32,33,34,35,36,37,38,39,45,48,49,50,65,73,75,85,86,87,88,89,92,94,96,99,100,],[61,-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,61,61,61,61,-40,-17,-52,-33,-34,-36,-37,-39,-53,-10,61,-41,-42,]),'COMMA':([27,29,31,32,33,34,35,36,37,38,39,47,48,65,73,75,85,86,87,88,89,92,94,96,99,100,],[-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,74,-56,-40,-17,-52,-33,-34,-36,-37,-39,-53,-10,-57,-41,-42,]),'RBRACKET':([27,29,31,32,33,34,35,36,37,38,39,40,47,48,49,65,69,73,75,85,86,87,88,89,92,94,96,99,100,],[-35,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-55,-54,-56,75,-40,92,-17,-52,-33,-34,-36,-37,-39,-53,-10,-57,-41,-42,]),'TIMES':([27,29,31,32,33,34,35,36,37,38,39,65,73,75,85,86,87,88,89,92,94,99,100,],[63,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-40,-17,-52,63,63,-36,-37,-39,-53,-10,-41,-42,]),'DIVIDE':([27,29,31,32,33,34,35,36,37,38,39,65,73,75,85,86,87,88,89,92,94,99,100,],[64,-38,-43,-44,-45,-46,-47,-48,-49,-50,-51,-40,-17,-52,64,64,-36,-37,-39,-53,-10,-41,-42,]),'ATOI':([30,],[67,]),'ITOA':([30,],[68,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,51,70,98,104,],[1,76,93,103,106,]),'statement':([1,76,93,103,106,],[2,2,2,2,2,]),'assign':([1,76,93,103,106,],[3,3,3,3,3,]),'if_state':([1,76,93,103,106,],[4,4,4,4,4,]),'while_state':([1,76,93,103,106,],[5,5,5,5,5,]),'python_call':([1,12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,76,90,91,93,103,106,],[6,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,36,6,36,36,6,6,6,]),'function_call':([1,12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,76,90,91,93,103,106,],[7,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,39,7,39,39,7,7,7,]),'function_def':([1,76,93,103,106,],[8,8,8,8,8,]),'return_statement':([1,76,93,103,106,],[9,9,9,9,9,]),'array_item':([1,12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,76,90,91,93,103,106,],[11,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,34,11,34,34,11,11,11,]),'condition':([12,13,16,30,],[21,41,44,66,]),'boolexpression':([12,13,16,30,52,],[22,22,22,22,77,]),'boolterm':([12,13,16,30,52,53,],[23,23,23,23,23,78,]),'boolfactor':([12,13,16,25,30,52,53,54,55,56,57,58,59,],[24,24,24,60,24,24,24,79,80,81,82,83,84,]),'expression':([12,13,16,17,18,19,20,25,30,40,42,52,53,54,55,56,57,58,59,72,74,],[26,26,26,45,48,49,50,26,26,48,48,26,26,26,26,26,26,26,26,48,96,]),'term':([12,13,16,17,18,19,20,25,30,40,42,52,53,54,55,56,57,58,59,61,62,72,74,],[27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,85,86,27,27,]),'factor':([12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[29,29,29,29,29,29,29,29,65,29,29,29,29,29,29,29,29,29,29,29,29,29,87,88,29,29,99,100,]),'array':([12,13,16,17,18,19,20,25,28,30,40,42,52,53,54,55,56,57,58,59,61,62,63,64,72,74,90,91,],[35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,35,]),'argument_lists':([18,40,42,72,],[46,69,71,95,]),'argument_list':([18,40,42,72,],[47,47,47,47,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> program statement','program',2,'p_program','parser.py',121),
+  ('program -> <empty>','program',0,'p_program','parser.py',122),
+  ('statement -> assign','statement',1,'p_statement','parser.py',132),
+  ('statement -> if_state','statement',1,'p_statement','parser.py',133),
+  ('statement -> while_state','statement',1,'p_statement','parser.py',134),
+  ('statement -> python_call','statement',1,'p_statement','parser.py',135),
+  ('statement -> function_call','statement',1,'p_statement','parser.py',136),
+  ('statement -> function_def','statement',1,'p_statement','parser.py',137),
+  ('statement -> return_statement','statement',1,'p_statement','parser.py',138),
+  ('python_call -> CALLPY LPAREN argument_lists RPAREN','python_call',4,'p_python_call','parser.py',144),
+  ('assign -> ID ASSIGNMENT expression','assign',3,'p_assign','parser.py',151),
+  ('assign -> array_item ASSIGNMENT expression','assign',3,'p_assign','parser.py',152),
+  ('if_state -> IF condition BEGIN program END','if_state',5,'p_if_state','parser.py',160),
+  ('if_state -> IF condition BEGIN program ELSE program END','if_state',7,'p_if_state','parser.py',161),
+  ('while_state -> WHILE condition BEGIN program END','while_state',5,'p_while_state','parser.py',169),
+  ('function_def -> FUNCTION ID LPAREN argument_lists RPAREN BEGIN program END','function_def',8,'p_function_def','parser.py',174),
+  ('function_call -> ID LPAREN argument_lists RPAREN','function_call',4,'p_function_call','parser.py',181),
+  ('return_statement -> RETURN','return_statement',1,'p_return_statement','parser.py',188),
+  ('return_statement -> RETURN condition','return_statement',2,'p_return_statement','parser.py',189),
+  ('condition -> condition OR boolexpression','condition',3,'p_condition','parser.py',198),
+  ('condition -> boolexpression','condition',1,'p_condition','parser.py',199),
+  ('boolexpression -> boolexpression AND boolterm','boolexpression',3,'p_boolexpression','parser.py',213),
+  ('boolexpression -> boolterm','boolexpression',1,'p_boolexpression','parser.py',214),
+  ('boolterm -> boolfactor','boolterm',1,'p_boolterm','parser.py',228),
+  ('boolterm -> boolterm EQUAL boolfactor','boolterm',3,'p_boolterm','parser.py',229),
+  ('boolterm -> boolterm NEQ boolfactor','boolterm',3,'p_boolterm','parser.py',230),
+  ('boolterm -> boolterm LEQ boolfactor','boolterm',3,'p_boolterm','parser.py',231),
+  ('boolterm -> boolterm LSS boolfactor','boolterm',3,'p_boolterm','parser.py',232),
+  ('boolterm -> boolterm GEQ boolfactor','boolterm',3,'p_boolterm','parser.py',233),
+  ('boolterm -> boolterm GTR boolfactor','boolterm',3,'p_boolterm','parser.py',234),
+  ('boolfactor -> NOT boolfactor','boolfactor',2,'p_boolfactor','parser.py',243),
+  ('boolfactor -> expression','boolfactor',1,'p_boolfactor','parser.py',244),
+  ('expression -> expression PLUS term','expression',3,'p_expression','parser.py',254),
+  ('expression -> expression MINUS term','expression',3,'p_expression','parser.py',255),
+  ('expression -> term','expression',1,'p_expression','parser.py',256),
+  ('term -> term TIMES factor','term',3,'p_term','parser.py',266),
+  ('term -> term DIVIDE factor','term',3,'p_term','parser.py',267),
+  ('term -> factor','term',1,'p_term','parser.py',268),
+  ('factor -> LPAREN condition RPAREN','factor',3,'p_factor','parser.py',277),
+  ('factor -> MINUS factor','factor',2,'p_factor','parser.py',278),
+  ('factor -> LPAREN ATOI RPAREN factor','factor',4,'p_factor','parser.py',279),
+  ('factor -> LPAREN ITOA RPAREN factor','factor',4,'p_factor','parser.py',280),
+  ('factor -> NUMBER','factor',1,'p_factor','parser.py',281),
+  ('factor -> STR','factor',1,'p_factor','parser.py',282),
+  ('factor -> ID','factor',1,'p_factor','parser.py',283),
+  ('factor -> array_item','factor',1,'p_factor','parser.py',284),
+  ('factor -> array','factor',1,'p_factor','parser.py',285),
+  ('factor -> python_call','factor',1,'p_factor','parser.py',286),
+  ('factor -> TRUE','factor',1,'p_factor','parser.py',287),
+  ('factor -> FALSE','factor',1,'p_factor','parser.py',288),
+  ('factor -> function_call','factor',1,'p_factor','parser.py',289),
+  ('array_item -> ID LBRACKET expression RBRACKET','array_item',4,'p_array_item','parser.py',304),
+  ('array -> LBRACKET argument_lists RBRACKET','array',3,'p_array','parser.py',310),
+  ('argument_lists -> argument_list','argument_lists',1,'p_argument_lists','parser.py',316),
+  ('argument_lists -> <empty>','argument_lists',0,'p_argument_lists','parser.py',317),
+  ('argument_list -> expression','argument_list',1,'p_argument_list','parser.py',328),
+  ('argument_list -> argument_list COMMA expression','argument_list',3,'p_argument_list','parser.py',329),
+]
@@ -0,0 +1,183 @@
+# profiler.py
+# 逐节点解释时的确定性性能分析：记录每个DSL函数、每条语句和每个外部脚本的运行次数和时间，
+# 输出按自身时间排序的表格，以及火焰图工具（如flamegraph.pl、speedscope）能读的折叠栈。
+# ProfilingInterpreter是Interpreter的子类，不打开性能分析时根本不会用到，没有额外开销。
+import interpreter, AST
+import sys, time
+
+# 作为一条语句统计的节点
+STATEMENT_TYPES = ('assign', 'function_def', 'return', 'python_call', 'function_call', 'if', 'while')
+PROGRAM_NAME = '<program>'
+
+class _Timer:
+    '''
+    一组嵌套计时：enter和exit成对调用
+
+    每个键统计[次数, 自身时间, 总时间, 其中外部脚本的时间]。自身时间不含嵌套在里面的计时；
+    递归时同一个键同时出现多次，总时间只算最外层的，不会重复计算
+    '''
+    def __init__(self, profiler):
+        self._profiler = profiler
+        self.rows = {}
+        self._stack = [] # [键, 开始时间, 嵌套计时的时间, 开始时外部脚本的累计时间]
+        self._depth = {} # 键 -> 在栈中出现的次数
+
+    def enter(self, key):
+        self._depth[key] = self._depth.get(key, 0) + 1
+        self._stack.append([key, time.perf_counter(), 0.0, self._profiler.python_time])
+
+    def exit(self):
+        '''结束栈顶的计时，返回(键, 自身时间)'''
+        key, start, nested, python_start = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = [0, 0.0, 0.0, 0.0]
+        row[0] += 1
+        row[1] += elapsed - nested
+        depth = self._depth[key] - 1
+        self._depth[key] = depth
+        if depth == 0:
+            row[2] += elapsed
+            row[3] += self._profiler.python_time - python_start
+        return key, elapsed - nested
+
+class ProfilingInterpreter(interpreter.Interpreter):
+    '''
+    边运行边统计的解释器，只支持tree模式
+
+    函数的时间包括计算它的参数；函数的自身时间不含它调用的DSL函数和外部脚本，
+    语句的自身时间不含嵌套在里面的语句（包括被调用函数中的语句）。
+    折叠栈由函数调用、while循环和外部脚本组成，每一行的值是这一层的自身时间（微秒）
+    '''
+    def __init__(self, node : AST.ASTNode, **kwargs):
+        super().__init__(node, mode='tree', **kwargs)
+        self.python_time = 0.0 # 到目前为止在外部脚本中的时间
+        self.functions_timer = _Timer(self)
+        self.statements_timer = _Timer(self)
+        self.folded = {} # 折叠栈 -> 自身时间
+        self._frames = _Timer(self) # 组成折叠栈的计时
+        self._paths = [(PROGRAM_NAME,)]
+        self._labels = {} # id(语句节点) -> (所在函数, 说明)
+        self._label_statements(node, PROGRAM_NAME)
+
+    def _label_statements(self, node : AST.ASTNode, function : str):
+        '''按先序给语句编号，说明中带上编号以区分相同的语句'''
+        for child in node.children:
+            if node.type == 'program' and child.type in STATEMENT_TYPES:
+                self._labels[id(child)] = (function, f"#{len(self._labels) + 1} {_describe(child)}")
+            if child.type == 'function_def':
+                self._label_statements(child.children[1], child.operation)
+            else:
+                self._label_statements(child, function)
+
+    def _enter_frame(self, label : str):
+        self._frames.enter(label)
+        self._paths.append(self._paths[-1] + (label,))
+
+    def _exit_frame(self):
+        _, self_time = self._frames.exit()
+        path = self._paths.pop()
+        self.folded[path] = self.folded.get(path, 0.0) + self_time
+
+    def run(self):
+        self._frames.enter(PROGRAM_NAME)
+        try:
+            super().run()
+        finally:
+            _, self_time = self._frames.exit()
+            self.folded[self._paths[0]] = self.folded.get(self._paths[0], 0.0) + self_time
+
+    def _execute_node(self, node : AST.ASTNode):
+        label = self._labels.get(id(node))
+        if label is None:
+            return super()._execute_node(node)
+        self.statements_timer.enter(label)
+        if node.type == 'while':
+            self._enter_frame(label[1])
+        try:
+            return super()._execute_node(node)
+        finally:
+            if node.type == 'while':
+                self._exit_frame()
+            self.statements_timer.exit()
+
+    def _execute_function_call(self, node : AST.ASTNode):
+        self.functions_timer.enter(node.operation)
+        self._enter_frame(node.operation)
+        try:
+            return super()._execute_function_call(node)
+        finally:
+            self._exit_frame()
+            self.functions_timer.exit()
+
+    def _execute_python_call(self, node : AST.ASTNode):
+        label = f"python {node.operation}"
+        self.functions_timer.enter(label)
+        self._enter_frame(label)
+        start = time.perf_counter()
+        try:
+            return super()._execute_python_call(node)
+        finally:
+            self.python_time += time.perf_counter() - start
+            self._exit_frame()
+            self.functions_timer.exit()
+
+    def report(self, file=None, limit : int = 30):
+        '''输出函数表和语句表，按自身时间从大到小排列，语句只输出前limit条'''
+        file = file if file is not None else sys.stderr
+        print("函数和外部脚本：", file=file)
+        _print_rows([(name, *row) for name, row in self.functions_timer.rows.items()], file)
+        print(file=file)
+        print(f"语句（前 {limit} 条）：", file=file)
+        rows = [(f"{function}: {description}", *row)
+                for (function, description), row in self.statements_timer.rows.items()]
+        _print_rows(rows, file, limit)
+
+    def write_folded(self, path : str):
+        '''把折叠栈写入path，每行是“<program>;函数;...;最内层 微秒数”'''
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, seconds in sorted(self.folded.items()):
+                microseconds = round(seconds * 1e6)
+                if microseconds > 0:
+                    file.write(f"{';'.join(stack)} {microseconds}\n")
+
+def _describe(node : AST.ASTNode):
+    '''语句的简短说明'''
+    if node.type == 'assign':
+        return f"{node.children[0].value} = ..."
+    if node.type in ('function_call', 'python_call'):
+        return f"{node.operation}(...)"
+    if node.type == 'function_def':
+        return f"function {node.operation}"
+    return node.type
+
+def _print_rows(rows : list, file, limit : int = None):
+    '''rows中每项是(名字, 次数, 自身时间, 总时间, 外部脚本时间)'''
+    rows.sort(key=lambda row: row[2], reverse=True)
+    if limit is not None:
+        rows = rows[:limit]
+    width = max([len(row[0]) for row in rows] + [4])
+    print(f"{'名字':<{width - 2}} {'次数':>8} {'自身(ms)':>10} {'总计(ms)':>10} {'外部脚本(ms)':>12}", file=file)
+    for name, count, self_time, total, python in rows:
+        print(f"{name:<{width}} {count:>10} {self_time * 1000:>12.2f} {total * 1000:>12.2f} {python * 1000:>16.2f}",
+              file=file)
+
+# 示例用法
+if __name__ == '__main__':
+    import lexer, parser
+    if len(sys.argv) < 2:
+        raise Exception("需要输入您的代码文件")
+    elif len(sys.argv) > 2:
+        raise Exception("您输入的文件太多了")
+    else :
+        with open(sys.argv[1], 'r', encoding='utf-8') as file:
+            source = file.read()
+        node = parser.Parser(lexer.Lexer()).parse(source)
+        profiled = ProfilingInterpreter(node)
+        try:
+            profiled.run()
+        finally:
+            profiled.report()
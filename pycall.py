@@ -0,0 +1,231 @@
+# pycall.py
+# 这个模块负责运行python_call调用的外部脚本。
+# 每种运行方式都提供run(script_path, args)，返回(退出码, 标准输出, 标准错误)，
+# 由Interpreter._run_python_script根据结果返回输出或报错。
+# concurrent为True的运行方式可以在多个线程中同时调用run。
+import builtins, io, os, re, subprocess, sys, threading, time
+from collections import OrderedDict
+from contextlib import redirect_stdout, redirect_stderr
+
+class SubprocessRunner:
+    '''每次调用都启动一个新的Python进程'''
+    concurrent = True
+
+    def run(self, script_path : str, args : list):
+        result = subprocess.run([sys.executable, script_path] + args,
+                                capture_output=True, text=True)
+        return result.returncode, result.stdout, result.stderr
+
+    def close(self):
+        pass
+
+class InProcessRunner:
+    '''
+    在解释器进程中直接运行脚本，没有进程启动和进程间通信的开销
+
+    脚本编译一次后按路径缓存，修改时间变化时重新编译。脚本和解释器共享同一个进程，只适合可信的脚本。
+    运行时要替换sys.argv和sys.stdout，所以不能并发
+    '''
+    concurrent = False
+
+    def run(self, script_path : str, args : list):
+        return run_script(script_path, args)
+
+    def close(self):
+        pass
+
+class WorkerPool:
+    '''
+    常驻的Python工作进程池
+
+    工作进程在第一次调用时启动，每个进程缓存编译好的脚本，之后的调用不再需要启动Python解释器。
+    max_tasks不为None时，每个工作进程运行这么多次脚本后就换成新的进程，避免脚本遗留的状态越积越多
+    '''
+    concurrent = True
+
+    def __init__(self, size : int = None, max_tasks : int = None):
+        '''
+            para size:      工作进程数，默认为CPU数
+            para max_tasks: 每个工作进程最多运行的脚本次数，None表示不限
+        '''
+        self.size = size or os.cpu_count() or 1
+        self.max_tasks = max_tasks
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def run(self, script_path : str, args : list):
+        # concurrent.futures导入要十几毫秒，只在用到进程池时导入
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        with self._lock:
+            if self._pool is None:
+                # max_tasks_per_child是Python 3.11加入的参数，不限次数时不传
+                options = {} if self.max_tasks is None else {'max_tasks_per_child': self.max_tasks}
+                self._pool = ProcessPoolExecutor(self.size, **options)
+            pool = self._pool
+        try:
+            return pool.submit(run_script, script_path, args).result()
+        except BrokenProcessPool:
+            # 工作进程运行脚本时退出了（os._exit、崩溃或被系统杀掉），整个进程池都不能再用，
+            # 下次调用时重新创建，这次调用按脚本运行失败处理
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            return 1, '', "运行脚本的工作进程意外退出"
+
+    def close(self):
+        '''关闭所有工作进程'''
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+class CachingRunner:
+    '''
+    缓存纯脚本的运行结果
+
+    只有标记为可缓存的脚本才会缓存：脚本中有一行 # robot_dsl: cacheable [ttl=秒数]，
+    或者在配置文件中列出。配置文件是JSON，键为脚本路径（相对配置文件所在目录），值为{"ttl": 秒数}，
+    ttl为null或省略表示一直有效，配置文件优先于脚本中的标记。
+    缓存键为(脚本路径, 修改时间, 文件大小, 参数)，脚本修改后旧结果自动失效；只缓存成功的运行结果，
+    超过size条时淘汰最久没有用过的结果
+    '''
+    def __init__(self, runner, size : int = 128, config : str = None):
+        '''
+            para runner: 实际运行脚本的对象
+            para size:   最多缓存的结果数
+            para config: 配置文件路径，为None时只看脚本中的标记
+        '''
+        self.runner = runner
+        self.concurrent = getattr(runner, 'concurrent', False)
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict() # 缓存键 -> (过期时间, 运行结果)
+        self._policies = {}           # 路径 -> (修改时间, 文件大小, 是否可缓存, ttl)
+        self._config = load_cache_config(config) if config is not None else {}
+        self._lock = threading.Lock()
+
+    def run(self, script_path : str, args : list):
+        stat = os.stat(script_path)
+        cacheable, ttl = self._policy(script_path, stat)
+        if not cacheable:
+            return self.runner.run(script_path, args)
+
+        key = (script_path, stat.st_mtime_ns, stat.st_size, tuple(args))
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and (cached[0] is None or cached[0] > time.monotonic()):
+                self._results.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        result = self.runner.run(script_path, args)
+        if result[0] == 0:
+            expires = None if ttl is None else time.monotonic() + ttl
+            with self._lock:
+                self._results[key] = (expires, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.size:
+                    self._results.popitem(last=False)
+        return result
+
+    def _policy(self, script_path : str, stat):
+        '''脚本是否可缓存以及ttl，脚本修改后重新读取标记'''
+        config = self._config.get(_normalize(script_path))
+        if config is not None:
+            return True, config.get('ttl')
+        policy = self._policies.get(script_path)
+        if policy is None or policy[:2] != (stat.st_mtime_ns, stat.st_size):
+            cacheable, ttl = read_pragma(script_path)
+            policy = (stat.st_mtime_ns, stat.st_size, cacheable, ttl)
+            self._policies[script_path] = policy
+        return policy[2], policy[3]
+
+    def stats(self):
+        '''缓存命中情况'''
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._results)}
+
+    def close(self):
+        self.runner.close()
+
+_PRAGMA = re.compile(r'^\s*#\s*robot_dsl:\s*cacheable(?:\s+ttl=(\d+(?:\.\d+)?))?\s*$')
+
+def read_pragma(script_path : str):
+    '''读取脚本中的缓存标记，返回(是否可缓存, ttl)'''
+    with open(script_path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            match = _PRAGMA.match(line)
+            if match:
+                return True, float(match.group(1)) if match.group(1) else None
+    return False, None
+
+def load_cache_config(config_path : str):
+    '''读取缓存配置文件，返回 规范化的脚本路径 -> 配置'''
+    import json
+    with open(config_path, 'r', encoding='utf-8') as file:
+        config = json.load(file)
+    directory = os.path.dirname(os.path.abspath(config_path))
+    return {_normalize(os.path.join(directory, path)): options or {} for path, options in config.items()}
+
+def _normalize(path : str):
+    return os.path.normcase(os.path.abspath(path))
+
+# 编译好的脚本：路径 -> (修改时间, 代码对象)
+_scripts = {}
+
+def load_script(script_path : str):
+    '''读取并编译脚本，文件修改时间变化时重新编译'''
+    mtime = os.stat(script_path).st_mtime_ns
+    cached = _scripts.get(script_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(script_path, 'rb') as file:
+        source = file.read()
+    code = compile(source, script_path, 'exec')
+    _scripts[script_path] = (mtime, code)
+    return code
+
+def run_script(script_path : str, args : list):
+    '''
+    在当前进程中像python script_path args一样运行脚本
+
+    :return: (退出码, 标准输出, 标准错误)，未捕获的异常和python一样把回溯信息写进标准错误，退出码为1
+    '''
+    import traceback
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    saved_argv = sys.argv
+    saved_path = sys.path[:] # 脚本可能修改sys.path，运行完整个恢复
+    sys.argv = [script_path] + args
+    sys.path.insert(0, os.path.dirname(script_path))
+    returncode = 0
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                code = load_script(script_path)
+            except SyntaxError as e:
+                traceback.print_exception(type(e), e, None)
+                return 1, stdout.getvalue(), stderr.getvalue()
+            try:
+                exec(code, {'__name__': '__main__', '__file__': script_path, '__builtins__': builtins})
+            except SystemExit as e:
+                returncode = _exit_code(e)
+            except Exception as e:
+                # 去掉本函数这一层，回溯信息从脚本开始
+                traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+                returncode = 1
+    finally:
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
+    return returncode, stdout.getvalue(), stderr.getvalue()
+
+def _exit_code(e : SystemExit):
+    '''和python解释器一样处理sys.exit()的参数'''
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
@@ -1,4 +1,5 @@
 # external_script.py
+# robot_dsl: cacheable
 import sys
 
 def main():
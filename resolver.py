@@ -0,0 +1,160 @@
+# resolver.py
+# 这个模块在编译前对AST树做作用域分析，把每个ID和array_item绑定到(栈帧种类, 槽位)。
+# 函数的参数是局部变量，槽位就是参数的位置；其他变量都是全局变量，按名字分配全局槽位，
+# 和解释器一样，给找不到的变量赋值时就是给全局变量赋值。
+import AST
+
+LOCAL = 'local'
+GLOBAL = 'global'
+
+class Resolver:
+    '''
+    静态作用域分析
+
+    解释器查找变量时会从栈顶一直找到全局栈帧，调用者的参数对被调用的函数也可见，
+    给参数赋值时栈中所有同名的变量都会被修改。只有程序不依赖这些行为时，静态绑定的结果才和解释器一致，
+    这时static为True；否则static为False，reason说明原因，编译器应该退回按名字查找的方式
+    '''
+    def __init__(self):
+        self.bindings = {}      # id(节点) -> (LOCAL或GLOBAL, 槽位)
+        self.globals = []       # 全局槽位对应的变量名
+        self.static = True
+        self.reason = None
+        self._global_index = {}
+        self._params = {}       # 函数名 -> 参数名集合（同名函数合并）
+        self._calls = {}        # 函数名 -> 函数体中调用的函数名
+        self._shared_params = {} # 函数名 -> 同名函数都有的参数名
+        self._names = {}        # 函数名 -> 函数体中出现的变量名
+        self._reachable = {}    # 函数名 -> 它执行时可能运行的函数，见_reachable_functions
+        self._param_writes = [] # (函数名, 参数名)：函数体中给自己参数赋值的地方
+        self._top_names = set() # 在最外层出现过的变量名
+
+    def resolve(self, node : AST.ASTNode):
+        '''分析整个程序，返回自身'''
+        self._collect_functions(node)
+        self._all_params = set()
+        for params in self._params.values():
+            self._all_params |= params
+        self._resolve_block(node, None, [])
+        self._check_param_writes()
+        return self
+
+    def binding(self, node : AST.ASTNode):
+        '''节点的绑定(LOCAL或GLOBAL, 槽位)'''
+        return self.bindings[id(node)]
+
+    def _fail(self, reason : str):
+        if self.static:
+            self.static = False
+            self.reason = reason
+
+    def _global_slot(self, name : str):
+        if name not in self._global_index:
+            self._global_index[name] = len(self.globals)
+            self.globals.append(name)
+        return self._global_index[name]
+
+    def _collect_functions(self, node : AST.ASTNode):
+        '''收集所有函数的参数'''
+        if node.type == 'function_def':
+            params = self._params.setdefault(node.operation, set())
+            names = {arg.value for arg in node.children[0].children if arg.type == 'ID'}
+            params |= names
+            if node.operation in self._shared_params:
+                self._shared_params[node.operation] &= names
+            else:
+                self._shared_params[node.operation] = names
+        for child in node.children:
+            self._collect_functions(child)
+
+    def _resolve_block(self, node : AST.ASTNode, function : str, params : list):
+        '''
+        分析一个作用域中的节点，function为None表示最外层
+
+        函数声明里的函数体是新的作用域，参数列表里的ID不需要绑定
+        '''
+        if node.type == 'function_def':
+            body_params = [arg.value for arg in node.children[0].children if arg.type == 'ID']
+            self._resolve_block(node.children[1], node.operation, body_params)
+            return
+
+        if node.type == 'function_call' and function is not None:
+            self._calls.setdefault(function, set()).add(node.operation)
+
+        if node.type == 'assign':
+            target = node.children[0]
+            if function is not None and target.value in params:
+                self._param_writes.append((function, target.value))
+
+        if node.type in ('ID', 'array_item'):
+            self._bind(node, function, params)
+
+        for child in node.children:
+            self._resolve_block(child, function, params)
+
+    def _bind(self, node : AST.ASTNode, function : str, params : list):
+        name = node.value
+        if function is None:
+            self._top_names.add(name)
+        else:
+            self._names.setdefault(function, set()).add(name)
+        if function is not None and name in params:
+            # 同一个参数名出现多次时，解释器中后面的值会覆盖前面的
+            self.bindings[id(node)] = (LOCAL, len(params) - 1 - params[::-1].index(name))
+            return
+        if function is not None and name in self._all_params:
+            self._fail(f"函数 {function} 使用了其他函数的参数 {name}")
+        self.bindings[id(node)] = (GLOBAL, self._global_slot(name))
+
+    def _check_param_writes(self):
+        '''给参数赋值时，如果栈中可能还有同名变量，解释器会一起修改它们'''
+        for function, name in self._param_writes:
+            if name in self._top_names:
+                self._fail(f"函数 {function} 给参数 {name} 赋值，而 {name} 也是全局变量")
+                return
+            for caller, params in self._params.items():
+                if name in params and self._reaches(caller, function):
+                    self._fail(f"函数 {function} 给参数 {name} 赋值，而调用它的函数 {caller} 也有参数 {name}")
+                    return
+
+    def _reaches(self, caller : str, function : str):
+        '''caller执行时栈中会不会出现function的栈帧（caller自己递归时也算）'''
+        seen = set()
+        todo = list(self._calls.get(caller, ()))
+        while todo:
+            name = todo.pop()
+            if name == function:
+                return True
+            if name not in seen:
+                seen.add(name)
+                todo.extend(self._calls.get(name, ()))
+        return False
+
+    def tail_call_safe(self, caller_params : list, function : str):
+        '''
+        函数中的return function(...)能否不保留当前函数的栈帧，直接换成function的栈帧
+
+        当前函数的栈帧里只有它的参数。function执行期间（包括它调用的函数）都用不到这些参数，
+        或者它们被function自己的同名参数遮住时，丢掉这个栈帧不会改变任何变量的查找和赋值
+        '''
+        hidden = set(caller_params) - self._shared_params.get(function, set())
+        if not hidden:
+            return True
+        for name in self._reachable_functions(function):
+            # 函数体中出现的自己的参数总是在自己的栈帧中找到
+            if hidden & (self._names.get(name, set()) - self._shared_params.get(name, set())):
+                return False
+        return True
+
+    def _reachable_functions(self, function : str):
+        '''function执行时可能运行的函数，包括它自己'''
+        if function not in self._reachable:
+            seen = {function}
+            todo = [function]
+            while todo:
+                for name in self._calls.get(todo.pop(), ()):
+                    if name not in seen:
+                        seen.add(name)
+                        todo.append(name)
+            self._reachable[function] = seen
+        return self._reachable[function]
@@ -0,0 +1,210 @@
+# run_tests.py
+# 运行test中的测试用例，和test_out中保存的sha256哈希值比较。
+# 每个工作进程只构造一次词法分析器和语法分析器，用例在进程内运行，标准输出和标准错误分别捕获，
+# 和test.sh中逐个启动 python lexer.py / parser.py / interpreter.py 得到的输出相同。
+# 哈希值是在Windows上生成的，输出中的换行是\r\n，所以按\n和\r\n换行计算的哈希值都算通过。
+# 出错用例的标准错误是traceback，其中的路径和行号只在生成哈希值的机器上对得上，
+# 哈希值不符时改为和test_out/<阶段>/<用例名>_error.exception中保存的最后一行异常比较。
+# 另外把test中的程序按每种运行模式、优化和不优化各运行一遍，输出要和不优化的tree模式相同。
+import argparse, contextlib, hashlib, io, multiprocessing, os, shutil, sys, tempfile, time, traceback
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TEST_DIR = os.path.join(ROOT, 'test')
+OUT_DIR = os.path.join(ROOT, 'test_out')
+STAGES = ('lexer', 'parser', 'interpreter')
+# 和不优化的tree模式比较的运行方式：(运行模式, 是否优化)
+VARIANTS = [(mode, optimize) for mode in ('tree', 'closure', 'vm', 'python') for optimize in (False, True)][1:]
+
+# 工作进程中的词法分析器和语法分析器，见_init_worker
+_lexer = None
+_fast_lexer = None
+_parser = None
+
+def discover():
+    '''
+    所有用例，每项是(阶段, 用例名, 源代码文件)
+
+    用例由test_out/<阶段>/<用例名>.hash决定：testN对应test/testN.dsl，
+    error_testN对应test/test_error_<阶段>N.dsl。另外对test中的每个文件比较PLY和手写扫描器的输出，
+    对词法和语法分析出错的用例以外的文件比较各个运行模式的输出
+    '''
+    cases = []
+    for stage in STAGES:
+        for file_name in sorted(os.listdir(os.path.join(OUT_DIR, stage))):
+            if not file_name.endswith('.hash') or file_name.endswith('_error.hash'):
+                continue
+            name = file_name[:-len('.hash')]
+            if name.startswith('error_'):
+                source = f"test_error_{stage}{name[len('error_test'):]}.dsl"
+            else:
+                source = f"{name}.dsl"
+            cases.append((stage, name, os.path.join(TEST_DIR, source)))
+    for file_name in sorted(os.listdir(TEST_DIR)):
+        if file_name.endswith('.dsl'):
+            cases.append(('fast_lexer', file_name[:-len('.dsl')], os.path.join(TEST_DIR, file_name)))
+    for file_name in sorted(os.listdir(TEST_DIR)):
+        if file_name.endswith('.dsl') and not file_name.startswith(('test_error_lexer', 'test_error_parser')):
+            cases.append(('modes', file_name[:-len('.dsl')], os.path.join(TEST_DIR, file_name)))
+    return cases
+
+def prepare_scripts(directory : str):
+    '''测试中的路径是 ./pyscripts\\x.py，在Windows以外的系统上是一个文件名，把脚本按这个名字复制到directory'''
+    scripts = os.path.join(ROOT, 'pyscripts')
+    for name in os.listdir(scripts):
+        if name.endswith('.py'):
+            shutil.copy(os.path.join(scripts, name), os.path.join(directory, 'pyscripts\\' + name))
+
+def _init_worker(directory : str):
+    global _lexer, _fast_lexer, _parser
+    sys.path.insert(0, ROOT)
+    import lexer, parser
+    _lexer = lexer.Lexer()
+    _fast_lexer = lexer.Lexer(fast=True)
+    _parser = parser.Parser(_lexer)
+    # 外部脚本的相对路径按工作目录查找
+    os.chdir(directory)
+
+def _capture(function, *args):
+    '''运行function，返回(标准输出, 标准错误)；和脚本一样，没有捕获的异常输出到标准错误'''
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            function(*args)
+        except Exception:
+            traceback.print_exc()
+    return stdout.getvalue(), stderr.getvalue()
+
+def _print_tokens(tokenizer, code : str):
+    for tok in tokenizer.tokenize(code):
+        print(tok)
+
+def _print_tree(code : str):
+    _parser.parse(code).print()
+
+def _run_tree(text : str):
+    '''和test.sh一样，运行语法分析器输出的文本重建的AST树'''
+    import AST, interpreter
+    interpreter.Interpreter(AST.reconstruct_ast_from_file(text)).run()
+
+def _run_mode(code : str, mode : str, optimize : bool):
+    '''按mode运行程序，optimize为True时先优化AST树'''
+    import interpreter, optimizer
+    node = _parser.parse(code)
+    if optimize:
+        node = optimizer.optimize(node)
+    interpreter.Interpreter(node, mode=mode).run()
+
+def _result(outputs : tuple):
+    '''(标准输出, 标准错误的最后一行)：各模式的traceback不同，只比较最后抛出的异常'''
+    stdout, stderr = outputs
+    lines = stderr.rstrip().splitlines()
+    return stdout, lines[-1] if lines else ''
+
+def run_case(case : tuple):
+    '''在工作进程中运行一个用例，返回(用例, 是否通过, 说明, 耗时)'''
+    stage, name, source = case
+    start = time.perf_counter()
+    with open(source, 'r', encoding='utf-8') as file:
+        code = file.read()
+    if stage == 'fast_lexer':
+        ply = ''.join(_capture(_print_tokens, _lexer, code))
+        fast = ''.join(_capture(_print_tokens, _fast_lexer, code))
+        passed = ply == fast
+        detail = '' if passed else _first_difference(ply, fast)
+        return case, passed, detail, time.perf_counter() - start
+    if stage == 'modes':
+        expected = _result(_capture(_run_mode, code, 'tree', False))
+        problems = []
+        for mode, optimize in VARIANTS:
+            actual = _result(_capture(_run_mode, code, mode, optimize))
+            variant = mode + (' --optimize' if optimize else '')
+            if actual[0] != expected[0]:
+                problems.append(f"{variant} 的输出和tree模式不同，"
+                                + _first_difference(expected[0], actual[0], ('tree', variant)))
+            if actual[1] != expected[1]:
+                problems.append(f"{variant} 的异常和tree模式不同：\n  tree：{expected[1]}\n  {variant}：{actual[1]}")
+        return case, not problems, '\n'.join(problems), time.perf_counter() - start
+    if stage == 'lexer':
+        outputs = _capture(_print_tokens, _lexer, code)
+    elif stage == 'parser':
+        outputs = _capture(_print_tree, code)
+    else:
+        tree, _ = _capture(_print_tree, code)
+        outputs = _capture(_run_tree, tree)
+    problems = []
+    for suffix, output in zip(('', '_error'), outputs):
+        with open(os.path.join(OUT_DIR, stage, f"{name}{suffix}.hash"), 'r') as file:
+            expected = file.read().strip()
+        if expected in output_hashes(output):
+            continue
+        stream = 'stdout' if suffix == '' else 'stderr'
+        if output.startswith('Traceback'):
+            # traceback中有文件的绝对路径和行号，在别的机器上哈希值对不上，只比较最后抛出的异常
+            exception = output.rstrip().splitlines()[-1]
+            expected_exception = _read_exception(stage, f"{name}{suffix}")
+            if exception == expected_exception:
+                continue
+            if expected_exception is None:
+                problems.append(f"{stream} 的哈希值不符，也没有保存异常的 {name}{suffix}.exception，实际的异常：\n"
+                                f"{_indent(exception)}")
+            else:
+                problems.append(f"{stream} 的异常不同：\n  期望：{expected_exception}\n  实际：{exception}")
+        else:
+            problems.append(f"{stream} 的哈希值不符，实际输出：\n{_indent(output)}")
+    return case, not problems, '\n'.join(problems), time.perf_counter() - start
+
+def _read_exception(stage : str, name : str):
+    '''test_out/<阶段>/<name>.exception中保存的traceback最后一行，没有这个文件时返回None'''
+    path = os.path.join(OUT_DIR, stage, f"{name}.exception")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read().rstrip('\r\n')
+
+def output_hashes(output : str):
+    '''输出按\\n换行和按\\r\\n换行时的sha256哈希值'''
+    data = output.encode('utf-8')
+    return (hashlib.sha256(data).hexdigest(), hashlib.sha256(data.replace(b'\n', b'\r\n')).hexdigest())
+
+def _first_difference(expected : str, actual : str, names : tuple = ('PLY', '手写')):
+    for number, (line1, line2) in enumerate(zip(expected.split('\n'), actual.split('\n')), 1):
+        if line1 != line2:
+            return f"第 {number} 行不同：\n  {names[0]}：{line1}\n  {names[1]}：{line2}"
+    return "输出的行数不同"
+
+def _indent(text : str, limit : int = 20):
+    lines = text.rstrip('\n').split('\n')
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"...（还有 {len(lines) - limit} 行）"]
+    return '\n'.join('    ' + line for line in lines)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='在进程内运行test中的用例，和test_out中的哈希值比较')
+    arg_parser.add_argument('names', nargs='*', help='只运行名字中包含这些字符串的用例，名字形如 parser/error_test1')
+    arg_parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='工作进程数，默认为CPU数')
+    args = arg_parser.parse_args()
+
+    cases = discover()
+    if args.names:
+        cases = [case for case in cases if any(name in f"{case[0]}/{case[1]}" for name in args.names)]
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directory:
+        if os.sep == '\\':
+            directory = ROOT # Windows上测试中的路径本来就能找到
+        else:
+            prepare_scripts(directory)
+        with multiprocessing.Pool(max(1, min(args.jobs, len(cases))), _init_worker, (directory,)) as pool:
+            results = pool.map(run_case, cases)
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for (stage, name, _), passed, detail, seconds in results:
+        print(f"{'通过' if passed else '失败'}  {stage + '/' + name:<36} {seconds * 1000:8.1f} ms")
+        if not passed:
+            failed += 1
+            print(detail)
+    print(f"共 {len(results)} 个用例，通过 {len(results) - failed} 个，失败 {failed} 个，用时 {elapsed:.2f} s")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# sampler.py
+# 采样性能分析：每秒打断程序若干次，看它正在执行哪个DSL节点，把样本记到.dsl文件的行上。
+# 和profiler不同，不在每个节点上计时，开销只和采样频率有关，可以一直开着分析线上运行的机器人。
+# 支持tree和vm模式：tree模式看Interpreter方法中正在处理的node，vm模式看虚拟机正在执行的指令的行号。
+import interpreter, bytecode, AST
+import signal, sys, threading
+
+# 处理节点的Interpreter方法，它们的局部变量node是正在执行的节点
+_NODE_CODES = frozenset(function.__code__ for function in vars(interpreter.Interpreter).values()
+                        if hasattr(function, '__code__') and 'node' in function.__code__.co_varnames)
+_VM_CODE = bytecode.VM._execute.__code__
+PROGRAM_NAME = '<program>'
+
+def current_line(frame):
+    '''frame（及调用它的栈帧）正在执行的DSL代码的行号，不在运行DSL代码时返回None'''
+    innermost = frame
+    while frame is not None:
+        code = frame.f_code
+        if code is _VM_CODE:
+            variables = frame.f_locals
+            lines = variables['code'].lines
+            pc = variables['pc']
+            # 打断在虚拟机的循环中时，上一条指令已经执行完（可能是跳转），pc是下一条要执行的指令；
+            # 打断在指令调用的函数中时，pc已经加过，正在执行的是上一条指令
+            index = pc // 2 if frame is innermost else max(pc - 2, 0) // 2
+            if index < len(lines) and lines[index] > 0:
+                return lines[index]
+            return None
+        if code in _NODE_CODES:
+            node = frame.f_locals.get('node')
+            # 共用的字面量和program等节点没有位置，看外层的节点
+            if isinstance(node, AST.ASTNode) and node.lineno is not None:
+                return node.lineno
+        frame = frame.f_back
+    return None
+
+def function_lines(node : AST.ASTNode):
+    '''行号 -> 这一行所在的DSL函数名，不在函数中的行不出现'''
+    result = {}
+    stack = [(node, None)]
+    while stack:
+        node, function = stack.pop()
+        if node.type == 'function_def':
+            function = node.operation
+        if function is not None and node.lineno is not None:
+            result[node.lineno] = function
+        stack.extend((child, function) for child in node.children)
+    return result
+
+class SamplingProfiler:
+    '''
+    按固定频率采样调用start的线程
+
+    在主线程中并且系统支持时用ITIMER_PROF定时器信号，只在进程占用CPU时采样，等待输入和外部脚本时不采样；
+    否则用一个后台线程读取sys._current_frames()，按墙上时间采样
+    '''
+    def __init__(self, node : AST.ASTNode, path : str = None, rate : int = 100):
+        '''
+            para node: 程序的AST树，用来找出每一行所在的函数
+            para path: 源代码文件，报告中显示每一行的源代码
+            para rate: 每秒采样几次
+        '''
+        if rate <= 0:
+            raise Exception(f"采样频率必须大于0：{rate}")
+        self.node = node
+        self.path = path
+        self.rate = rate
+        self.lines = {} # 行号 -> 样本数
+        self.total = 0  # 样本总数，包括不在运行DSL代码时的样本
+        self._previous = None   # 使用信号时原来的信号处理函数
+        self._thread = None     # 不使用信号时的采样线程
+        self._stop = None
+
+    def start(self):
+        if self._previous is not None or self._thread is not None:
+            raise Exception("采样已经开始")
+        interval = 1 / self.rate
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._previous = signal.signal(signal.SIGPROF, self._handle_signal)
+            signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        else:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._sample_thread, args=(threading.get_ident(), interval),
+                                            name='dsl-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._previous is not None:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous)
+            self._previous = None
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _record(self, frame):
+        self.total += 1
+        line = current_line(frame)
+        if line is not None:
+            self.lines[line] = self.lines.get(line, 0) + 1
+
+    def _handle_signal(self, signum, frame):
+        self._record(frame)
+
+    def _sample_thread(self, ident : int, interval : float):
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(ident)
+            if frame is None:
+                return # 被采样的线程已经结束
+            self._record(frame)
+            del frame
+
+    def report(self, file=None, limit : int = 30):
+        '''输出样本最多的limit行，按样本数从多到少排列'''
+        file = file if file is not None else sys.stderr
+        sampled = sum(self.lines.values())
+        print(f"采样 {self.total} 次（每秒 {self.rate} 次），其中 {sampled} 次在运行DSL代码", file=file)
+        if sampled == 0:
+            return
+        functions = function_lines(self.node) if self.node is not None else {}
+        source = []
+        if self.path is not None:
+            with open(self.path, 'r', encoding='utf-8') as source_file:
+                source = source_file.read().split('\n')
+        rows = sorted(self.lines.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        width = max([len(functions.get(line, PROGRAM_NAME)) for line, _ in rows] + [4])
+        print(f"{'行号':>4} {'样本':>6} {'占比':>5}  {'函数':<{width - 2}}  源代码", file=file)
+        for line, count in rows:
+            text = source[line - 1].strip() if line <= len(source) else ''
+            function = functions.get(line, PROGRAM_NAME)
+            print(f"{line:>6} {count:>8} {count / sampled:>7.1%}  {function:<{width}}  {text}", file=file)
+
+# 示例用法
+if __name__ == '__main__':
+    import lexer, parser
+    if len(sys.argv) < 2:
+        raise Exception("需要输入您的代码文件")
+    elif len(sys.argv) > 2:
+        raise Exception("您输入的文件太多了")
+    else :
+        node = parser.Parser(lexer.Lexer()).parse_file(sys.argv[1])
+        profiler = SamplingProfiler(node, sys.argv[1])
+        profiler.start()
+        try:
+            interpreter.Interpreter(node).run()
+        finally:
+            profiler.stop()
+            profiler.report()
@@ -0,0 +1,176 @@
+# server.py
+# 把一个robot_dsl脚本作为机器人服务运行：脚本只做一次语法分析和编译，每个连接是一个独立的会话，
+# 有自己的变量和函数。会话在字节码虚拟机中运行，遇到input时暂停，收到客户端发来的一行后继续；
+# print的内容在会话等待输入或结束时发给客户端。所有会话都在一个asyncio事件循环中运行。
+# 指定--suspend-dir时，等待输入的会话保存到磁盘上，不占用内存，收到输入后再恢复。
+import interpreter, bytecode, cache, pycall
+from main import add_runner_arguments, add_sampler_arguments, create_runner, parse_file, start_sampler
+import argparse, asyncio, io, itertools, os, sys
+
+class Session:
+    '''一个客户端的会话，变量、函数和输出都是会话自己的'''
+    def __init__(self, runner):
+        self.output = io.StringIO()
+        self.interpreter = interpreter.Interpreter(None, mode='vm', python_runner=runner, output=self.output)
+        self.vm = bytecode.VM(self.interpreter, suspend=True)
+
+    def restore(self, program : bytecode.CodeObject, data : bytes):
+        '''恢复bytecode.dumps_session保存的会话'''
+        self.vm = bytecode.loads_session(self.interpreter, program, data)
+
+    def take_output(self) -> bytes:
+        '''取出还没有发给客户端的输出'''
+        text = self.output.getvalue()
+        self.output.seek(0)
+        self.output.truncate()
+        return text.encode('utf-8')
+
+class BotServer:
+    '''
+    运行同一个程序的许多会话
+
+    input不阻塞事件循环：虚拟机暂停后等待客户端的下一行。
+    python_call脚本能在多个线程中同时运行时（runner.concurrent）放到线程池中运行，
+    否则（比如在进程内运行）直接在事件循环中运行
+    '''
+    def __init__(self, program : bytecode.CodeObject, runner, suspend_dir : str = None):
+        self.program = program
+        self.runner = runner
+        self.suspend_dir = suspend_dir # 保存等待输入的会话的目录，为None时会话一直在内存中
+        self.active = 0     # 正在进行的会话数
+        self.finished = 0   # 已经结束的会话数
+        self._ids = itertools.count()
+
+    async def handle(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter):
+        '''处理一个连接'''
+        self.active += 1
+        path = None
+        if self.suspend_dir is not None:
+            path = os.path.join(self.suspend_dir, f"{next(self._ids)}.session")
+        try:
+            await self._converse(Session(self.runner), reader, writer, path)
+        except ConnectionError:
+            pass # 客户端已经断开
+        finally:
+            self.active -= 1
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+            self.finished += 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _converse(self, session : Session, reader : asyncio.StreamReader, writer : asyncio.StreamWriter,
+                        path : str = None):
+        vm = session.vm
+        try:
+            state = vm.run(self.program)
+            while state is bytecode.SUSPENDED:
+                if vm.waiting[0] == bytecode.WAIT_INPUT:
+                    writer.write(session.take_output())
+                    await writer.drain()
+                    if path is not None:
+                        # 等待期间只保留保存的数据，不保留解释器和虚拟机
+                        with open(path, 'wb') as file:
+                            file.write(bytecode.dumps_session(vm, self.program))
+                        session = vm = None
+                    line = await reader.readline()
+                    if not line:
+                        return # 客户端不再输入，结束会话
+                    if path is not None:
+                        session = Session(self.runner)
+                        with open(path, 'rb') as file:
+                            session.restore(self.program, file.read())
+                        os.remove(path)
+                        vm = session.vm
+                    state = vm.resume(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+                else:
+                    _, script_path, arguments = vm.waiting
+                    try:
+                        result = await self._run_python_script(session, script_path, arguments)
+                    except Exception as e:
+                        state = vm.throw(e)
+                    else:
+                        state = vm.resume(result)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            print(f"会话运行出错：{e}", file=sys.stderr)
+            if session is None:
+                # 等待输入时出错（比如输入的一行超过了StreamReader的长度限制），会话还保存在磁盘上，
+                # 没有输出缓冲区，直接发给客户端
+                writer.write(f"运行出错：{e}\n".encode('utf-8'))
+                await writer.drain()
+                return
+            session.output.write(f"运行出错：{e}\n")
+        writer.write(session.take_output())
+        await writer.drain()
+
+    async def _run_python_script(self, session : Session, script_path : str, arguments : list):
+        if self.runner.concurrent:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, session.interpreter._run_python_script, script_path, arguments)
+        return session.interpreter._run_python_script(script_path, arguments)
+
+def raise_open_file_limit():
+    '''每个连接占用一个文件描述符，把软限制提高到硬限制'''
+    try:
+        import resource # Windows上没有resource模块
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+async def serve(server : BotServer, args : argparse.Namespace):
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handle, path=args.unix, backlog=args.backlog)
+        address = args.unix
+    else:
+        listener = await asyncio.start_server(server.handle, args.host, args.port, backlog=args.backlog)
+        address = f"{args.host}:{args.port}"
+    print(f"机器人服务已启动：{address}", file=sys.stderr, flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='把robot_dsl脚本作为机器人服务运行，每个连接是一个会话')
+    arg_parser.add_argument('file', help='您的代码文件')
+    arg_parser.add_argument('--host', default='127.0.0.1', help='监听的地址')
+    arg_parser.add_argument('--port', type=int, default=8765, help='监听的端口')
+    arg_parser.add_argument('--unix', default=None, help='监听的Unix域套接字路径，指定后不监听TCP端口')
+    arg_parser.add_argument('--backlog', type=int, default=4096, help='等待接受的连接队列长度')
+    arg_parser.add_argument('--suspend-dir', default=None, help='把等待输入的会话保存到这个目录中，不占用内存')
+    add_sampler_arguments(arg_parser)
+    add_runner_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    node, _ = parse_file(args.file, cache.file_digest(args.file))
+    program = bytecode.BytecodeCompiler().compile(node)
+    raise_open_file_limit()
+    runner = create_runner(args)
+    if args.suspend_dir is not None:
+        os.makedirs(args.suspend_dir, exist_ok=True)
+    server = BotServer(program, runner, args.suspend_dir)
+    # 所有会话都在主线程的事件循环中运行，样本合在一起，停止服务时输出
+    sampling = start_sampler(args, node)
+    try:
+        asyncio.run(serve(server, args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if sampling is not None:
+            sampling.stop()
+        runner.close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+        print(f"共处理 {server.finished} 个会话", file=sys.stderr)
+        if args.cache_stats and isinstance(runner, pycall.CachingRunner):
+            print(f"脚本结果缓存：命中 {runner.hits} 次，未命中 {runner.misses} 次", file=sys.stderr)
+        if sampling is not None:
+            sampling.report()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,481 @@
+# transpiler.py
+# 这个模块把AST树翻译成等价的Python源代码，再用compile()编译成Python代码对象运行。
+# DSL函数翻译成真正的Python函数，while翻译成Python的while循环，
+# 运算时的类型检查以内联判断的形式保留，只有类型不是整数时才调用operations中的完整检查。
+# 编译好的代码对象按源代码的哈希值缓存在磁盘上，再次运行时跳过词法分析、语法分析和编译。
+import AST, operations, cache, resolver
+import marshal, sys
+
+# 生成代码的版本，修改翻译规则后要加一，让旧的缓存失效
+VERSION = 3
+
+BUILTINS = {'print': '_print', 'input': '_input', 'len': '_len'}
+
+# 二元运算：(整数时的运算, 完整检查的运算)
+_BINARY = {
+    '+':  ('{0} + {1}', '_add({0}, {1})'),
+    '-':  ('{0} - {1}', '_subtract({0}, {1})'),
+    '*':  ('{0} * {1}', '_multiply({0}, {1})'),
+    '/':  ('{0} / {1}', '_divide({0}, {1})'),
+}
+
+class Transpiler:
+    '''
+    把AST树翻译成Python源代码
+
+    整个程序翻译成函数_main(F)，DSL函数翻译成函数_fn_编号(F)，F是当前的栈帧；
+    表达式中的函数调用等会先生成语句算出结果，保证求值顺序和逐节点解释时一致
+    '''
+    def __init__(self):
+        self._lines = []
+        self._indent = 0
+        self._temps = 0
+        self._functions = 0
+        self._in_function = False
+        self._static = True    # 作用域分析能否确定每个变量只在一个栈帧中，见resolver.Resolver
+        self._stable = set()   # 可以重复使用而不会重复求值的表达式：临时变量和常量
+        self._int_consts = set()   # 整数常量
+        self._other_consts = set()   # 其他类型的常量
+        self._statements = {
+            'assign':        self._transpile_assign_statement,
+            'function_def':  self._transpile_function_define,
+            'program':       self._transpile_program,
+            'return':        self._transpile_return,
+            'python_call':   self._transpile_call_statement,
+            'function_call': self._transpile_call_statement,
+            'if':            self._transpile_if_statement,
+            'while':         self._transpile_while_statement,
+        }
+        self._expressions = {
+            'STR':            self._transpile_literal,
+            'NUMBER':         self._transpile_literal,
+            'TRUE':           self._transpile_literal,
+            'FALSE':          self._transpile_literal,
+            'ID':             self._transpile_ID,
+            'array_item':     self._transpile_array_item,
+            'array':          self._transpile_array,
+            'argument_list':  self._transpile_array,
+            'factor':         self._transpile_factor,
+            'term':           self._transpile_binary,
+            'expression':     self._transpile_binary,
+            'boolfactor':     self._transpile_boolfactor,
+            'boolterm':       self._transpile_boolterm,
+            'boolexpression': self._transpile_boolexpression,
+            'condition':      self._transpile_condition,
+            'python_call':    self._transpile_python_call,
+            'function_call':  self._transpile_function_call,
+            'cse_store':      self._transpile_cse_store,
+            'cse_load':       self._transpile_cse_load,
+        }
+
+    def transpile(self, node : AST.ASTNode):
+        '''翻译整个程序，返回Python源代码'''
+        self._static = resolver.Resolver().resolve(node).static
+        self._emit('def _main(F):')
+        self._block(node)
+        return '\n'.join(self._lines) + '\n'
+
+    # ---------------------------- 工具 ----------------------------
+
+    def _emit(self, line : str):
+        self._lines.append('    ' * self._indent + line)
+
+    def _block(self, node : AST.ASTNode):
+        '''在下一级缩进中翻译一条语句，没有生成代码时补上pass'''
+        self._indent += 1
+        mark = len(self._lines)
+        self._transpile_statement(node)
+        if len(self._lines) == mark:
+            self._emit('pass')
+        self._indent -= 1
+
+    def _new_temp(self):
+        self._temps += 1
+        temp = f'_t{self._temps}'
+        self._stable.add(temp)
+        return temp
+
+    def _materialize(self, expr : str):
+        '''把表达式的值存进临时变量，之后可以多次使用'''
+        if expr in self._stable:
+            return expr
+        temp = self._new_temp()
+        self._emit(f'{temp} = {expr}')
+        return temp
+
+    def _transpile_statement(self, node : AST.ASTNode):
+        transpile_node = self._statements.get(node.type)
+        if transpile_node is not None:
+            transpile_node(node)
+
+    def _transpile_expr(self, node : AST.ASTNode):
+        '''翻译表达式，必要的语句直接输出，返回表示结果的Python表达式'''
+        transpile_node = self._expressions.get(node.type)
+        if transpile_node is None:
+            return 'None'
+        return transpile_node(node)
+
+    def _transpile_operands(self, nodes : list):
+        '''
+        按顺序翻译多个操作数
+
+        某个操作数生成了语句时（比如其中有函数调用），它前面的操作数要先算出来存进临时变量，
+        否则这些语句会比前面的操作数先执行
+        '''
+        exprs = []
+        for node in nodes:
+            mark = len(self._lines)
+            expr = self._transpile_expr(node)
+            if len(self._lines) > mark:
+                earlier = []
+                for i, value in enumerate(exprs):
+                    if value not in self._stable:
+                        temp = self._new_temp()
+                        earlier.append('    ' * self._indent + f'{temp} = {value}')
+                        exprs[i] = temp
+                self._lines[mark:mark] = earlier
+            exprs.append(expr)
+        return exprs
+
+    def _int_guard(self, fast : str, slow : str, operands : list, extra : str = None):
+        '''操作数都是整数时走fast，否则走slow，整数常量不用检查'''
+        if any(value in self._other_consts for value in operands):
+            return slow
+        checks = [f'type({value}) is int' for value in operands if value not in self._int_consts]
+        if extra:
+            checks.append(extra)
+        if not checks:
+            return f'({fast})'
+        return f'({fast} if {" and ".join(checks)} else {slow})'
+
+    # ---------------------------- 表达式 ----------------------------
+
+    def _transpile_literal(self, node : AST.ASTNode):
+        expr = repr(node.value)
+        self._stable.add(expr)
+        if type(node.value) is int:
+            self._int_consts.add(expr)
+        else:
+            self._other_consts.add(expr)
+        return expr
+
+    def _transpile_ID(self, node : AST.ASTNode):
+        # F总是当前栈帧，也就是栈顶，找不到时再从栈顶往下找
+        name = repr(node.value)
+        return f'(F[{name}] if {name} in F else _load_name(_V, {name}))'
+
+    def _transpile_array_item(self, node : AST.ASTNode):
+        index = self._transpile_expr(node.children[0])
+        return f'_load_item(_V, {node.value!r}, {index})'
+
+    def _transpile_array(self, node : AST.ASTNode):
+        return f'[{", ".join(self._transpile_operands(node.children))}]'
+
+    def _transpile_factor(self, node : AST.ASTNode):
+        operand = self._transpile_expr(node.children[0])
+        if node.operation == '-':
+            operand = self._materialize(operand)
+            return self._int_guard(f'-{operand}', f'_negative({operand})', [operand])
+        if node.operation == 'atoi':
+            return f'_atoi({operand})'
+        if node.operation == 'itoa':
+            return f'str({operand})'
+        return f'({operand}, None)[1]'
+
+    def _transpile_binary(self, node : AST.ASTNode):
+        '''加减乘除'''
+        left, right = self._transpile_operands(node.children[:2])
+        if node.operation not in _BINARY:
+            return f'({left}, {right}, None)[2]'
+        left = self._materialize(left)
+        right = self._materialize(right)
+        fast, slow = _BINARY[node.operation]
+        fast = fast.format(left, right)
+        slow = slow.format(left, right)
+        if node.operation == '/':
+            if right in self._int_consts:
+                if int(right) == 0:
+                    return slow
+                return self._int_guard(fast, slow, [left, right])
+            return self._int_guard(fast, slow, [left, right], extra=right)
+        return self._int_guard(fast, slow, [left, right])
+
+    def _transpile_boolfactor(self, node : AST.ASTNode):
+        operand = self._transpile_expr(node.children[0])
+        if node.operation == 'not':
+            return f'(not {operand})'
+        return f'({operand}, None)[1]'
+
+    def _transpile_boolterm(self, node : AST.ASTNode):
+        left, right = self._transpile_operands(node.children[:2])
+        operation = node.operation
+        if operation == '==' or operation == '!=':
+            return f'({left} {operation} {right})'
+        if operation not in operations.COMPARE_OPS:
+            return f'({left}, {right}, None)[2]'
+        left = self._materialize(left)
+        right = self._materialize(right)
+        index = operations.COMPARE_OPS.index(operation)
+        return self._int_guard(f'{left} {operation} {right}',
+                               f'_compare({index}, {left}, {right})', [left, right])
+
+    def _transpile_short_circuit(self, node : AST.ASTNode, is_or : bool):
+        '''and/or，结果总是True或False'''
+        mark = len(self._lines)
+        exprs = []
+        for child in node.children:
+            child_mark = len(self._lines)
+            exprs.append(self._transpile_expr(child))
+            if len(self._lines) > child_mark:
+                break
+        else:
+            # 所有操作数都没有生成语句，直接用Python的and/or
+            joiner = ' or ' if is_or else ' and '
+            return f'(True if {joiner.join(f"({expr})" for expr in exprs)} else False)'
+
+        # 有操作数需要先执行语句，翻译成嵌套的if
+        del self._lines[mark:]
+        result = self._new_temp()
+        self._emit(f'{result} = {is_or}')
+        indent = self._indent
+        for child in node.children:
+            expr = self._transpile_expr(child)
+            self._emit(f'if not ({expr}):' if is_or else f'if {expr}:')
+            self._indent += 1
+        self._emit(f'{result} = {not is_or}')
+        self._indent = indent
+        return result
+
+    def _transpile_boolexpression(self, node : AST.ASTNode):
+        return self._transpile_short_circuit(node, is_or=False)
+
+    def _transpile_condition(self, node : AST.ASTNode):
+        return self._transpile_short_circuit(node, is_or=True)
+
+    def _transpile_python_call(self, node : AST.ASTNode):
+        arguments = self._transpile_expr(node.children[0])
+        return f'_run_python_script({node.operation!r}, {arguments})'
+
+    def _transpile_function_call(self, node : AST.ASTNode):
+        function_name = node.operation
+        if function_name in BUILTINS:
+            arguments = self._transpile_expr(node.children[0])
+            return f'{BUILTINS[function_name]}({arguments})'
+        # 和解释器一样，先检查函数是否存在再计算参数
+        message = f'{function_name} 未定义，无法调用'
+        self._emit(f'if {function_name!r} not in _FUNCS: raise Exception({message!r})')
+        arguments = self._transpile_expr(node.children[0])
+        return f'_call({function_name!r}, {arguments})'
+
+    def _transpile_cse_store(self, node : AST.ASTNode):
+        return f'(_c{node.value} := {self._transpile_expr(node.children[0])})'
+
+    def _transpile_cse_load(self, node : AST.ASTNode):
+        return f'_c{node.value}'
+
+    # ---------------------------- 语句 ----------------------------
+
+    def _transpile_program(self, node : AST.ASTNode):
+        for child in node.children:
+            self._transpile_statement(child)
+
+    def _transpile_call_statement(self, node : AST.ASTNode):
+        self._emit(self._transpile_expr(node))
+
+    def _transpile_assign_statement(self, node : AST.ASTNode):
+        if self._in_function and not self._static:
+            self._transpile_frame_assign(node)
+            return
+        target = node.children[0]
+        name = repr(target.value)
+        # 在最外层时栈中只有全局栈帧，找没找到都是给全局变量赋值
+        store_global = f'_V[0][{name}] = {{}}' if self._in_function else f'F[{name}] = {{}}'
+        if target.type == 'array_item':
+            self._emit(f'if _find_array(_V, {name}):')
+            self._indent += 1
+            # 和解释器一样先检查索引再计算右边的表达式，索引不对时右边的表达式不会运行
+            index = self._materialize(self._transpile_expr(target.children[0]))
+            self._emit(f'_check_index({name}, _load_name(_V, {name}), {index})')
+            self._emit(f'_store_item(_V, {name}, {index}, {self._transpile_expr(node.children[1])})')
+            self._indent -= 1
+            self._emit('else:')
+            self._indent += 1
+            self._emit(store_global.format(self._transpile_expr(node.children[1])))
+            self._indent -= 1
+        elif self._in_function:
+            self._emit(f'_store_name(_V, {name}, {self._transpile_expr(node.children[1])})')
+        else:
+            self._emit(store_global.format(self._transpile_expr(node.children[1])))
+
+    def _transpile_frame_assign(self, node : AST.ASTNode):
+        '''
+        函数体中的赋值，作用域分析不能确定变量只在一个栈帧中时使用
+
+        和解释器一样从栈顶往下给每个有这个变量的栈帧赋值，每次都重新计算索引和右边的表达式
+        '''
+        target = node.children[0]
+        name = repr(target.value)
+        frame = self._new_temp()
+        self._emit(f'{frame} = _find_frame(_V, {name}, len(_V) - 1)')
+        self._emit(f'if {frame} < 0:')
+        self._indent += 1
+        self._emit(f'_V[0][{name}] = {self._transpile_expr(node.children[1])}')
+        self._indent -= 1
+        self._emit(f'while {frame} >= 0:')
+        self._indent += 1
+        if target.type == 'array_item':
+            array = self._new_temp()
+            self._emit(f'{array} = _check_array({name}, _V[{frame}].get({name}))')
+            index = self._materialize(self._transpile_expr(target.children[0]))
+            self._emit(f'_check_index({name}, {array}, {index})')
+            # Python先计算右边再取数组，和解释器一样用赋值时栈帧中的数组
+            self._emit(f'_V[{frame}][{name}][{index}] = {self._transpile_expr(node.children[1])}')
+        else:
+            self._emit(f'_V[{frame}][{name}] = {self._transpile_expr(node.children[1])}')
+        self._emit(f'{frame} = _find_frame(_V, {name}, {frame} - 1)')
+        self._indent -= 1
+
+    def _transpile_function_define(self, node : AST.ASTNode):
+        '''函数声明，参数检查在翻译时完成，出错时在运行到声明处再报错'''
+        function_name = node.operation
+        argument_names = []
+        error = None
+        if function_name in BUILTINS:
+            error = f'函数 {function_name} 是内置函数'
+        else:
+            for arg in node.children[0].children:
+                if arg.type != 'ID':
+                    error = f"函数 {function_name} 中有 {arg.type} ,希望是一个标识符"
+                    break
+                if arg.value in argument_names:
+                    error = f"在函数 {function_name} 中，{arg.value} 重复定义"
+                    break
+                argument_names.append(arg.value)
+        if error is not None:
+            self._emit(f'raise Exception({error!r})')
+            return
+
+        self._functions += 1
+        python_name = f'_fn_{self._functions}_{function_name}'
+        self._emit(f'def {python_name}(F):')
+        in_function = self._in_function
+        self._in_function = True
+        self._block(node.children[1])
+        self._in_function = in_function
+        self._emit(f"_FUNCS[{function_name!r}] = {{'arguments': {argument_names!r}, 'code': {python_name}}}")
+
+    def _transpile_return(self, node : AST.ASTNode):
+        if node.children:
+            self._emit(f'return {self._transpile_expr(node.children[0])}')
+        else:
+            self._emit('return None')
+
+    def _transpile_if_statement(self, node : AST.ASTNode):
+        condition = self._transpile_expr(node.children[0])
+        self._emit(f'if {condition}:')
+        self._block(node.children[1])
+        if len(node.children) == 3:
+            self._emit('else:')
+            self._block(node.children[2])
+
+    def _transpile_while_statement(self, node : AST.ASTNode):
+        self._emit('while True:')
+        head = len(self._lines)
+        self._indent += 1
+        condition = self._transpile_expr(node.children[0])
+        if len(self._lines) == head:
+            # 条件不需要先执行语句，直接写成while的条件
+            self._lines[head - 1] = '    ' * (self._indent - 1) + f'while {condition}:'
+        else:
+            self._emit(f'if not ({condition}): break')
+        self._indent -= 1
+        self._block(node.children[1])
+
+# ---------------------------- 运行 ----------------------------
+
+def transpile(node : AST.ASTNode):
+    '''把AST树翻译成Python源代码'''
+    return Transpiler().transpile(node)
+
+def compile_program(node : AST.ASTNode, filename : str = 'program'):
+    '''把AST树翻译并编译成Python代码对象'''
+    return compile(transpile(node), f'<dsl {filename}>', 'exec')
+
+def load_program(source_path : str, source : str, *versions):
+    '''
+    读取缓存的Python代码对象，没有缓存时返回None。source是源代码，或者cache.file_digest得到的文件哈希值
+
+    versions是影响编译结果的其他选项（比如优化的版本），和存入时的要一致
+    '''
+    data = cache.load(cache.cache_path(source_path, cache.source_key(source, 'python', VERSION, *versions), '.pyc'))
+    if data is None:
+        return None
+    try:
+        return marshal.loads(data)
+    except (ValueError, EOFError, TypeError):
+        return None
+
+def store_program(source_path : str, source : str, program, *versions):
+    '''把编译好的Python代码对象写入缓存'''
+    cache.store(cache.cache_path(source_path, cache.source_key(source, 'python', VERSION, *versions), '.pyc'),
+                marshal.dumps(program))
+
+def run(interpreter, program):
+    '''运行编译好的Python代码对象，变量和函数仍然存放在interpreter中'''
+    variables = interpreter.variables
+    functions = interpreter.functions
+
+    def call(function_name : str, values : list):
+        '''调用DSL函数，函数是否存在已经检查过'''
+        function = functions[function_name]
+        defined_arguments = function['arguments']
+        if len(values) != len(defined_arguments):
+            raise Exception(f"{function_name} 函数的参数不匹配")
+        # 设置栈帧
+        variables.append(dict(zip(defined_arguments, values)))
+        try:
+            return function['code'](variables[-1])
+        except Exception:
+            raise Exception(f"函数 {function_name} 运行中出错")
+        finally:
+            variables.pop()
+
+    namespace = {
+        '_V': variables,
+        '_FUNCS': functions,
+        '_call': call,
+        '_print': interpreter._builtin_print,
+        '_input': interpreter._builtin_input,
+        '_len': interpreter._builtin_len,
+        '_run_python_script': interpreter._run_python_script,
+        '_load_name': operations.load_name,
+        '_store_name': operations.store_name,
+        '_load_item': operations.load_item,
+        '_find_array': operations.find_array,
+        '_store_item': operations.store_item,
+        '_find_frame': operations.find_frame,
+        '_check_array': operations.check_array,
+        '_check_index': operations.check_index,
+        '_add': operations.add,
+        '_subtract': operations.subtract,
+        '_multiply': operations.multiply,
+        '_divide': operations.divide,
+        '_compare': operations.compare,
+        '_negative': operations.negative,
+        '_atoi': operations.atoi,
+    }
+    exec(program, namespace)
+    namespace['_main'](variables[0])
+
+# 示例用法
+if __name__ == '__main__':
+    import lexer, parser
+    if len(sys.argv) < 2:
+        raise Exception("需要输入您的代码文件")
+    elif len(sys.argv) > 2:
+        raise Exception("您输入的文件太多了")
+    else :
+        with open(sys.argv[1], 'r', encoding='utf-8') as file:
+            source = file.read()
+        node = parser.Parser(lexer.Lexer()).parse(source)
+        print(transpile(node), end='')